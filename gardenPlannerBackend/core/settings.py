@@ -28,6 +28,51 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.getenv('SECRET_KEY')
 OPENWEATHERMAP_API_KEY = os.getenv('OPENWEATHERMAP_API_KEY')
+OPENWEATHERMAP_BASE_URL = os.getenv('OPENWEATHERMAP_BASE_URL', 'https://api.openweathermap.org')
+# Coordinates of a place never change; current weather is refreshed every few minutes
+GEOCODE_CACHE_SECONDS = 30 * 24 * 60 * 60
+WEATHER_CACHE_SECONDS = 5 * 60
+
+# Garden geocoding runs in the geocode_gardens job; Nominatim allows 1 request/second
+NOMINATIM_URL = os.getenv('NOMINATIM_URL', 'https://nominatim.openstreetmap.org/search')
+NOMINATIM_MIN_INTERVAL = 1.0
+
+# /api/gardens/nearby/: default and largest search radius, most gardens returned
+GARDEN_NEARBY_DEFAULT_RADIUS_KM = 10
+GARDEN_NEARBY_MAX_RADIUS_KM = 200
+GARDEN_NEARBY_MAX_RESULTS = 100
+
+# generate_recurring_tasks: instances are created this far ahead of their due date,
+# missed occurrences up to this many days old are caught up, templates per batch
+RECURRING_TASK_LEAD_TIME_HOURS = 24
+RECURRING_TASK_CATCH_UP_DAYS = 31
+RECURRING_TASK_BATCH_SIZE = 2000
+
+# send_deadline_reminders: assignees are reminded of open tasks due this far ahead,
+# reminders are written in batches of this many
+DEADLINE_REMINDER_WINDOW_HOURS = 24
+DEADLINE_REMINDER_BATCH_SIZE = 1000
+
+# run_scheduler: a cron job may start at most this late, and its JobRun history
+# (which makes it run once across all scheduler processes) is kept this long.
+# A run still RUNNING after the lease is taken for a dead worker and marked failed.
+SCHEDULER_MISFIRE_GRACE_SECONDS = 30
+SCHEDULER_JOB_RUN_RETENTION_DAYS = 30
+SCHEDULER_JOB_LEASE_SECONDS = 60 * 60
+
+# /api/gardens/<id>/calendar/: window when ?to= is omitted, and the longest window
+GARDEN_CALENDAR_DEFAULT_DAYS = 31
+GARDEN_CALENDAR_MAX_DAYS = 366
+# The iCalendar feed covers this many days before and after today
+GARDEN_CALENDAR_FEED_PAST_DAYS = 30
+GARDEN_CALENDAR_FEED_FUTURE_DAYS = 180
+
+# Forecasts for the weather reminder job: coordinates per multi-location request,
+# parallel requests and per-request timeout
+OPEN_METEO_URL = os.getenv('OPEN_METEO_URL', 'https://api.open-meteo.com/v1/forecast')
+OPEN_METEO_BATCH_SIZE = 50
+WEATHER_FETCH_CONCURRENCY = 8
+WEATHER_FETCH_TIMEOUT = 10
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv('DEBUG') == 'True'
@@ -185,7 +230,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'gardenplanner.apps.garden.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
@@ -197,6 +242,35 @@ REST_FRAMEWORK = {
     }
 }
 
+# Shared cache: Redis when REDIS_URL is set (production, shared by all workers),
+# process-local memory otherwise (tests and local development)
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'gardenplanner',
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'gardenplanner',
+            'TIMEOUT': 300,
+        }
+    }
+
+# Token -> user/suspension lookups are cached this long; logout, suspension and
+# ban changes invalidate the entry immediately.
+AUTH_TOKEN_CACHE_SECONDS = 60
+
+# Cursor pagination is opt-in per request (?paginate=true / ?cursor= / ?page_size=)
+# until every client understands paginated responses; set to True to make it the default.
+CURSOR_PAGINATION_DEFAULT = os.getenv('CURSOR_PAGINATION_DEFAULT') == 'True'
+
 
 
 # Email configuration
@@ -217,6 +291,16 @@ APPEND_SLASH = True
 PUSH_NOTIFICATIONS_SETTINGS = {
     "FCM_SERVICE_ACCOUNT_FILE": os.path.join(BASE_DIR, "firebase-service-account.json"), 
 }
+
+# Pushes are queued in the PushOutbox table and sent by `manage.py deliver_push_notifications`.
+# Use gardenplanner.apps.garden.push.FakePushBackend to record pushes instead of sending them.
+PUSH_NOTIFICATION_BACKEND = os.getenv('PUSH_NOTIFICATION_BACKEND', 'gardenplanner.apps.garden.push.FCMPushBackend')
+PUSH_OUTBOX_MAX_ATTEMPTS = 5
+PUSH_OUTBOX_RETRY_BASE_SECONDS = 30
+PUSH_OUTBOX_RETRY_MAX_SECONDS = 60 * 60
+PUSH_OUTBOX_RETENTION_DAYS = 7
+# Recipients per outbox message; FCM multicasts to at most 500 tokens per request
+PUSH_MULTICAST_BATCH_SIZE = 500
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
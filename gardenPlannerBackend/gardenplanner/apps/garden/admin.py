@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.urls import reverse
 from django.utils.html import format_html
 from .models import Profile, Garden, GardenMembership, CustomTaskType, Task, ForumPost, Comment, Report
-from .models import Profile, Garden, GardenMembership, CustomTaskType, Task, ForumPost, Comment, Report, GardenEvent, EventAttendance
+from .models import Profile, Garden, GardenMembership, CustomTaskType, Task, ForumPost, Comment, Report, GardenEvent, EventAttendance, JobRun
 
 # Register your models here.
 admin.site.register(Profile)
@@ -29,6 +29,13 @@ class CommentAdmin(admin.ModelAdmin):
     ordering = ('-created_at',)
 
 
+@admin.register(JobRun)
+class JobRunAdmin(admin.ModelAdmin):
+    list_display = ('job_id', 'scheduled_for', 'status', 'duration_seconds', 'rows', 'worker')
+    list_filter = ('job_id', 'status')
+    ordering = ('-started_at',)
+
+
 @admin.register(Report)
 class ReportAdmin(admin.ModelAdmin):
     list_display = (
@@ -0,0 +1,144 @@
+"""
+Cached token authentication.
+
+SuspensionMiddleware and DRF both need to resolve the Authorization token.
+``resolve_token`` looks the token up once, caches the user's id, name, flags
+and suspension state for AUTH_TOKEN_CACHE_SECONDS as a plain dict (never the
+password hash or a pickled model instance), and keeps the result on the
+request so that ``CachedTokenAuthentication`` reuses it downstream. Cache entries are dropped when the token is deleted (logout) and
+when the user or profile is saved (suspension, unsuspension, ban).
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import router
+from django.db.models.signals import post_delete, post_save
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .cache import auth_tokens
+from .models import Profile
+
+_REQUEST_ATTR = '_token_identity'
+
+# User columns cached with a token: what request.user is read for in views and
+# permissions. The password hash is never cached; it loads from the database
+# if some code path asks for it.
+CACHED_USER_FIELDS = (
+    'id', 'username', 'first_name', 'last_name', 'email',
+    'is_active', 'is_staff', 'is_superuser', 'last_login', 'date_joined',
+)
+
+
+class TokenIdentity:
+    """
+    A token's user and the user's suspension state, built from a plain dict so
+    that only those values, not model instances, are stored in the cache.
+    """
+
+    def __init__(self, token_key, data):
+        self.token_key = token_key
+        self.data = data
+        self.is_suspended = data['is_suspended']
+        self.suspension_reason = data['suspension_reason']
+        self.suspended_until = data['suspended_until']
+        self._user = None
+
+    @property
+    def user(self):
+        """The user with the cached columns loaded and the rest (password) deferred."""
+        if self._user is None:
+            # from_db takes the values in model field order
+            values = self.data['user']
+            names = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+            self._user = User.from_db(router.db_for_read(User), names, [values[name] for name in names])
+        return self._user
+
+    @property
+    def token(self):
+        token = Token.from_db(router.db_for_read(Token), ['key', 'user_id'], [self.token_key, self.user.pk])
+        token.user = self.user
+        return token
+
+
+def _cache_key(token_key):
+    # Tokens are credentials, so only their digest ends up in the cache
+    return hashlib.sha256(token_key.encode()).hexdigest()
+
+
+def _load_identity(token_key):
+    """The cacheable dict behind a TokenIdentity, or None for an unknown token."""
+    row = Token.objects.filter(key=token_key).values(
+        *(f'user__{field}' for field in CACHED_USER_FIELDS),
+        'user__profile__is_suspended', 'user__profile__suspension_reason', 'user__profile__suspended_until',
+    ).first()
+    if row is None:
+        return None
+    return {
+        'user': {field: row[f'user__{field}'] for field in CACHED_USER_FIELDS},
+        'is_suspended': bool(row['user__profile__is_suspended']),
+        'suspension_reason': row['user__profile__suspension_reason'],
+        'suspended_until': row['user__profile__suspended_until'],
+    }
+
+
+def resolve_token(request, token_key):
+    """The TokenIdentity for token_key, from the request, the cache or the database."""
+    http_request = getattr(request, '_request', request)
+    resolved = getattr(http_request, _REQUEST_ATTR, None)
+    if resolved is not None and resolved[0] == token_key:
+        return resolved[1]
+
+    cache_key = _cache_key(token_key)
+    data = auth_tokens.get(cache_key)
+    if data is None:
+        data = _load_identity(token_key)
+        if data is not None:
+            auth_tokens.set(cache_key, data, settings.AUTH_TOKEN_CACHE_SECONDS)
+
+    identity = TokenIdentity(token_key, data) if data is not None else None
+    setattr(http_request, _REQUEST_ATTR, (token_key, identity))
+    return identity
+
+
+def invalidate_token(token_key):
+    auth_tokens.delete(_cache_key(token_key))
+
+
+def invalidate_user_tokens(user_id):
+    """Drop cached identities for the user's tokens, e.g. after a suspension change."""
+    for token_key in Token.objects.filter(user_id=user_id).values_list('key', flat=True):
+        invalidate_token(token_key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication backed by resolve_token instead of a query per request."""
+
+    def authenticate(self, request):
+        self.request = request
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        identity = resolve_token(self.request, key)
+        if identity is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not identity.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (identity.user, identity.token)
+
+
+def _token_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+def _user_changed(sender, instance, **kwargs):
+    invalidate_user_tokens(instance.pk if sender is User else instance.user_id)
+
+
+post_delete.connect(_token_deleted, sender=Token, dispatch_uid='auth_token_cache_token_deleted')
+post_save.connect(_user_changed, sender=User, dispatch_uid='auth_token_cache_user_saved')
+post_save.connect(_user_changed, sender=Profile, dispatch_uid='auth_token_cache_profile_saved')
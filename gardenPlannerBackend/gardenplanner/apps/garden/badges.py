@@ -0,0 +1,150 @@
+"""
+Badge engine.
+
+Badge rules come from ``Badge.requirement``, e.g. ``{"posts_count": 10}`` or
+``{"season": "spring"}``. Each process keeps them indexed by requirement key,
+tagged with the version of the shared ``badge_catalogue`` cache namespace, and
+reloads them once that version moves: saving or deleting a Badge in any
+process (web worker or scheduler) invalidates the namespace for all of them.
+
+Signal handlers read the user's current counters from UserStats through
+``check_stat_badges`` (one query), and ``check_badges`` awards every badge
+those counters satisfy that the user does not hold yet, with one lookup of the
+held badges and a single bulk insert. Every met rule is checked, not only the
+thresholds just crossed, so a badge added later still reaches users who
+already qualify. If no rule is met, the check itself costs no queries.
+"""
+
+from django.db.models.signals import post_delete, post_save
+
+from .cache import badge_catalogue
+from .models import Badge, NotificationCategory, UserBadge
+from .stats import get_user_stats
+
+
+# Requirement key -> the UserStats counter holding its current value
+STAT_COUNTERS = {
+    'tasks_created': 'tasks_assigned_by',
+    'tasks_completed': 'tasks_completed',
+    'following_count': 'following_count',
+    'followers_count': 'followers_count',
+    'posts_count': 'posts_created',
+    'comments_count': 'comments_made',
+    'gardens_joined': 'gardens_joined',
+    'gardens_created': 'gardens_managed',
+    'events_attended': 'events_attended',
+}
+
+
+class BadgeRule:
+    """One badge and the counter values it requires."""
+
+    def __init__(self, badge_id, key, name, requirement):
+        self.badge_id = badge_id
+        self.key = key
+        self.name = name
+        self.requirement = requirement or {}
+
+    def is_met(self, counters):
+        for field, needed in self.requirement.items():
+            if field not in counters:
+                return False
+            value = counters[field]
+            if isinstance(needed, (int, float)):
+                if value is None or value < needed:
+                    return False
+            elif value != needed:
+                return False
+        return True
+
+
+# (badge_catalogue version, rules by requirement key, rules by badge key)
+_rules = None
+
+
+def _load_rules():
+    global _rules
+    version = badge_catalogue.version()
+    if _rules is None or _rules[0] != version:
+        by_field, by_key = {}, {}
+        for badge in Badge.objects.all():
+            rule = BadgeRule(badge.id, badge.key, badge.name, badge.requirement)
+            by_key[badge.key] = rule
+            for field in rule.requirement:
+                by_field.setdefault(field, []).append(rule)
+        _rules = (version, by_field, by_key)
+    return _rules[1], _rules[2]
+
+
+def clear_rule_cache(**kwargs):
+    """Make every process reload the rules and the catalogue on next use."""
+    global _rules
+    _rules = None
+    badge_catalogue.invalidate()
+
+
+post_save.connect(clear_rule_cache, sender=Badge, dispatch_uid='badge_rules_saved')
+post_delete.connect(clear_rule_cache, sender=Badge, dispatch_uid='badge_rules_deleted')
+
+
+def check_badges(user, **counters):
+    """
+    Award all badges whose requirement ``counters`` satisfy and that ``user``
+    does not hold yet. Returns the keys of the newly awarded badges.
+    """
+    by_field, _ = _load_rules()
+    candidates = {}
+    for field in counters:
+        for rule in by_field.get(field, ()):
+            if rule.is_met(counters):
+                candidates[rule.badge_id] = rule
+    return _award(user, list(candidates.values()))
+
+
+def check_stat_badges(user, *keys, **counters):
+    """
+    check_badges with the requirement counters named in ``keys`` read from the
+    user's UserStats row, plus any extra ``counters``.
+    """
+    user_stats = get_user_stats(user)
+    counters.update({key: getattr(user_stats, STAT_COUNTERS[key]) for key in keys})
+    return check_badges(user, **counters)
+
+
+def award_badge(user, badge_key):
+    """Award a single badge by key, if it exists and the user does not hold it yet."""
+    _, by_key = _load_rules()
+    rule = by_key.get(badge_key)
+    if rule is None:
+        return []
+    return _award(user, [rule])
+
+
+def _award(user, rules):
+    if not rules:
+        return []
+    earned = set(
+        UserBadge.objects.filter(user=user, badge_id__in=[rule.badge_id for rule in rules])
+        .values_list('badge_id', flat=True)
+    )
+    new_rules = [rule for rule in rules if rule.badge_id not in earned]
+    if not new_rules:
+        return []
+
+    # ignore_conflicts covers a concurrent request awarding the same badge
+    UserBadge.objects.bulk_create(
+        [UserBadge(user=user, badge_id=rule.badge_id) for rule in new_rules],
+        ignore_conflicts=True,
+    )
+
+    # bulk_create skips post_save, so announce the badges here
+    from .signals import send_notifications_bulk
+    for rule in new_rules:
+        send_notifications_bulk(
+            [user],
+            notification_title="New Badge Earned!",
+            notification_message=f"🎉 You earned a new badge: {rule.name}!",
+            notification_category=NotificationCategory.BADGE,
+            link="/profile",
+        )
+    return [rule.key for rule in new_rules]
@@ -0,0 +1,324 @@
+"""
+Performance scenarios run through ``manage.py benchmark --scenario <name>``.
+
+Each scenario seeds its own data inside a transaction that is rolled back
+afterwards, so it can be run against any database without leaving rows behind.
+A scenario returns a list of measurements produced by ``measure``.
+"""
+
+import datetime
+import json
+import os
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+SCENARIOS = {}
+
+
+def scenario(name, default_scale):
+    """Register a benchmark scenario under ``name``."""
+    def register(func):
+        func.default_scale = default_scale
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+class _Rollback(Exception):
+    pass
+
+
+def run(name, scale=None):
+    """Run a scenario inside a rolled-back transaction and return its measurements."""
+    func = SCENARIOS[name]
+    results = []
+    try:
+        with transaction.atomic():
+            results = func(scale or func.default_scale)
+            raise _Rollback
+    except _Rollback:
+        pass
+    return results
+
+
+def measure(label, func, repeat=3, requests=None):
+    """
+    Time ``func`` and record its peak Python memory and query count. ``func``
+    returns the number of bytes it moved (payload size or blob bytes loaded).
+    When ``func`` serves ``requests`` requests, the throughput is reported too.
+    """
+    size = 0
+    tracemalloc.start()
+    started = time.perf_counter()
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(repeat):
+            size = func()
+    elapsed = (time.perf_counter() - started) / repeat
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'label': label,
+        'ms': round(elapsed * 1000, 2),
+        'peak_kb': round(peak / 1024, 1),
+        'queries': len(queries) // repeat,
+        'bytes': size,
+        'rps': round(requests / elapsed) if requests and elapsed else None,
+    }
+
+
+def api_request(user, **params):
+    """DRF request for serializer contexts, as a view would receive it."""
+    request = APIRequestFactory().get('/', params)
+    request.user = user
+    return Request(request)
+
+
+@scenario('image_blobs', default_scale=50)
+def image_blobs(scale):
+    """
+    Blob columns loaded by metadata-only paths: the middleware token lookup, the
+    forum feed in ?image_format=url mode and the likers list, each with the
+    picture columns loaded (as before) and deferred.
+    """
+    from .models import ForumPost, ForumPostImage, ForumPostLike, Profile
+    from .serializers import ForumPostSerializer, LikerSerializer
+    from .views.forumpost import _liker_profiles
+
+    picture = os.urandom(200 * 1024)
+    users = [User.objects.create(username=f'bench_blob_{i}') for i in range(scale)]
+    Profile.objects.filter(user__in=users).update(profile_picture_data=picture)
+    posts = ForumPost.objects.bulk_create(
+        ForumPost(title=f'Post {i}', content='Benchmark', author=users[i % scale]) for i in range(scale)
+    )
+    ForumPostImage.objects.bulk_create(ForumPostImage(post=post, data=picture) for post in posts)
+    ForumPostLike.objects.bulk_create(ForumPostLike(user=user, post=posts[0]) for user in users)
+    token = Token.objects.create(user=users[0])
+    url_request = api_request(users[0], image_format='url')
+
+    def token_lookup(defer):
+        def lookup():
+            queryset = Token.objects.select_related('user', 'user__profile')
+            if defer:
+                queryset = queryset.defer('user__profile__profile_picture_data')
+            profile = queryset.get(key=token.key).user.profile
+            return len(profile.__dict__.get('profile_picture_data') or b'')
+        return lookup
+
+    def feed(image_data):
+        def render():
+            posts = ForumPost.objects.filter(is_deleted=False).for_feed(users[0], image_data=image_data)
+            data = ForumPostSerializer(posts, many=True, context={'request': url_request}).data
+            return len(json.dumps(data, default=str))
+        return render
+
+    def likers(defer):
+        def render():
+            likes = ForumPostLike.objects.filter(post=posts[0])
+            if defer:
+                profiles = _liker_profiles(likes, url_request)
+            else:
+                profiles = [like.user.profile for like in likes.select_related('user__profile')]
+            return sum(len(p.__dict__.get('profile_picture_data') or b'') for p in profiles)
+        return render
+
+    return [
+        measure('token lookup, picture loaded', token_lookup(defer=False)),
+        measure('token lookup, picture deferred', token_lookup(defer=True)),
+        measure('feed (url mode), blobs loaded', feed(image_data=True)),
+        measure('feed (url mode), blobs deferred', feed(image_data=False)),
+        measure('post likers (url mode), pictures loaded', likers(defer=False)),
+        measure('post likers (url mode), pictures deferred', likers(defer=True)),
+    ]
+
+
+@scenario('token_auth', default_scale=200)
+def token_auth(scale):
+    """
+    Requests per second through SuspensionMiddleware and a token-authenticated
+    view: the old path (middleware lookup plus DRF TokenAuthentication, no
+    cache) against the shared cached identity.
+    """
+    from rest_framework.authentication import TokenAuthentication
+    from .authentication import CachedTokenAuthentication, invalidate_token
+    from .middleware import SuspensionMiddleware
+    from .views import SuspensionStatusView
+
+    user = User.objects.create(username='bench_auth')
+    token = Token.objects.create(user=user)
+    factory = APIRequestFactory()
+
+    def serve(authentication, cached):
+        handler = SuspensionMiddleware(SuspensionStatusView.as_view(authentication_classes=[authentication]))
+
+        def run_requests():
+            for _ in range(scale):
+                if not cached:
+                    invalidate_token(token.key)
+                response = handler(factory.get('/api/suspension-status/', HTTP_AUTHORIZATION=f'Token {token.key}'))
+                assert response.status_code == 200, response.status_code
+            return 0
+        return run_requests
+
+    return [
+        measure('uncached, middleware + TokenAuthentication', serve(TokenAuthentication, cached=False), requests=scale),
+        measure('cached identity shared with DRF', serve(CachedTokenAuthentication, cached=True), requests=scale),
+    ]
+
+
+@scenario('nearby_gardens', default_scale=100_000)
+def nearby_gardens(scale):
+    """
+    Radius search over gardens spread across Turkey: the haversine distance of
+    every row (no prefilter) against the bounding box answered by the
+    (latitude, longitude) index, for a 5 km and a 50 km radius.
+    """
+    import random
+    from .geo import distance_expression, nearby
+    from .models import Garden
+
+    rng = random.Random(16)
+    batch = []
+    for i in range(scale):
+        batch.append(Garden(name=f'Bench garden {i}', latitude=rng.uniform(36, 42), longitude=rng.uniform(26, 45)))
+        if len(batch) == 5000:
+            Garden.objects.bulk_create(batch)
+            batch = []
+    Garden.objects.bulk_create(batch)
+    lat, lon = 41.01, 28.97
+
+    def search(radius_km, prefilter):
+        def run_query():
+            if prefilter:
+                gardens = nearby(Garden.objects.all(), lat, lon, radius_km)
+            else:
+                gardens = (
+                    Garden.objects.annotate(distance_km=distance_expression(lat, lon))
+                    .filter(distance_km__lte=radius_km).order_by('distance_km', 'id')
+                )
+            return len(list(gardens.values_list('id', 'distance_km')[:100]))
+        return run_query
+
+    return [
+        measure('5 km, haversine over every row', search(5, prefilter=False)),
+        measure('5 km, bounding box + index', search(5, prefilter=True)),
+        measure('50 km, haversine over every row', search(50, prefilter=False)),
+        measure('50 km, bounding box + index', search(50, prefilter=True)),
+    ]
+
+
+@scenario('hot_filters', default_scale=1_000_000)
+def hot_filters(scale):
+    """
+    The query_audit hot queries over ``scale`` notifications and scale/10
+    posts, comments, tasks, memberships and reports: first with the indexes
+    of migration 0033, then with those indexes dropped (restored by the
+    rollback).
+    """
+    import random
+    from django.contrib.contenttypes.models import ContentType
+    from django.utils import timezone
+    from .models import Comment, ForumPost, Garden, GardenMembership, Notification, Report, Task
+    from .query_audit import HOT_FILTER_INDEXES, hot_queries
+
+    rng = random.Random(18)
+    now = timezone.now()
+    tenth = max(scale // 10, 1)
+
+    def insert(model, rows, batch_size=10000):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                model.objects.bulk_create(batch)
+                batch = []
+        model.objects.bulk_create(batch)
+
+    users = User.objects.bulk_create(User(username=f'bench_hot_{i}') for i in range(1000))
+    user_ids = [user.id for user in users]
+    gardens = Garden.objects.bulk_create(Garden(name=f'Bench hot garden {i}') for i in range(100))
+    garden_ids = [garden.id for garden in gardens]
+
+    insert(Notification, (
+        Notification(recipient_id=rng.choice(user_ids), message='Benchmark', category='TASK', read=rng.random() < 0.9)
+        for _ in range(scale)
+    ))
+    pairs = rng.sample([(u, g) for u in user_ids for g in garden_ids], min(tenth, len(user_ids) * len(garden_ids)))
+    insert(GardenMembership, (
+        GardenMembership(user_id=u, garden_id=g, role=rng.choice(['MANAGER', 'WORKER', 'WORKER']),
+                         status=rng.choice(['ACCEPTED', 'ACCEPTED', 'PENDING', 'REJECTED']))
+        for u, g in pairs
+    ))
+    insert(Task, (
+        Task(garden_id=rng.choice(garden_ids), title='Benchmark', assigned_by_id=rng.choice(user_ids),
+             status=rng.choice(['PENDING', 'ACCEPTED', 'IN_PROGRESS', 'COMPLETED', 'COMPLETED', 'CANCELLED']),
+             due_date=now + datetime.timedelta(hours=rng.uniform(-24 * 60, 24 * 60)))
+        for _ in range(tenth)
+    ))
+    insert(ForumPost, (
+        ForumPost(title='Benchmark', content='Benchmark', author_id=rng.choice(user_ids), is_deleted=rng.random() < 0.05)
+        for _ in range(tenth)
+    ))
+    post_ids = list(ForumPost.objects.order_by('-id').values_list('id', flat=True)[:1000])
+    insert(Comment, (
+        Comment(forum_post_id=rng.choice(post_ids), content='Benchmark', author_id=rng.choice(user_ids),
+                is_deleted=rng.random() < 0.05)
+        for _ in range(tenth)
+    ))
+    post_type = ContentType.objects.get_for_model(ForumPost)
+    insert(Report, (
+        Report(reporter_id=rng.choice(user_ids), content_type=post_type, object_id=rng.choice(post_ids),
+               reason='spam', reviewed=rng.random() < 0.99)
+        for _ in range(tenth)
+    ))
+
+    with connection.cursor() as cursor:
+        # Planner statistics for the fresh rows, as autovacuum / a periodic ANALYZE would provide
+        cursor.execute('ANALYZE')
+    queries = hot_queries(user_ids[0], garden_ids[0], post_ids[0])
+    results = [measure(f'{query.label} (indexed)', query.execute) for query in queries]
+    with connection.cursor() as cursor:
+        for names in HOT_FILTER_INDEXES.values():
+            for name in names:
+                cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+    results += [measure(f'{query.label} (no index)', query.execute) for query in queries]
+    return results
+
+
+@scenario('recurring_tasks', default_scale=100_000)
+def recurring_tasks(scale):
+    """
+    generate_recurring_tasks over ``scale`` daily templates with one assignee
+    each, two days behind: the run that catches them all up, then a rerun with
+    nothing left to create.
+    """
+    from django.utils import timezone
+    from .models import Garden, Task
+    from .recurrence import generate
+
+    now = timezone.now()
+    users = User.objects.bulk_create(User(username=f'bench_recurring_{i}') for i in range(100))
+    garden = Garden.objects.create(name='Bench recurring garden')
+    for start in range(0, scale, 5000):
+        Task.objects.bulk_create(
+            Task(garden=garden, title=f'Bench recurring {i}', assigned_by=users[i % len(users)],
+                 due_date=now - datetime.timedelta(days=2), is_recurring=True, recurrence_period='DAILY')
+            for i in range(start, min(start + 5000, scale))
+        )
+    templates = list(Task.objects.filter(is_recurring=True, garden=garden).values_list('id', flat=True))
+    Through = Task.assigned_to.through
+    Through.objects.bulk_create(
+        (Through(task_id=task_id, user_id=users[i % len(users)].id) for i, task_id in enumerate(templates)),
+        batch_size=5000,
+    )
+
+    return [
+        measure('first run (catch-up)', lambda: generate(now=now).created, repeat=1),
+        measure('rerun (nothing due)', lambda: generate(now=now).created, repeat=1),
+    ]
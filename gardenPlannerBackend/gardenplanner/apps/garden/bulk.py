@@ -0,0 +1,58 @@
+"""
+Bulk inserts that report which rows they actually wrote.
+
+bulk_create(ignore_conflicts=True) leaves the primary keys unset, so a caller
+cannot tell the rows it inserted from rows another process inserted first,
+and side effects applied per new row (notifications, counters) would be
+applied twice when two runs overlap. insert_new() runs INSERT ... ON CONFLICT
+DO NOTHING RETURNING id, which PostgreSQL and SQLite 3.35+ both support: only
+the rows this statement inserted come back. Databases without RETURNING
+insert the rows one by one, each in a savepoint.
+"""
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import AutoField
+from django.db.models.constants import OnConflict
+
+
+def insert_new(objs):
+    """
+    Insert ``objs``, instances of one model, skipping those that conflict with
+    an existing row. Returns the primary keys of the rows inserted. Like
+    bulk_create, this sends no save signals.
+    """
+    if not objs:
+        return []
+    model = objs[0]._meta.concrete_model
+    fields = [field for field in model._meta.concrete_fields if not isinstance(field, AutoField)]
+
+    if not connection.features.can_return_rows_from_bulk_insert:
+        pks = []
+        for obj in objs:
+            try:
+                with transaction.atomic():
+                    pks.extend(row[0] for row in _insert_returning_pks(model, [obj], fields))
+            except IntegrityError:
+                continue
+        return pks
+
+    batch_size = connection.ops.bulk_batch_size(fields, objs) or len(objs)
+    pks = []
+    for start in range(0, len(objs), batch_size):
+        rows = _insert_returning_pks(model, objs[start:start + batch_size], fields, on_conflict=OnConflict.IGNORE)
+        # A single conflicting row comes back as None
+        pks.extend(row[0] for row in rows if row is not None)
+    return pks
+
+
+def _insert_returning_pks(model, objs, fields, on_conflict=None):
+    """
+    The one call into Django's private Manager._insert(), which is what
+    bulk_create() uses underneath but, unlike bulk_create(), returns the rows
+    of an ON CONFLICT DO NOTHING insert. Its signature and the shape of the
+    returned rows (one tuple per inserted row, None for a single skipped row)
+    were checked against Django 4.2; re-check them when upgrading Django.
+    """
+    return model._base_manager._insert(
+        objs, fields=fields, returning_fields=[model._meta.pk], on_conflict=on_conflict,
+    )
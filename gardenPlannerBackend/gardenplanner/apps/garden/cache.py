@@ -0,0 +1,192 @@
+"""
+Cache layer for the garden app.
+
+The backend comes from ``CACHES`` in settings: Redis when REDIS_URL is set,
+process-local memory otherwise (tests and local development). Code caches
+through a ``Namespace``, whose keys look like
+``garden:<namespace>:v<version>:<key>``. ``Namespace.invalidate`` bumps the
+version, so every key in the namespace goes stale at once without scanning
+the backend. Hits and misses are counted per namespace in ``metrics``.
+``get_or_set(..., single_flight=True)`` makes concurrent misses for the same
+key in this process wait for one computation instead of each calling out.
+"""
+
+import hashlib
+import re
+import threading
+import time
+
+from django.core.cache import caches
+
+KEY_PREFIX = 'garden'
+_MISSING = object()
+# Characters memcached does not allow in keys (Django warns with CacheKeyWarning)
+_UNSAFE_KEY_CHARS = re.compile(r'[\x00-\x20\x7f]')
+
+
+class CacheMetrics:
+    """Per-namespace hit/miss counters for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, namespace, hit):
+        with self._lock:
+            counts = self._counts.setdefault(namespace, {'hits': 0, 'misses': 0})
+            counts['hits' if hit else 'misses'] += 1
+
+    def snapshot(self):
+        """{namespace: {'hits', 'misses', 'hit_rate'}} for everything recorded so far."""
+        with self._lock:
+            return {
+                namespace: {
+                    **counts,
+                    'hit_rate': round(counts['hits'] / (counts['hits'] + counts['misses']), 3),
+                }
+                for namespace, counts in self._counts.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counts = {}
+
+
+metrics = CacheMetrics()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs one call per key at a time; callers arriving meanwhile share its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, func):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func()
+        except Exception as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+
+_single_flight = SingleFlight()
+
+
+class Namespace:
+    """
+    A group of cache keys that share a default timeout and can be invalidated
+    together. Namespaces whose keys are only ever deleted one by one can pass
+    versioned=False to skip the version lookup on every access.
+    """
+
+    def __init__(self, name, timeout=300, versioned=True, alias='default'):
+        self.name = name
+        self.timeout = timeout
+        self.versioned = versioned
+        self.alias = alias
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    @property
+    def _version_key(self):
+        return f'{KEY_PREFIX}:{self.name}:version'
+
+    def version(self):
+        version = self.backend.get(self._version_key)
+        if version is None:
+            # Seed from the clock so a version evicted from the backend is not reused
+            self.backend.add(self._version_key, int(time.time() * 1000), None)
+            version = self.backend.get(self._version_key)
+        return version
+
+    def key(self, key):
+        """
+        The full backend key. Tuples are joined with ':'; long keys and keys with
+        whitespace or control characters (e.g. 'new york') are hashed.
+        """
+        if isinstance(key, (tuple, list)):
+            key = ':'.join(str(part) for part in key)
+        if len(key) > 200 or _UNSAFE_KEY_CHARS.search(key):
+            key = hashlib.sha256(key.encode()).hexdigest()
+        if not self.versioned:
+            return f'{KEY_PREFIX}:{self.name}:{key}'
+        return f'{KEY_PREFIX}:{self.name}:v{self.version()}:{key}'
+
+    def get(self, key, default=None):
+        value = self.backend.get(self.key(key), _MISSING)
+        metrics.record(self.name, value is not _MISSING)
+        return default if value is _MISSING else value
+
+    def set(self, key, value, timeout=_MISSING):
+        self.backend.set(self.key(key), value, self.timeout if timeout is _MISSING else timeout)
+
+    def get_or_set(self, key, compute, timeout=_MISSING, single_flight=False, cache_if=None):
+        """
+        Return the cached value, or compute, store and return it on a miss.
+        Values for which ``cache_if(value)`` is false (e.g. upstream errors) are
+        returned but not stored.
+        """
+        full_key = self.key(key)
+        value = self.backend.get(full_key, _MISSING)
+        metrics.record(self.name, value is not _MISSING)
+        if value is not _MISSING:
+            return value
+
+        def load():
+            # Another caller may have filled the key while this one waited
+            value = self.backend.get(full_key, _MISSING)
+            if value is _MISSING:
+                value = compute()
+                if cache_if is None or cache_if(value):
+                    self.backend.set(full_key, value, self.timeout if timeout is _MISSING else timeout)
+            return value
+
+        if single_flight:
+            return _single_flight.do(full_key, load)
+        return load()
+
+    def delete(self, key):
+        self.backend.delete(self.key(key))
+
+    def invalidate(self):
+        """Make every key in the namespace stale."""
+        if not self.versioned:
+            raise TypeError(f'Cache namespace {self.name!r} is not versioned')
+        try:
+            self.backend.incr(self._version_key)
+        except ValueError:
+            self.version()
+
+
+# Namespaces used across the app
+auth_tokens = Namespace('auth-token', timeout=60, versioned=False)
+badge_catalogue = Namespace('badges', timeout=60 * 60)
+geocodes = Namespace('geocode', timeout=30 * 24 * 60 * 60)
+weather = Namespace('weather', timeout=5 * 60)
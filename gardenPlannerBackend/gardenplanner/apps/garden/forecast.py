@@ -0,0 +1,124 @@
+"""
+Batched, concurrent forecast fetching from Open-Meteo.
+
+Open-Meteo accepts comma-separated latitude/longitude lists, so coordinates
+are sent OPEN_METEO_BATCH_SIZE at a time and the batches are fetched by a
+bounded thread pool over one shared requests.Session (pooled keep-alive
+connections). Only HTTP runs in the worker threads; callers do their
+database work with the results afterwards.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# WMO Weather Codes
+BAD_WEATHER_CODES = {
+    51: "Light Drizzle", 53: "Moderate Drizzle", 55: "Dense Drizzle",
+    61: "Slight Rain", 63: "Moderate Rain", 65: "Heavy Rain",
+    71: "Slight Snow", 73: "Moderate Snow", 75: "Heavy Snow",
+    80: "Slight Rain Showers", 81: "Moderate Rain Showers", 82: "Violent Rain Showers",
+    95: "Thunderstorm", 96: "Thunderstorm with Hail", 99: "Thunderstorm with Heavy Hail"
+}
+
+NO_DATA = (False, "No Data", 0, 0)
+ERROR = (False, "Error", 0, 0)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """The process-wide session, with a connection pool sized for the fetch concurrency."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=settings.WEATHER_FETCH_CONCURRENCY)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+    return _session
+
+
+def classify_forecast(daily_data):
+    """
+    Tomorrow's conditions from an Open-Meteo ``daily`` block.
+    Returns: (is_bad_weather, condition_text, high_temp, low_temp)
+    """
+    if not daily_data or 'weather_code' not in daily_data or len(daily_data['weather_code']) < 2:
+        return NO_DATA
+
+    tomorrow_code = daily_data['weather_code'][1]
+    high_temp = daily_data['temperature_2m_max'][1]
+    low_temp = daily_data['temperature_2m_min'][1]
+
+    if tomorrow_code in BAD_WEATHER_CODES:
+        return True, BAD_WEATHER_CODES[tomorrow_code], high_temp, low_temp
+    if low_temp < 0:
+        return True, "Freezing Temperatures", high_temp, low_temp
+    if high_temp > 35:
+        return True, "Extreme Heat", high_temp, low_temp
+    return False, "Good", high_temp, low_temp
+
+
+def _fetch_batch(session, batch):
+    params = {
+        'latitude': ','.join(str(lat) for lat, _ in batch),
+        'longitude': ','.join(str(lon) for _, lon in batch),
+        'daily': 'weather_code,temperature_2m_max,temperature_2m_min',
+        'timezone': 'auto',
+        'forecast_days': 2,
+    }
+    started = time.perf_counter()
+    try:
+        response = session.get(settings.OPEN_METEO_URL, params=params, timeout=settings.WEATHER_FETCH_TIMEOUT)
+        response.raise_for_status()
+        payload = response.json()
+        # A single location comes back as an object, several as a list in request order
+        locations = payload if isinstance(payload, list) else [payload]
+        if len(locations) != len(batch):
+            raise ValueError(f"expected {len(batch)} locations, got {len(locations)}")
+        results = {coords: classify_forecast(location.get('daily', {})) for coords, location in zip(batch, locations)}
+        ok = True
+    except Exception as e:
+        logger.error(f"Weather API failed for {len(batch)} coordinates starting at {batch[0]}: {e}")
+        results = {coords: ERROR for coords in batch}
+        ok = False
+    return results, ok, time.perf_counter() - started
+
+
+def fetch_forecasts(coordinates, concurrency=None, batch_size=None, session=None):
+    """
+    Fetch tomorrow's conditions for every (latitude, longitude) pair.
+
+    Returns:
+        tuple: ({coords: (is_bad, condition, high, low)}, stats) where stats has
+        the number of coordinates, requests and failed requests, the wall time
+        and the slowest request in seconds.
+    """
+    coordinates = list(dict.fromkeys(coordinates))
+    concurrency = concurrency or settings.WEATHER_FETCH_CONCURRENCY
+    batch_size = batch_size or settings.OPEN_METEO_BATCH_SIZE
+    session = session or get_session()
+    batches = [coordinates[start:start + batch_size] for start in range(0, len(coordinates), batch_size)]
+
+    results = {}
+    stats = {'coordinates': len(coordinates), 'requests': len(batches), 'failed_requests': 0,
+             'seconds': 0.0, 'slowest_request_seconds': 0.0}
+    started = time.perf_counter()
+    if batches:
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(batches))) as pool:
+            for batch_results, ok, elapsed in pool.map(lambda batch: _fetch_batch(session, batch), batches):
+                results.update(batch_results)
+                stats['failed_requests'] += 0 if ok else 1
+                stats['slowest_request_seconds'] = max(stats['slowest_request_seconds'], round(elapsed, 3))
+    stats['seconds'] = round(time.perf_counter() - started, 3)
+    return results, stats
@@ -0,0 +1,50 @@
+"""
+Like and comment counters stored on ForumPost and Comment.
+
+Signal handlers apply F() increments when a like is added or removed and when
+a comment is created, soft-deleted or restored, so reads use the columns and
+never aggregate. ``reconcile`` recomputes every counter from the source rows
+with the same definitions and repairs drift (reconcile_forum_counters).
+"""
+
+from django.db.models import F, OuterRef
+
+from .models import Comment, CommentLike, ForumPost, ForumPostLike, _count_subquery
+
+# (model, counter) -> (source queryset, field holding the counted object's id)
+COUNTER_SOURCES = {
+    (ForumPost, 'like_count'): (ForumPostLike.objects.all(), 'post'),
+    (ForumPost, 'comment_count'): (Comment.objects.filter(is_deleted=False), 'forum_post'),
+    (Comment, 'like_count'): (CommentLike.objects.all(), 'comment'),
+}
+
+
+def bump(model, pk, **deltas):
+    """Add deltas to the counters of one row in a single UPDATE."""
+    if pk is None:
+        return
+    model.objects.filter(pk=pk).update(**{field: F(field) + delta for field, delta in deltas.items()})
+
+
+def actual_count(model, field):
+    """Correlated subquery counting the source rows of ``field`` for each row of ``model``."""
+    source, link = COUNTER_SOURCES[(model, field)]
+    return _count_subquery(source.filter(**{link: OuterRef('pk')}), link)
+
+
+def reconcile(fix=False):
+    """
+    Compare every stored counter with a recount. Returns a list of
+    (model name, pk, field, stored, actual); with fix=True the drifted rows are
+    updated to the recounted values.
+    """
+    drift = []
+    for (model, field) in COUNTER_SOURCES:
+        drifted = model.objects.annotate(actual=actual_count(model, field)).exclude(**{field: F('actual')})
+        drift.extend(
+            (model.__name__, pk, field, stored, actual)
+            for pk, stored, actual in drifted.values_list('pk', field, 'actual').order_by('pk')
+        )
+        if fix:
+            drifted.update(**{field: actual_count(model, field)})
+    return drift
@@ -0,0 +1,70 @@
+"""
+Radius search over Garden latitude/longitude.
+
+``nearby`` first narrows the queryset to the bounding box around the point,
+which the (latitude, longitude) index answers with a range scan, then
+computes the haversine distance in the database for the remaining rows only,
+keeps those within the radius and orders them by distance. Django provides
+the trigonometric functions on PostgreSQL and SQLite alike.
+"""
+
+import math
+
+from django.db.models import F, Q
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def bounding_box(lat, lon, radius_km):
+    """
+    (min_lat, max_lat, min_lon, max_lon) enclosing every point within
+    radius_km of (lat, lon). Longitudes may fall outside [-180, 180] when the
+    box crosses the antimeridian; ``bounding_box_filter`` wraps them.
+    """
+    angular = radius_km / EARTH_RADIUS_KM
+    delta_lat = math.degrees(angular)
+    min_lat, max_lat = lat - delta_lat, lat + delta_lat
+    if min_lat <= -90 or max_lat >= 90:
+        # The circle contains a pole, so every longitude is in range
+        return max(min_lat, -90), min(max_lat, 90), -180, 180
+    delta_lon = math.degrees(math.asin(math.sin(angular) / math.cos(math.radians(lat))))
+    return min_lat, max_lat, lon - delta_lon, lon + delta_lon
+
+
+def bounding_box_filter(lat, lon, radius_km):
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    condition = Q(latitude__range=(min_lat, max_lat))
+    if max_lon - min_lon >= 360:
+        return condition
+    if min_lon < -180:
+        return condition & (Q(longitude__gte=min_lon + 360) | Q(longitude__lte=max_lon))
+    if max_lon > 180:
+        return condition & (Q(longitude__gte=min_lon) | Q(longitude__lte=max_lon - 360))
+    return condition & Q(longitude__range=(min_lon, max_lon))
+
+
+def distance_expression(lat, lon):
+    """Haversine distance in kilometres from (lat, lon) to each row's coordinates."""
+    half_dlat = (Radians(F('latitude')) - math.radians(lat)) / 2
+    half_dlon = (Radians(F('longitude')) - math.radians(lon)) / 2
+    a = Power(Sin(half_dlat), 2) + math.cos(math.radians(lat)) * Cos(Radians(F('latitude'))) * Power(Sin(half_dlon), 2)
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(a))
+
+
+def nearby(queryset, lat, lon, radius_km):
+    """Rows of queryset within radius_km of (lat, lon), nearest first, annotated with distance_km."""
+    return (
+        queryset.filter(bounding_box_filter(lat, lon, radius_km))
+        .annotate(distance_km=distance_expression(lat, lon))
+        .filter(distance_km__lte=radius_km)
+        .order_by('distance_km', 'id')
+    )
@@ -0,0 +1,136 @@
+"""
+Garden geocoding.
+
+Saving a garden never calls Nominatim. If its location is already in the
+GeocodeCache table, the coordinates are filled in right away. Otherwise the
+garden is flagged ``geocode_pending`` and the geocode_gardens job looks the
+location up later. The job respects Nominatim's usage policy: one request per
+NOMINATIM_MIN_INTERVAL seconds, an identifying User-Agent, and one lookup per
+distinct normalized location.
+"""
+
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+
+from .models import Garden, GeocodeCache
+from .utils import normalize_location
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'CommunityGardenApp/1.0'
+
+
+class GeocodingError(Exception):
+    """Nominatim could not be reached or answered with an error; retry later."""
+
+
+class RateLimiter:
+    """Blocks so that successive calls are at least ``min_interval`` seconds apart."""
+
+    def __init__(self, min_interval, clock=time.monotonic, sleep=time.sleep):
+        self.min_interval = min_interval
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._last = None
+
+    def wait(self):
+        with self._lock:
+            now = self.clock()
+            if self._last is not None and now - self._last < self.min_interval:
+                self.sleep(self.min_interval - (now - self._last))
+                now = self.clock()
+            self._last = now
+
+
+_limiter = None
+
+
+def get_limiter():
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter(settings.NOMINATIM_MIN_INTERVAL)
+    return _limiter
+
+
+def nominatim_lookup(location):
+    """(latitude, longitude) for the location, or None if Nominatim does not know it."""
+    try:
+        response = requests.get(
+            settings.NOMINATIM_URL,
+            params={'format': 'json', 'q': location, 'limit': 1},
+            headers={'User-Agent': USER_AGENT},
+            timeout=10,
+        )
+    except requests.RequestException as e:
+        raise GeocodingError(str(e)) from e
+    if response.status_code != 200:
+        raise GeocodingError(f"Nominatim returned {response.status_code}")
+    data = response.json()
+    if not data:
+        return None
+    return float(data[0]['lat']), float(data[0]['lon'])
+
+
+def apply_cached_geocode(garden):
+    """
+    Fill the garden's coordinates from the cache table before it is saved, or
+    flag it for the background job. Used by the Garden pre_save signal.
+    """
+    entry = GeocodeCache.objects.filter(query=normalize_location(garden.location)).first()
+    if entry is None:
+        garden.latitude = None
+        garden.longitude = None
+        garden.geocode_pending = True
+        return
+    garden.latitude = entry.latitude
+    garden.longitude = entry.longitude
+    garden.geocode_pending = False
+
+
+def geocode_pending_gardens(limit=None, lookup=None, limiter=None):
+    """
+    Look up the locations of gardens waiting for coordinates, one Nominatim
+    request per distinct normalized location, and store the results in the
+    cache table and on every garden with that location.
+    Returns counts of locations looked up, gardens updated and lookups failed.
+    """
+    lookup = lookup or nominatim_lookup
+    limiter = limiter or get_limiter()
+    stats = {'looked_up': 0, 'updated': 0, 'failed': 0}
+
+    by_query = {}
+    for garden_id, location in Garden.objects.filter(geocode_pending=True).values_list('id', 'location'):
+        by_query.setdefault(normalize_location(location or ''), []).append((garden_id, location))
+
+    for query, gardens in list(by_query.items())[:limit]:
+        if not query:
+            Garden.objects.filter(pk__in=[garden_id for garden_id, _ in gardens]).update(geocode_pending=False)
+            continue
+
+        entry = GeocodeCache.objects.filter(query=query).first()
+        if entry is None:
+            limiter.wait()
+            try:
+                coordinates = lookup(gardens[0][1])
+            except GeocodingError as e:
+                logger.warning(f"Geocoding '{query}' failed, will retry: {e}")
+                stats['failed'] += 1
+                continue
+            stats['looked_up'] += 1
+            latitude, longitude = coordinates or (None, None)
+            entry, _ = GeocodeCache.objects.update_or_create(
+                query=query, defaults={'latitude': latitude, 'longitude': longitude}
+            )
+
+        for garden_id, location in gardens:
+            # Skip gardens whose location changed again since they were read
+            stats['updated'] += Garden.objects.filter(
+                pk=garden_id, location=location, geocode_pending=True
+            ).update(latitude=entry.latitude, longitude=entry.longitude, geocode_pending=False)
+
+    return stats
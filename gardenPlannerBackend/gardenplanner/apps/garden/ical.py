@@ -0,0 +1,105 @@
+"""
+iCalendar (RFC 5545) rendering of garden calendar items.
+
+``stream_calendar`` yields the feed piece by piece, one VEVENT per item, so a
+StreamingHttpResponse can send it while the items are still being read.
+``ICalendarRenderer`` lets the feed endpoint accept ``Accept: text/calendar``.
+"""
+
+from datetime import timezone as dt_timezone
+
+from django.utils import timezone
+from rest_framework.renderers import BaseRenderer
+
+PRODID = '-//Garden Planner//Garden Calendar//EN'
+UID_DOMAIN = 'gardenplanner'
+
+
+def stream_calendar(name, items):
+    """Yield the lines of a VCALENDAR named ``name`` holding ``items``, CRLF-terminated."""
+    stamp = _format_time(timezone.now())
+    yield _lines(
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape(name)}',
+    )
+    for item in items:
+        yield _event(item, stamp)
+    yield _lines('END:VCALENDAR')
+
+
+class ICalendarRenderer(BaseRenderer):
+    """
+    Content negotiation for the iCalendar feed. The feed itself is a streamed
+    response and bypasses rendering; only error payloads pass through here and
+    are sent as their message.
+    """
+    media_type = 'text/calendar'
+    format = 'ics'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict):
+            data = data.get('detail') or data.get('error') or data
+        return str(data).encode(self.charset)
+
+
+def escape(text):
+    """TEXT value escaping: backslashes, separators and newlines."""
+    return (
+        text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n')
+    )
+
+
+def fold(line):
+    """Split a content line into 75-octet pieces joined by CRLF and a space."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    pieces = []
+    start = 0
+    limit = 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Never cut a multi-byte character in half
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        pieces.append(encoded[start:end].decode('utf-8'))
+        start = end
+        limit = 74  # continuation lines start with a space
+    return '\r\n '.join(pieces)
+
+
+def _event(item, stamp):
+    if item.virtual:
+        uid = f'task-{item.parent_task}-{_format_time(item.start)}@{UID_DOMAIN}'
+    else:
+        uid = f'{item.type}-{item.id}@{UID_DOMAIN}'
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}',
+        f'DTSTAMP:{stamp}',
+        f'DTSTART:{_format_time(item.start)}',
+        f'SUMMARY:{escape(item.title)}',
+        f'CATEGORIES:{item.type.upper()}',
+    ]
+    if item.description:
+        lines.append(f'DESCRIPTION:{escape(item.description)}')
+    if item.status == 'CANCELLED':
+        lines.append('STATUS:CANCELLED')
+    lines.append('END:VEVENT')
+    return _lines(*lines)
+
+
+def _lines(*lines):
+    return ''.join(f'{fold(line)}\r\n' for line in lines)
+
+
+def _format_time(moment):
+    return moment.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
@@ -0,0 +1,274 @@
+"""Helpers for serving DB-backed images by URL instead of inlining them as base64."""
+
+import base64
+import io
+
+from django.core import signing
+from django.db.models import Prefetch, Q
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from PIL import Image, UnidentifiedImageError
+
+from .models import Profile, GardenImage, ForumPostImage, CommentImage, ImageVariant
+
+
+class ImageSource:
+    """
+    Where the bytes, MIME type and version marker of one kind of image live.
+    ``deleted_fields`` are boolean lookups that hide the image when any is true,
+    e.g. the soft-deleted post it belongs to.
+    """
+
+    def __init__(self, model, data_field, mime_field, version_field, deleted_fields=()):
+        self.model = model
+        self.data_field = data_field
+        self.mime_field = mime_field
+        self.version_field = version_field
+        self.deleted_fields = deleted_fields
+
+    def visible(self):
+        """Queryset of the images that are not hidden by a soft delete."""
+        queryset = self.model.objects.all()
+        for field in self.deleted_fields:
+            queryset = queryset.exclude(**{field: True})
+        return queryset
+
+
+IMAGE_SOURCES = {
+    'garden': ImageSource(GardenImage, 'data', 'mime_type', 'created_at'),
+    'post': ImageSource(ForumPostImage, 'data', 'mime_type', 'created_at', ('post__is_deleted',)),
+    'comment': ImageSource(
+        CommentImage, 'data', 'mime_type', 'created_at', ('comment__is_deleted', 'comment__forum_post__is_deleted')
+    ),
+    'profile': ImageSource(Profile, 'profile_picture_data', 'profile_picture_mime_type', 'profile_picture_updated_at'),
+}
+
+# Query flag a client sends to receive image URLs instead of base64 data URIs
+IMAGE_FORMAT_PARAM = 'image_format'
+
+# Query flag selecting which size of each image the response should carry
+IMAGE_VARIANT_PARAM = 'image_variant'
+ORIGINAL_VARIANT = 'original'
+
+# Longest edge, in pixels, of each derived variant
+IMAGE_VARIANTS = {
+    'thumb': 128,
+    'medium': 640,
+}
+
+# Serializer context entry holding the stored variants loaded by prefetch_variants()
+_VARIANT_CACHE = 'image_variants'
+
+# Formats kept as-is when resizing; anything else is re-encoded as JPEG
+_PRESERVED_FORMATS = {'PNG': 'image/png', 'GIF': 'image/gif', 'WEBP': 'image/webp'}
+
+_SIGNATURE_SALT = 'gardenplanner.images'
+
+
+def wants_image_urls(context):
+    """True when the serializer context's request opted in with ?image_format=url."""
+    request = context.get('request') if context else None
+    if request is None or not hasattr(request, 'query_params'):
+        return False
+    return request.query_params.get(IMAGE_FORMAT_PARAM, '').lower() == 'url'
+
+
+def needs_image_data(context):
+    """True when the response inlines image bytes, so blob columns must be loaded."""
+    return not wants_image_urls(context)
+
+
+def with_image_data(queryset, context):
+    """Undefer the blob columns of an image or profile queryset when the response inlines them."""
+    return queryset.with_data() if needs_image_data(context) else queryset
+
+
+def garden_images_prefetch(context, lookup='images'):
+    """Prefetch of garden images carrying the bytes only when they are inlined."""
+    return Prefetch(lookup, queryset=with_image_data(GardenImage.objects.all(), context))
+
+
+def profiles_for_pictures(queryset, context):
+    """
+    Profile queryset ready for serializing pictures: with the bytes when they are
+    inlined, otherwise with only a has_profile_picture flag.
+    """
+    return queryset.with_data() if needs_image_data(context) else queryset.with_picture_flag()
+
+
+def requested_variant(context):
+    """Variant named by ?image_variant=, falling back to the original image."""
+    request = context.get('request') if context else None
+    if request is None or not hasattr(request, 'query_params'):
+        return ORIGINAL_VARIANT
+    variant = request.query_params.get(IMAGE_VARIANT_PARAM, '').lower()
+    return variant if variant in IMAGE_VARIANTS else ORIGINAL_VARIANT
+
+
+def is_known_variant(variant):
+    return variant == ORIGINAL_VARIANT or variant in IMAGE_VARIANTS
+
+
+def version_token(value):
+    """Compact, URL-safe marker for the image's version timestamp."""
+    return value.strftime('%Y%m%d%H%M%S%f') if value else '0'
+
+
+def image_signature(kind, pk, token):
+    """
+    Signature of one version of an image: a URL stops working once the image is
+    replaced. The signer is built per call so it uses the current SECRET_KEY.
+    """
+    return signing.Signer(salt=_SIGNATURE_SALT).signature(f'{kind}:{pk}:{token}')
+
+
+def is_valid_signature(kind, pk, token, signature):
+    return constant_time_compare(image_signature(kind, pk, token or ''), signature or '')
+
+
+def image_url(request, kind, pk, version, variant=ORIGINAL_VARIANT):
+    """
+    Signed URL of the binary image endpoint. Holding the URL is what grants access,
+    so it is only handed out by serializers that already expose the image.
+    """
+    path = reverse('garden:image', kwargs={'kind': kind, 'pk': pk})
+    token = version_token(version)
+    url = f'{path}?v={token}&sig={image_signature(kind, pk, token)}'
+    if variant != ORIGINAL_VARIANT:
+        url += f'&variant={variant}'
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def data_uri(data, mime_type):
+    b64 = base64.b64encode(data).decode('ascii')
+    return f"data:{mime_type};base64,{b64}"
+
+
+def render_variant(data, max_size):
+    """
+    Downscale image bytes so the longest edge is at most max_size.
+    Returns (bytes, mime_type, width, height), or None if Pillow cannot read the image.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        image_format = image.format
+        image.thumbnail((max_size, max_size))
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        return None
+
+    out = io.BytesIO()
+    if image_format in _PRESERVED_FORMATS:
+        image.save(out, format=image_format)
+        mime_type = _PRESERVED_FORMATS[image_format]
+    else:
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        image.save(out, format='JPEG', quality=85, optimize=True)
+        mime_type = 'image/jpeg'
+    return out.getvalue(), mime_type, image.width, image.height
+
+
+def variant_bytes(kind, pk, variant, version, load_source, cache=None):
+    """
+    (bytes, mime_type) of an image variant. Stored variants are reused while the
+    source version matches; otherwise the source is loaded through load_source(),
+    which returns (bytes, mime_type), resized and stored. Images Pillow cannot
+    read, or that do not get smaller, are stored as they are, so they are not
+    decoded again on every request. ``cache`` holds the rows already loaded by
+    prefetch_variants().
+    """
+    token = version_token(version)
+    if cache is not None and (kind, pk) in cache:
+        stored = cache[(kind, pk)]
+    else:
+        stored = ImageVariant.objects.filter(
+            kind=kind, object_id=pk, variant=variant, version=token
+        ).values_list('data', 'mime_type').first()
+    if stored is not None:
+        return bytes(stored[0]), stored[1]
+
+    data, mime_type = load_source()
+    data = bytes(data)
+    rendered = render_variant(data, IMAGE_VARIANTS[variant])
+    if rendered is None or len(rendered[0]) >= len(data):
+        rendered = data, mime_type, 0, 0
+
+    data, mime_type, width, height = rendered
+    ImageVariant.objects.update_or_create(
+        kind=kind, object_id=pk, variant=variant,
+        defaults={'version': token, 'data': data, 'mime_type': mime_type, 'width': width, 'height': height},
+    )
+    if cache is not None:
+        cache[(kind, pk)] = (data, mime_type)
+    return data, mime_type
+
+
+def prefetch_variants(context, images):
+    """
+    Load the stored variants of a whole page of images in one query, so that
+    image_value() does not look them up one image at a time. ``images`` are
+    (kind, obj) pairs; ones already loaded are skipped.
+    """
+    variant = requested_variant(context)
+    if context is None or variant == ORIGINAL_VARIANT or wants_image_urls(context):
+        return
+    cache = context.setdefault(_VARIANT_CACHE, {})
+    tokens = {}
+    for kind, obj in images:
+        if obj is not None and (kind, obj.pk) not in cache:
+            tokens[(kind, obj.pk)] = version_token(getattr(obj, IMAGE_SOURCES[kind].version_field))
+    if not tokens:
+        return
+
+    ids = {}
+    for kind, pk in tokens:
+        ids.setdefault(kind, []).append(pk)
+    condition = Q()
+    for kind, pks in ids.items():
+        condition |= Q(kind=kind, object_id__in=pks)
+    rows = ImageVariant.objects.filter(condition, variant=variant).values_list(
+        'kind', 'object_id', 'version', 'data', 'mime_type'
+    )
+    for key in tokens:
+        cache[key] = None
+    for kind, pk, version, data, mime_type in rows:
+        # Rows of an older version of the image are re-rendered
+        if tokens[(kind, pk)] == version:
+            cache[(kind, pk)] = (data, mime_type)
+
+
+def image_value(context, kind, obj):
+    """
+    Serialized form of an image: a URL when requested, otherwise a base64 data URI,
+    in the size selected by ?image_variant=.
+    """
+    source = IMAGE_SOURCES[kind]
+    variant = requested_variant(context)
+    version = getattr(obj, source.version_field)
+    if wants_image_urls(context):
+        return image_url(context.get('request'), kind, obj.pk, version, variant)
+    data = getattr(obj, source.data_field)
+    if data is None:
+        return None
+    mime_type = getattr(obj, source.mime_field) or 'image/jpeg'
+    if variant != ORIGINAL_VARIANT:
+        data, mime_type = variant_bytes(
+            kind, obj.pk, variant, version, lambda: (data, mime_type), (context or {}).get(_VARIANT_CACHE)
+        )
+    return data_uri(data, mime_type)
+
+
+def profile_picture_value(context, profile, has_picture=None):
+    """
+    Serialized profile picture, or None when the profile has none. ``has_picture``
+    (or an annotated has_profile_picture) answers that without loading the bytes.
+    """
+    if profile is None:
+        return None
+    if has_picture is None:
+        has_picture = getattr(profile, 'has_profile_picture', None)
+    if has_picture is None:
+        has_picture = bool(profile.profile_picture_data)
+    if not has_picture:
+        return None
+    return image_value(context, 'profile', profile)
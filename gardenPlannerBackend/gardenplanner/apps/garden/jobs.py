@@ -0,0 +1,110 @@
+"""
+Run-once execution and history of the run_scheduler jobs.
+
+Every scheduler process (one per backend replica, or a dedicated scheduler
+service) fires the same cron jobs. Before running a job, a process claims its
+scheduled slot by inserting a JobRun row, unique per (job_id, scheduled_for):
+the first insert wins on SQLite and PostgreSQL alike, and every other process
+gets an IntegrityError and skips that slot. The claiming row then records the
+worker, the duration, the rows the job reports and any error.
+
+A slot is also skipped while an earlier run of the same job is still RUNNING,
+so a job that outlasts its interval never runs twice at once. The RUNNING row
+acts as a lease: after SCHEDULER_JOB_LEASE_SECONDS it is taken for a worker
+that died mid-run, marked failed, and the job runs again.
+
+APScheduler does not tell a job which fire time it is running for, so the slot
+is derived from the trigger: the first fire time at most
+SCHEDULER_MISFIRE_GRACE_SECONDS before now. The scheduler never starts a job
+later than that grace time, so all processes agree on the slot as long as a
+trigger fires less often than the grace time.
+"""
+
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import JobRun, JobRunStatus
+
+logger = logging.getLogger(__name__)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def scheduled_slot(trigger, now=None):
+    """
+    The fire time of ``trigger`` a run starting at ``now`` belongs to. Runs
+    outside any fire time (manual runs) get the current minute.
+    """
+    now = now or timezone.now()
+    grace = timedelta(seconds=settings.SCHEDULER_MISFIRE_GRACE_SECONDS)
+    slot = trigger.get_next_fire_time(None, now - grace) if trigger is not None else None
+    if slot is None or slot > now:
+        return now.replace(second=0, microsecond=0)
+    return slot
+
+
+def run_once(job_id, func, scheduled_for):
+    """
+    Run ``func`` for the slot unless another process has claimed it or an
+    earlier run of the job is still going. An int returned by ``func`` is
+    recorded as the run's row count. Returns the JobRun, or None if the slot
+    was skipped. Errors are logged and recorded, not raised.
+    """
+    if _still_running(job_id, scheduled_for):
+        logger.warning("Scheduler: %s for %s skipped, the previous run is still going", job_id, scheduled_for)
+        return None
+    try:
+        with transaction.atomic():
+            run = JobRun.objects.create(job_id=job_id, scheduled_for=scheduled_for, worker=worker_name())
+    except IntegrityError:
+        logger.info("Scheduler: %s for %s already claimed by another worker", job_id, scheduled_for)
+        return None
+
+    started = time.monotonic()
+    try:
+        result = func()
+    except Exception:
+        logger.exception("Scheduler: %s failed", job_id)
+        run.status = JobRunStatus.FAILED
+        run.error = traceback.format_exc()
+    else:
+        run.status = JobRunStatus.SUCCEEDED
+        run.rows = result if isinstance(result, int) else None
+    run.finished_at = timezone.now()
+    run.duration_seconds = round(time.monotonic() - started, 3)
+    run.save(update_fields=['status', 'rows', 'error', 'finished_at', 'duration_seconds'])
+    logger.info(
+        "Scheduler: %s %s in %.3fs (%s rows)", job_id, run.status.lower(), run.duration_seconds, run.rows
+    )
+    return run
+
+
+def _still_running(job_id, scheduled_for):
+    """
+    True while a run of ``job_id`` for another slot holds its lease. Expired
+    leases are marked failed.
+    """
+    now = timezone.now()
+    expired = now - timedelta(seconds=settings.SCHEDULER_JOB_LEASE_SECONDS)
+    running = JobRun.objects.filter(job_id=job_id, status=JobRunStatus.RUNNING).exclude(scheduled_for=scheduled_for)
+    running.filter(started_at__lt=expired).update(
+        status=JobRunStatus.FAILED, finished_at=now, error='Lease expired: the worker stopped without recording the run.',
+    )
+    return running.filter(started_at__gte=expired).exists()
+
+
+def purge_job_runs(older_than=None):
+    """Delete the history of runs started more than SCHEDULER_JOB_RUN_RETENTION_DAYS ago."""
+    older_than = older_than or timedelta(days=settings.SCHEDULER_JOB_RUN_RETENTION_DAYS)
+    deleted, _ = JobRun.objects.filter(started_at__lt=timezone.now() - older_than).delete()
+    return deleted
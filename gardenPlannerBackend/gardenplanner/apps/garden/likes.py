@@ -0,0 +1,102 @@
+"""
+Race-free like toggling for forum posts and comments.
+
+On PostgreSQL the whole toggle is one statement: a data-modifying CTE deletes
+the user's like if it exists, otherwise inserts it with ON CONFLICT DO
+NOTHING, and applies the resulting +1/-1 to the target's like_count and to
+the author's UserStats counter, returning the new state and count. The
+signal handlers that maintain those counters for ORM writes do not fire for
+it, so like notifications are sent explicitly. Concurrent double taps cannot
+raise IntegrityError: a conflicting insert waits for the other transaction
+and does nothing.
+
+Other databases (SQLite in tests) run the same steps through the ORM inside
+one transaction, with the insert in a savepoint; the signals maintain the
+counters there.
+"""
+
+from django.db import IntegrityError, connection, transaction
+from django.http import Http404
+from django.utils import timezone
+
+from .models import Comment, CommentLike, ForumPost, ForumPostLike, UserStats
+from .signals import new_comment_like_notification, new_post_like_notification
+
+# like model -> (liked model, foreign key to it, UserStats counter of its author, notification)
+LIKE_TARGETS = {
+    ForumPostLike: (ForumPost, 'post', 'post_likes_received', new_post_like_notification),
+    CommentLike: (Comment, 'comment', 'comment_likes_received', new_comment_like_notification),
+}
+
+_TOGGLE_SQL = """
+WITH target AS (
+    SELECT id, author_id FROM {target_table} WHERE id = %(target_id)s AND NOT is_deleted
+), deleted AS (
+    DELETE FROM {like_table} WHERE user_id = %(user_id)s AND {fk_column} = (SELECT id FROM target)
+    RETURNING id
+), inserted AS (
+    INSERT INTO {like_table} (user_id, {fk_column}, created_at)
+    SELECT %(user_id)s, id, %(now)s FROM target WHERE NOT EXISTS (SELECT 1 FROM deleted)
+    ON CONFLICT (user_id, {fk_column}) DO NOTHING
+    RETURNING id
+), delta AS (
+    SELECT (SELECT count(*) FROM inserted) - (SELECT count(*) FROM deleted) AS value
+), counter AS (
+    UPDATE {target_table} SET like_count = like_count + (SELECT value FROM delta)
+    WHERE id = (SELECT id FROM target)
+    RETURNING like_count
+), author_stats AS (
+    UPDATE {stats_table} SET {stats_column} = {stats_column} + (SELECT value FROM delta)
+    WHERE user_id = (SELECT author_id FROM target) AND (SELECT value FROM delta) <> 0
+)
+SELECT (SELECT like_count FROM counter), NOT EXISTS (SELECT 1 FROM deleted), (SELECT id FROM inserted)
+"""
+
+
+def toggle_like(like_model, user, target_id):
+    """
+    Like the post or comment if ``user`` has not liked it yet, unlike it
+    otherwise. Returns (is_liked, like_count) after the toggle. Raises Http404
+    for missing or soft-deleted targets.
+    """
+    if connection.vendor == 'postgresql':
+        return _toggle_postgres(like_model, user, target_id)
+    return _toggle_orm(like_model, user, target_id)
+
+
+def _toggle_postgres(like_model, user, target_id):
+    target_model, fk, stats_field, notify = LIKE_TARGETS[like_model]
+    quote = connection.ops.quote_name
+    sql = _TOGGLE_SQL.format(
+        target_table=quote(target_model._meta.db_table),
+        like_table=quote(like_model._meta.db_table),
+        fk_column=quote(like_model._meta.get_field(fk).column),
+        stats_table=quote(UserStats._meta.db_table),
+        stats_column=quote(stats_field),
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(sql, {'target_id': target_id, 'user_id': user.pk, 'now': timezone.now()})
+        like_count, is_liked, inserted_id = cursor.fetchone()
+    if like_count is None:
+        raise Http404
+    if inserted_id is not None:
+        notify(sender=like_model, instance=like_model(pk=inserted_id, user=user, **{f'{fk}_id': target_id}), created=True)
+    return is_liked, like_count
+
+
+def _toggle_orm(like_model, user, target_id):
+    target_model, fk, _, _ = LIKE_TARGETS[like_model]
+    with transaction.atomic():
+        if not target_model.objects.filter(pk=target_id, is_deleted=False).exists():
+            raise Http404
+        likes = like_model.objects.filter(user=user, **{f'{fk}_id': target_id})
+        deleted, _ = likes.delete()
+        if not deleted:
+            try:
+                with transaction.atomic():
+                    like_model.objects.create(user=user, **{f'{fk}_id': target_id})
+            except IntegrityError:
+                # A concurrent request liked it first
+                pass
+        like_count = target_model.objects.filter(pk=target_id).values_list('like_count', flat=True).get()
+    return not deleted, like_count
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from gardenplanner.apps.garden.benchmarks import SCENARIOS, run
+
+
+class Command(BaseCommand):
+    help = 'Run a performance benchmark scenario on throwaway data that is rolled back afterwards'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario',
+            required=True,
+            choices=sorted(SCENARIOS),
+            help='Benchmark scenario to run',
+        )
+        parser.add_argument(
+            '--scale',
+            type=int,
+            default=None,
+            help='Number of rows to seed (defaults to the scenario default)',
+        )
+
+    def handle(self, *args, **options):
+        results = run(options['scenario'], options['scale'])
+
+        self.stdout.write(
+            f"{'scenario step':<48} {'ms':>10} {'peak KB':>10} {'queries':>8} {'bytes':>12} {'req/s':>8}"
+        )
+        for row in results:
+            rps = row['rps'] if row['rps'] is not None else '-'
+            self.stdout.write(
+                f"{row['label']:<48} {row['ms']:>10} {row['peak_kb']:>10} {row['queries']:>8} {row['bytes']:>12} {rps:>8}"
+            )
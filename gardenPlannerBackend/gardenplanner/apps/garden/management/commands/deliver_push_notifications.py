@@ -0,0 +1,64 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from gardenplanner.apps.garden.push import deliver_pending, drain, purge_sent
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued push notifications from the outbox, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Deliver everything that is currently due, then exit',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of messages claimed per batch',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep when the outbox is empty',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        if options['once']:
+            stats = drain(batch_size)
+            purged = purge_sent()
+            self.stdout.write(self.style.SUCCESS(
+                f"Sent {stats['sent']}, retrying {stats['retried']}, dead {stats['dead']}, purged {purged}"
+            ))
+            return
+
+        self.stdout.write('Push notification worker started.')
+        last_purge = 0.0
+        try:
+            while True:
+                close_old_connections()
+                try:
+                    stats = deliver_pending(batch_size)
+                    if time.monotonic() - last_purge > 3600:
+                        purge_sent()
+                        last_purge = time.monotonic()
+                except Exception:
+                    # Keep the worker alive through transient database errors
+                    logger.exception("Push worker: delivery run failed")
+                    stats = {'sent': 0, 'retried': 0, 'dead': 0}
+                if any(stats.values()):
+                    logger.info("Push worker: %s", stats)
+                if stats['sent'] + stats['retried'] + stats['dead'] < batch_size:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Push notification worker stopped.')
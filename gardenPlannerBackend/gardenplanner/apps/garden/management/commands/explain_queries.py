@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from gardenplanner.apps.garden.models import ForumPost, GardenMembership
+from gardenplanner.apps.garden.query_audit import hot_queries
+
+
+class Command(BaseCommand):
+    help = 'Print EXPLAIN plans for the hottest endpoint and job queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, default=None, help='User id to plan for (defaults to a member)')
+        parser.add_argument('--garden', type=int, default=None, help='Garden id to plan for (defaults to that member\'s garden)')
+        parser.add_argument('--post', type=int, default=None, help='Forum post id to plan for (defaults to the newest)')
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='PostgreSQL only: run the queries and include actual timings (EXPLAIN ANALYZE)',
+        )
+
+    def handle(self, *args, **options):
+        membership = GardenMembership.objects.order_by('id').first()
+        user_id = options['user'] or (membership.user_id if membership else 0)
+        garden_id = options['garden'] or (membership.garden_id if membership else 0)
+        post_id = options['post'] or ForumPost.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+        explain_options = {}
+        if options['analyze']:
+            if connection.vendor != 'postgresql':
+                self.stdout.write(self.style.WARNING('--analyze is only supported on PostgreSQL; ignoring it.'))
+            else:
+                explain_options = {'analyze': True, 'buffers': True}
+
+        self.stdout.write(f'Plans on {connection.vendor} for user={user_id} garden={garden_id} post={post_id}')
+        for query in hot_queries(user_id, garden_id, post_id):
+            self.stdout.write('')
+            self.stdout.write(self.style.MIGRATE_HEADING(query.label))
+            self.stdout.write(query.explain(**explain_options))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from gardenplanner.apps.garden.geocoding import geocode_pending_gardens
+
+
+class Command(BaseCommand):
+    help = 'Fill in coordinates for gardens whose location has not been geocoded yet (rate-limited Nominatim lookups)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Maximum number of distinct locations to process in this run',
+        )
+
+    def handle(self, *args, **options):
+        stats = geocode_pending_gardens(limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Looked up {stats['looked_up']} locations, updated {stats['updated']} gardens, {stats['failed']} failed"
+        ))
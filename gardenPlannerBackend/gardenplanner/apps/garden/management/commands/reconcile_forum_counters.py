@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from gardenplanner.apps.garden.forum_counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recount forum post and comment like/comment counters and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Overwrite drifted counters with the recounted values',
+        )
+
+    def handle(self, *args, **options):
+        drift = reconcile(fix=options['fix'])
+
+        for model, pk, field, stored, actual in drift:
+            self.stdout.write(
+                self.style.WARNING(f'{model} {pk}: {field} stored={stored} actual={actual}')
+            )
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Forum counters are consistent.'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Fixed {len(drift)} counters.'))
+        else:
+            self.stdout.write(f'Found {len(drift)} drifted counters. Run with --fix to repair.')
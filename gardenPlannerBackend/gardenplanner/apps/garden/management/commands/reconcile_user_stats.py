@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from gardenplanner.apps.garden.stats import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recompute user activity counters from the source tables and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Overwrite drifted counters with the recomputed values',
+        )
+
+    def handle(self, *args, **options):
+        drift = reconcile(fix=options['fix'])
+
+        for user_id, field, stored, actual in drift:
+            self.stdout.write(
+                self.style.WARNING(f'User {user_id}: {field} stored={stored} actual={actual}')
+            )
+
+        users = len({user_id for user_id, *_ in drift})
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('User stats are consistent.'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Fixed {len(drift)} counters for {users} users.'))
+        else:
+            self.stdout.write(f'Found {len(drift)} drifted counters for {users} users. Run with --fix to repair.')
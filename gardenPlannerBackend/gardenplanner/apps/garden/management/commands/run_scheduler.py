@@ -1,97 +1,140 @@
 import logging
+import signal
+
 from django.conf import settings
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
-from django.core.management.base import BaseCommand
-from django_apscheduler.jobstores import DjangoJobStore
-from django_apscheduler.models import DjangoJobExecution
+from django.core.management.base import BaseCommand, CommandError
 from django_apscheduler import util
 
+from gardenplanner.apps.garden import recurrence
+from gardenplanner.apps.garden.forum_counters import reconcile as reconcile_forum_counters
+from gardenplanner.apps.garden.geocoding import geocode_pending_gardens
+from gardenplanner.apps.garden.jobs import purge_job_runs, run_once, scheduled_slot
+from gardenplanner.apps.garden.stats import reconcile as reconcile_user_stats
+
 # --- IMPORT THE WORKER FUNCTION ---
 from .send_deadline_reminders import deadline_reminder_sender
-from django.core.management import call_command
 from .send_weather_reminders import check_weather_and_notify
 
 logger = logging.getLogger(__name__)
 
+# Each job returns the number of rows it created or changed, recorded on its JobRun
+
 def deadline_reminders_job():
     """Wraps the logic function for the scheduler."""
-    logger.info("Scheduler: Running deadline reminders...")
     result = deadline_reminder_sender()
     logger.info(f"Scheduler: {result}")
+    return result.sent
 
 def weather_reminders_job():
     """Sends weather reminders to users."""
-    logger.info("Scheduler: Running weather reminders...")
     result = check_weather_and_notify()
     logger.info(f"Scheduler: {result}")
+    return result['alerts']
 
 def generate_recurring_tasks_job():
-    """Wraps the recurring task generation command for the scheduler."""
-    print("Scheduler: Generating recurring task instances...")
-    try:
-        call_command('generate_recurring_tasks')
-        print("Scheduler: Recurring task generation completed.")
-    except Exception as e:
-        print(f"Scheduler: Error generating recurring tasks: {e}")
+    """Generates the due recurring task instances."""
+    result = recurrence.generate()
+    logger.info(f"Scheduler: {result}")
+    return result.created
+
+def geocode_gardens_job():
+    """Geocodes gardens saved with a new location."""
+    # At most 45 Nominatim lookups per run (1 req/s), so a run ends well within its minute
+    return geocode_pending_gardens(limit=45)['updated']
+
+def reconcile_user_stats_job():
+    """Repairs any drift between the user stats counters and the source tables."""
+    return len(reconcile_user_stats(fix=True))
+
+def reconcile_forum_counters_job():
+    """Repairs any drift between the forum like/comment counters and the source tables."""
+    return len(reconcile_forum_counters(fix=True))
+
+def purge_job_runs_job():
+    """Deletes old job run history from the database."""
+    return purge_job_runs()
+
+
+# (job id, function, cron fields)
+JOBS = [
+    # Run every day at 08:15
+    ('send_deadline_reminders', deadline_reminders_job, {'hour': '08', 'minute': '15'}),
+    # Run every day at 21:15
+    ('weather_reminders', weather_reminders_job, {'hour': '21', 'minute': '15'}),
+    ('generate_recurring_tasks', generate_recurring_tasks_job, {'hour': '08', 'minute': '00'}),
+    # Every minute
+    ('geocode_gardens', geocode_gardens_job, {'minute': '*'}),
+    # Run every night at 03:30 and 03:45
+    ('reconcile_user_stats', reconcile_user_stats_job, {'hour': '03', 'minute': '30'}),
+    ('reconcile_forum_counters', reconcile_forum_counters_job, {'hour': '03', 'minute': '45'}),
+    # Clean up old run history every week
+    ('purge_job_runs', purge_job_runs_job, {'day_of_week': 'mon', 'hour': '00', 'minute': '00'}),
+]
+
 
 @util.close_old_connections
-def delete_old_job_executions(max_age=604_800):
-    """Deletes old execution logs from the database."""
-    DjangoJobExecution.objects.delete_old_job_executions(max_age)
+def run_scheduled_job(job_id, func, trigger):
+    """Runs a job for its current fire time, unless another scheduler process already did."""
+    return run_once(job_id, func, scheduled_slot(trigger))
+
 
 class Command(BaseCommand):
-    help = "Runs the APScheduler."
+    help = (
+        "Runs the APScheduler worker. Any number of workers can run side by side: "
+        "each cron job runs once per fire time across all of them."
+    )
 
-    def handle(self, *args, **options):
-        scheduler = BlockingScheduler(timezone=settings.TIME_ZONE)
-        scheduler.add_jobstore(DjangoJobStore(), "default")
-
-        # --- SCHEDULE THE JOB ---
-        # Run every day at 08:15
-        scheduler.add_job(
-            deadline_reminders_job,
-            trigger=CronTrigger(hour="08", minute="15"),
-            # trigger=CronTrigger(minute="*"), # every minute for testing the feature
-            id="send_deadline_reminders",
-            max_instances=1,
-            replace_existing=True,
-        )
-        logger.info("Added job 'send_deadline_reminders'.")
-
-        # Run every day at 21:15
-        scheduler.add_job(
-            weather_reminders_job,
-            trigger=CronTrigger(hour="21", minute="15"),
-            # trigger=CronTrigger(minute="*"), # for testing
-            id="weather_reminders",
-            max_instances=1,
-            replace_existing=True,
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--run-job',
+            choices=[job_id for job_id, _, _ in JOBS],
+            help='Run one job now (once per minute across all workers), then exit',
         )
-        logger.info("Added job 'weather_reminders'.")
-
-        scheduler.add_job(
-            generate_recurring_tasks_job,
-            trigger=CronTrigger(hour="08", minute="00"),
-            # trigger=CronTrigger(minute="*"), # for testing
-            id="generate_recurring_tasks",
-            max_instances=1,
-            replace_existing=True,
-        )
-        print("Added job 'generate_recurring_tasks'.")
-
-        # Clean up old logs every week
-        scheduler.add_job(
-            delete_old_job_executions,
-            trigger=CronTrigger(day_of_week="mon", hour="00", minute="00"),
-            id="delete_old_job_executions",
-            max_instances=1,
-            replace_existing=True,
+
+    def handle(self, *args, **options):
+        if options['run_job']:
+            self.run_job(options['run_job'])
+            return
+
+        scheduler = BlockingScheduler(
+            timezone=settings.TIME_ZONE,
+            job_defaults={
+                'max_instances': 1,
+                'coalesce': True,
+                'misfire_grace_time': settings.SCHEDULER_MISFIRE_GRACE_SECONDS,
+            },
         )
+        for job_id, func, fields in JOBS:
+            trigger = CronTrigger(**fields)
+            scheduler.add_job(run_scheduled_job, trigger=trigger, args=[job_id, func, trigger], id=job_id)
+            logger.info(f"Added job '{job_id}'.")
+
+        def stop(signum, frame):
+            # A second signal while shutting down must not raise SchedulerNotRunningError
+            if not scheduler.running:
+                return
+            # Let running jobs finish and record their run before exiting
+            logger.info("Stopping scheduler (signal %s)...", signum)
+            scheduler.shutdown(wait=True)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        logger.info("Starting scheduler...")
+        self.stdout.write('Scheduler worker started.')
+        scheduler.start()
+        self.stdout.write('Scheduler worker stopped.')
 
-        try:
-            logger.info("Starting scheduler...")
-            scheduler.start()
-        except KeyboardInterrupt:
-            logger.info("Stopping scheduler...")
-            scheduler.shutdown()
\ No newline at end of file
+    def run_job(self, job_id):
+        func = {job: func for job, func, _ in JOBS}[job_id]
+        run = run_scheduled_job(job_id, func, None)
+        if run is None:
+            self.stdout.write(f"'{job_id}' already ran this minute or is still running, skipped.")
+        elif run.status == 'FAILED':
+            raise CommandError(f"'{job_id}' failed:\n{run.error}")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"'{job_id}' finished in {run.duration_seconds}s ({run.rows} rows)"
+            ))
@@ -0,0 +1,92 @@
+"""
+Request-scoped garden membership lookups.
+
+Permission classes, view querysets and serializers all need to know which
+gardens the requesting user belongs to and in what role. ``get_memberships``
+returns one resolver per request that loads the user's memberships with a
+single query on first use and answers every later check from memory.
+"""
+
+from .models import Garden, GardenMembership
+
+ACCEPTED = 'ACCEPTED'
+MANAGER = 'MANAGER'
+
+
+class MembershipResolver:
+    """The requesting user's garden memberships, loaded once."""
+
+    def __init__(self, user):
+        self.user = user
+        self._memberships = None
+        self._assigned_task_ids = {}
+
+    @property
+    def is_admin(self):
+        profile = getattr(self.user, 'profile', None)
+        return profile is not None and profile.role == 'ADMIN'
+
+    def _load(self):
+        if self._memberships is None:
+            if not self.user.is_authenticated:
+                self._memberships = {}
+            else:
+                self._memberships = {
+                    garden_id: (role, status)
+                    for garden_id, role, status in GardenMembership.objects.filter(user=self.user)
+                    .values_list('garden_id', 'role', 'status')
+                }
+        return self._memberships
+
+    def role(self, garden_id, accepted_only=True):
+        """The user's role in the garden, or None if they are not a (accepted) member."""
+        role, status = self._load().get(garden_id, (None, None))
+        if accepted_only and status != ACCEPTED:
+            return None
+        return role
+
+    def has_membership(self, garden_id):
+        """True for any membership, including pending and rejected requests."""
+        return garden_id in self._load()
+
+    def is_member(self, garden_id):
+        return self.role(garden_id) is not None
+
+    def is_manager(self, garden_id):
+        return self.role(garden_id) == MANAGER
+
+    def garden_ids(self):
+        """Ids of the gardens the user is an accepted member of."""
+        return [garden_id for garden_id, (_, status) in self._load().items() if status == ACCEPTED]
+
+    def is_task_assignee(self, task):
+        if task.pk not in self._assigned_task_ids:
+            self._assigned_task_ids[task.pk] = (
+                self.user.is_authenticated and task.assigned_to.filter(pk=self.user.pk).exists()
+            )
+        return self._assigned_task_ids[task.pk]
+
+    def invalidate(self):
+        """Forget loaded state after the request changed the user's memberships or assignments."""
+        self._memberships = None
+        self._assigned_task_ids = {}
+
+
+def get_memberships(request):
+    """
+    The membership resolver for this request. It is stored on the underlying
+    HttpRequest so DRF views, permissions and serializers share one instance.
+    """
+    http_request = getattr(request, '_request', request)
+    resolver = getattr(http_request, '_garden_memberships', None)
+    if resolver is None or resolver.user != request.user:
+        resolver = MembershipResolver(request.user)
+        http_request._garden_memberships = resolver
+    return resolver
+
+
+def object_garden_id(obj):
+    """The garden an object belongs to, for gardens and garden-scoped models."""
+    if isinstance(obj, Garden):
+        return obj.id
+    return getattr(obj, 'garden_id', None)
@@ -1,7 +1,9 @@
 
 from django.http import JsonResponse
 from django.utils import timezone
-from rest_framework.authtoken.models import Token
+
+from .authentication import resolve_token
+from .models import Profile
 
 
 class SuspensionMiddleware:
@@ -16,37 +18,33 @@ class SuspensionMiddleware:
         self.get_response = get_response
 
     def __call__(self, request):
-        user = self._get_user_from_token(request)
-
-        if user and user.is_authenticated:
-            if hasattr(user, 'profile') and user.profile.is_suspended:
-                if user.profile.suspended_until and user.profile.suspended_until <= timezone.now():
-                    user.profile.is_suspended = False
-                    user.profile.suspension_reason = None
-                    user.profile.suspended_until = None
-                    user.profile.save()
-                else:
-                    if not self._is_path_allowed(request.path):
-                        return JsonResponse({
-                            'error': 'suspended',
-                            'message': 'Your account is suspended.',
-                            'suspension_reason': user.profile.suspension_reason,
-                            'suspended_until': user.profile.suspended_until.isoformat() if user.profile.suspended_until else None,
-                        }, status=403)
+        identity = self._get_identity_from_token(request)
+
+        if identity and identity.is_suspended:
+            if identity.suspended_until and identity.suspended_until <= timezone.now():
+                profile = Profile.objects.get(user_id=identity.user.pk)
+                profile.is_suspended = False
+                profile.suspension_reason = None
+                profile.suspended_until = None
+                profile.save()
+            else:
+                if not self._is_path_allowed(request.path):
+                    return JsonResponse({
+                        'error': 'suspended',
+                        'message': 'Your account is suspended.',
+                        'suspension_reason': identity.suspension_reason,
+                        'suspended_until': identity.suspended_until.isoformat() if identity.suspended_until else None,
+                    }, status=403)
 
         return self.get_response(request)
 
-    def _get_user_from_token(self, request):
-        """Extract user from Authorization header token."""
+    def _get_identity_from_token(self, request):
+        """Resolve the Authorization header token; DRF authentication reuses the result."""
         auth_header = request.META.get('HTTP_AUTHORIZATION', '')
 
         if auth_header.startswith('Token '):
             token_key = auth_header.split(' ')[1]
-            try:
-                token = Token.objects.select_related('user', 'user__profile').get(key=token_key)
-                return token.user
-            except Token.DoesNotExist:
-                pass
+            return resolve_token(request, token_key)
 
         return None
 
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.20 on 2026-10-17 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garden', '0026_report_reported_user_alter_report_reporter'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='category',
+            field=models.CharField(choices=[('TASK', 'Task Update'), ('SOCIAL', 'Social Activity'), ('FORUM', 'Forum Activity'), ('WEATHER', 'Weather Alert'), ('BADGE', 'Badge')], max_length=30),
+        ),
+        migrations.CreateModel(
+            name='ImageVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('variant', models.CharField(max_length=20)),
+                ('version', models.CharField(max_length=32)),
+                ('data', models.BinaryField()),
+                ('mime_type', models.CharField(default='image/jpeg', max_length=100)),
+                ('width', models.PositiveIntegerField(default=0)),
+                ('height', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('kind', 'object_id', 'variant')},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.20 on 2026-10-17 01:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('garden', '0028_push_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('followers_count', models.IntegerField(default=0)),
+                ('following_count', models.IntegerField(default=0)),
+                ('gardens_joined', models.IntegerField(default=0)),
+                ('gardens_managed', models.IntegerField(default=0)),
+                ('tasks_completed', models.IntegerField(default=0)),
+                ('tasks_assigned_by', models.IntegerField(default=0)),
+                ('tasks_assigned_to', models.IntegerField(default=0)),
+                ('tasks_active_or_completed', models.IntegerField(default=0)),
+                ('average_task_response_seconds', models.FloatField(blank=True, null=True)),
+                ('posts_created', models.IntegerField(default=0)),
+                ('comments_made', models.IntegerField(default=0)),
+                ('post_likes_received', models.IntegerField(default=0)),
+                ('comment_likes_received', models.IntegerField(default=0)),
+                ('best_answers', models.IntegerField(default=0)),
+                ('events_created', models.IntegerField(default=0)),
+                ('events_attended', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-17 01:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garden', '0030_garden_geocode_cache'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='garden',
+            index=models.Index(fields=['latitude', 'longitude'], name='garden_lat_lon_idx'),
+        ),
+    ]
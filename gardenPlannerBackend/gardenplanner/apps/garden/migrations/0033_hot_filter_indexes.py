@@ -0,0 +1,45 @@
+# Generated by Django 4.2.20 on 2026-10-17 01:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garden', '0032_search_vectors'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['forum_post', 'created_at', 'id'], name='comment_live_thread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forumpost',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-created_at', '-id'], name='forumpost_live_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gardenmembership',
+            index=models.Index(fields=['user', 'status'], name='membership_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gardenmembership',
+            index=models.Index(fields=['garden', 'role', 'status'], name='membership_garden_role_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'read', '-timestamp'], name='notif_recipient_read_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(condition=models.Q(('reviewed', False)), fields=['created_at'], name='report_unreviewed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['garden', 'status', 'due_date'], name='task_garden_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status__in', ['PENDING', 'IN_PROGRESS', 'ACCEPTED'])), fields=['due_date'], name='task_open_due_idx'),
+        ),
+    ]
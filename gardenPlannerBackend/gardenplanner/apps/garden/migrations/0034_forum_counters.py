@@ -0,0 +1,52 @@
+# Generated by Django 4.2.20 on 2026-10-17 02:08
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, field):
+    counts = queryset.order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    ForumPost = apps.get_model('garden', 'ForumPost')
+    Comment = apps.get_model('garden', 'Comment')
+    ForumPostLike = apps.get_model('garden', 'ForumPostLike')
+    CommentLike = apps.get_model('garden', 'CommentLike')
+    db_alias = schema_editor.connection.alias
+
+    ForumPost.objects.using(db_alias).update(
+        like_count=_count(ForumPostLike.objects.filter(post=OuterRef('pk')), 'post'),
+        comment_count=_count(Comment.objects.filter(forum_post=OuterRef('pk'), is_deleted=False), 'forum_post'),
+    )
+    Comment.objects.using(db_alias).update(
+        like_count=_count(CommentLike.objects.filter(comment=OuterRef('pk')), 'comment'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garden', '0033_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='forumpost',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='forumpost',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.20 on 2026-10-17 02:14
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_occurrence_dates(apps, schema_editor):
+    # Existing instances stand for the date they are due; later duplicates of the
+    # same date keep NULL so the unique constraint can be added
+    Task = apps.get_model('garden', 'Task')
+    db_alias = schema_editor.connection.alias
+    seen = set()
+    instances = []
+    rows = (
+        Task.objects.using(db_alias).filter(parent_task__isnull=False, due_date__isnull=False)
+        .order_by('id').values_list('id', 'parent_task_id', 'due_date')
+    )
+    for pk, parent_id, due_date in rows.iterator():
+        key = (parent_id, timezone.localdate(due_date))
+        if key not in seen:
+            seen.add(key)
+            instances.append(Task(pk=pk, occurrence_date=key[1]))
+    Task.objects.using(db_alias).bulk_update(instances, ['occurrence_date'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garden', '0034_forum_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='occurrence_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_occurrence_dates, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='task',
+            unique_together={('parent_task', 'occurrence_date')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-17 02:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garden', '0035_recurring_occurrences'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='recurrence_rule',
+            field=models.CharField(blank=True, help_text='iCalendar RRULE such as FREQ=MONTHLY;BYDAY=2TU; takes precedence over recurrence_period', max_length=255, null=True),
+        ),
+    ]
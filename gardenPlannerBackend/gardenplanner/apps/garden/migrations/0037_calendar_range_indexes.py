@@ -0,0 +1,21 @@
+# Generated by Django 4.2.20 on 2026-10-17 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garden', '0036_task_recurrence_rule'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gardenevent',
+            index=models.Index(fields=['garden', 'start_at'], name='event_garden_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['garden', 'due_date'], name='task_garden_due_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.20 on 2026-10-17 02:45
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garden', '0038_sent_reminders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.CharField(max_length=100)),
+                ('scheduled_for', models.DateTimeField()),
+                ('worker', models.CharField(blank=True, default='', max_length=255)),
+                ('status', models.CharField(choices=[('RUNNING', 'Running'), ('SUCCEEDED', 'Succeeded'), ('FAILED', 'Failed')], default='RUNNING', max_length=10)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('duration_seconds', models.FloatField(blank=True, null=True)),
+                ('rows', models.IntegerField(blank=True, help_text='Rows the job created or changed, when it reports them', null=True)),
+                ('error', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['started_at'], name='jobrun_started_idx')],
+                'unique_together': {('job_id', 'scheduled_for')},
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+# Weighted columns per table; keep in sync with search.SEARCH_FIELDS
+SEARCH_COLUMNS = {
+    'garden_forumpost': ['title', 'content'],
+    'garden_comment': ['content'],
+    'garden_garden': ['name', 'description'],
+    'garden_task': ['title', 'description'],
+}
+
+
+def recreate_search_triggers(update_of):
+    """
+    Recreate the search_vector triggers of migration 0032, firing on updates of
+    the searched columns only (``update_of``) or of any column.
+    """
+    def recreate(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for table, columns in SEARCH_COLUMNS.items():
+            event = f"UPDATE OF {', '.join(columns)}" if update_of else 'UPDATE'
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {table}_search_vector_trigger ON {table}")
+            schema_editor.execute(f"""
+                CREATE TRIGGER {table}_search_vector_trigger
+                BEFORE INSERT OR {event} ON {table}
+                FOR EACH ROW EXECUTE FUNCTION {table}_search_vector_update()
+            """)
+    return recreate
+
+
+# Like and comment counter bumps, geocoding and task status changes no longer
+# recompute the search vectors of the rows they touch
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garden', '0039_job_runs'),
+    ]
+
+    operations = [
+        migrations.RunPython(recreate_search_triggers(True), recreate_search_triggers(False)),
+    ]
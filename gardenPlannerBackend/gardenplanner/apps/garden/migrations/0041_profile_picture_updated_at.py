@@ -0,0 +1,28 @@
+# Generated by Django 4.2.20 on 2026-10-17 03:33
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_picture_versions(apps, schema_editor):
+    # Existing picture URLs were versioned by updated_at; keep them valid
+    Profile = apps.get_model('garden', 'Profile')
+    Profile.objects.using(schema_editor.connection.alias).filter(
+        profile_picture_data__isnull=False
+    ).update(profile_picture_updated_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garden', '0040_search_trigger_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='profile_picture_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_picture_versions, migrations.RunPython.noop),
+    ]
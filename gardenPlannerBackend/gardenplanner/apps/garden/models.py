@@ -4,9 +4,54 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.db.models import (
+    BooleanField, Count, Exists, ExpressionWrapper, IntegerField, OuterRef, Prefetch, Q, Subquery, Value
+)
+from django.db.models.functions import Coalesce
 
 
+def _blob_present(path):
+    """Boolean expression telling whether the binary column at ``path`` holds data."""
+    return ExpressionWrapper(Q(**{f'{path}__isnull': False}), output_field=BooleanField())
+
+
+class DeferredBlobQuerySet(models.QuerySet):
+    """QuerySet of a model storing image bytes in the DB."""
+
+    def with_data(self):
+        """Load the binary columns too, for code paths that render image bytes."""
+        return self.defer(None)
+
+
+class DeferredBlobManager(models.Manager.from_queryset(DeferredBlobQuerySet)):
+    """
+    Default manager leaving the model's BLOB_FIELDS out of every query, so listing
+    or joining image rows only transfers metadata. Related managers and prefetches
+    inherit this; use ``with_data()`` where the bytes are needed. Instances loaded
+    through the base manager (e.g. ``user.profile``) are not affected.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().defer(*self.model.BLOB_FIELDS)
+
+
+class ProfileQuerySet(DeferredBlobQuerySet):
+
+    def with_picture_flag(self):
+        """Annotate has_profile_picture so the picture can be linked without loading it."""
+        return self.annotate(has_profile_picture=_blob_present('profile_picture_data'))
+
+
+# Marks a Profile whose stored picture bytes were not loaded with it
+_PICTURE_NOT_LOADED = object()
+
+
+class ProfileManager(DeferredBlobManager.from_queryset(ProfileQuerySet)):
+    pass
+
 
 class Profile(models.Model):
     ROLE_CHOICES = [
@@ -21,6 +66,8 @@ class Profile(models.Model):
     # DB-backed profile picture storage (preferred)
     profile_picture_data = models.BinaryField(null=True, blank=True)
     profile_picture_mime_type = models.CharField(max_length=100, default='image/jpeg')
+    # Version of the picture in its image URLs; moves only when the picture bytes change
+    profile_picture_updated_at = models.DateTimeField(null=True, blank=True)
     location = models.CharField(max_length=255, blank=True, null=True)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='MEMBER')
     following = models.ManyToManyField('self', symmetrical=False, related_name='followers', blank=True)
@@ -35,6 +82,40 @@ class Profile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    BLOB_FIELDS = ('profile_picture_data',)
+    objects = ProfileManager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_picture = instance.__dict__.get('profile_picture_data', _PICTURE_NOT_LOADED)
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        if fields is None or 'profile_picture_data' in fields:
+            self._stored_picture = self.__dict__.get('profile_picture_data', _PICTURE_NOT_LOADED)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if (update_fields is None or 'profile_picture_data' in update_fields) and self._picture_changed():
+            self.profile_picture_updated_at = timezone.now()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'profile_picture_updated_at'}
+        super().save(*args, **kwargs)
+        if 'profile_picture_data' in self.__dict__:
+            self._stored_picture = self.profile_picture_data
+
+    def _picture_changed(self):
+        """Whether saving now writes picture bytes other than the stored ones."""
+        if 'profile_picture_data' not in self.__dict__:
+            # Deferred, so this save leaves the picture alone
+            return False
+        if self._state.adding:
+            return self.profile_picture_data is not None
+        stored = getattr(self, '_stored_picture', _PICTURE_NOT_LOADED)
+        return stored is _PICTURE_NOT_LOADED or self.profile_picture_data != stored
+
     def __str__(self):
         return f"{self.user.username}'s Profile"
 
@@ -71,16 +152,45 @@ class Garden(models.Model):
     location = models.CharField(max_length=255, blank=True, null=True)
     latitude = models.FloatField(blank=True, null=True)
     longitude = models.FloatField(blank=True, null=True)
+    # Set when the location changed and the geocode_gardens job still has to look it up
+    geocode_pending = models.BooleanField(default=False, db_index=True)
     is_public = models.BooleanField(default=True)
     is_hidden = models.BooleanField(default=False)
     hidden_reason = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by a PostgreSQL trigger and GIN-indexed (migration 0032); unused on SQLite
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Range scan for the bounding box of radius searches (see geo.nearby)
+            models.Index(fields=['latitude', 'longitude'], name='garden_lat_lon_idx'),
+        ]
     
     def __str__(self):
         return self.name
 
 
+class GeocodeCache(models.Model):
+    """
+    Nominatim result for a normalized location string, so each place is looked
+    up once. Null coordinates record that Nominatim did not find the location.
+    """
+    query = models.CharField(max_length=255, unique=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def found(self):
+        return self.latitude is not None and self.longitude is not None
+
+    def __str__(self):
+        return f"{self.query}: {self.latitude}, {self.longitude}"
+
+
 class GardenImage(models.Model):
     garden = models.ForeignKey('Garden', on_delete=models.CASCADE, related_name='images')
     data = models.BinaryField()
@@ -88,6 +198,9 @@ class GardenImage(models.Model):
     is_cover = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    BLOB_FIELDS = ('data',)
+    objects = DeferredBlobManager()
+
     def save(self, *args, **kwargs):
         if self.is_cover:
             # Ensure only one cover image per garden
@@ -119,6 +232,12 @@ class GardenMembership(models.Model):
     
     class Meta:
         unique_together = ('user', 'garden')
+        indexes = [
+            # The user's accepted gardens (membership resolver, stats, profile)
+            models.Index(fields=['user', 'status'], name='membership_user_status_idx'),
+            # A garden's managers and accepted members
+            models.Index(fields=['garden', 'role', 'status'], name='membership_garden_role_idx'),
+        ]
         
     def __str__(self):
         return f"{self.user.username} - {self.garden.name} ({self.get_role_display()})"
@@ -173,13 +292,33 @@ class Task(models.Model):
     # Recurring task fields
     is_recurring = models.BooleanField(default=False)
     recurrence_period = models.CharField(max_length=20, choices=RECURRENCE_PERIOD_CHOICES, null=True, blank=True)
+    recurrence_rule = models.CharField(max_length=255, null=True, blank=True, help_text="iCalendar RRULE such as FREQ=MONTHLY;BYDAY=2TU; takes precedence over recurrence_period")
     recurrence_end_date = models.DateTimeField(null=True, blank=True, help_text="When to stop generating recurring instances")
     parent_task = models.ForeignKey('self', on_delete=models.CASCADE, related_name='recurring_instances', null=True, blank=True, help_text="Parent task template for recurring tasks")
+    # Date of the occurrence a recurring instance stands for; one instance per parent and date
+    occurrence_date = models.DateField(null=True, blank=True, editable=False)
     
     accepted_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by a PostgreSQL trigger and GIN-indexed (migration 0032); unused on SQLite
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Garden task lists filtered by status and sorted by deadline
+            models.Index(fields=['garden', 'status', 'due_date'], name='task_garden_status_due_idx'),
+            # Garden calendar: range scan over due dates across statuses
+            models.Index(fields=['garden', 'due_date'], name='task_garden_due_idx'),
+            # Deadline reminders only look at open tasks
+            models.Index(
+                fields=['due_date'], name='task_open_due_idx',
+                condition=Q(status__in=['PENDING', 'IN_PROGRESS', 'ACCEPTED']),
+            ),
+        ]
+        # Makes generate_recurring_tasks idempotent; NULLs (non-instances) never conflict
+        unique_together = ('parent_task', 'occurrence_date')
     
     def __str__(self):
         return self.title
@@ -189,13 +328,10 @@ class Task(models.Model):
         return self.is_recurring and self.parent_task is None
     
     def get_next_due_date(self):
-        """Calculate the next due date based on recurrence period"""
-        if not self.is_recurring or not self.recurrence_period or not self.due_date:
+        """Calculate the next due date based on the recurrence rule or period"""
+        if not self.is_recurring or not (self.recurrence_rule or self.recurrence_period) or not self.due_date:
             return None
         
-        from datetime import timedelta
-        from django.utils import timezone
-        
         current_due = self.due_date
         if isinstance(current_due, str):
             from django.utils.dateparse import parse_datetime
@@ -204,17 +340,73 @@ class Task(models.Model):
         if not current_due:
             return None
         
-        period_map = {
-            'DAILY': timedelta(days=1),
-            'WEEKLY': timedelta(weeks=1),
-            'MONTHLY': timedelta(days=30),  # Approximate month
-            'YEARLY': timedelta(days=365),
-        }
-        
-        delta = period_map.get(self.recurrence_period)
-        if delta:
-            return current_due + delta
-        return None
+        from .recurrence_rules import Recurrence
+        recurrence = Recurrence.for_task(current_due, self.recurrence_period, self.recurrence_rule)
+        return recurrence.next_after(current_due)
+
+
+def _fields_without(instance, excluded):
+    """update_fields for a full save of ``instance`` that leaves ``excluded`` and deferred fields alone."""
+    deferred = instance.get_deferred_fields()
+    return [
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key and field.name not in excluded and field.attname not in deferred
+    ]
+
+
+def _count_subquery(queryset, field):
+    """Correlated COUNT(*) of ``queryset`` grouped by ``field``, defaulting to 0."""
+    counts = queryset.order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def _is_liked_expression(like_model, lookup, user):
+    """EXISTS() telling whether ``user`` liked the outer row; False for anonymous users."""
+    if user is None or not user.is_authenticated:
+        return Value(False, output_field=models.BooleanField())
+    return Exists(like_model.objects.filter(user=user, **{lookup: OuterRef('pk')}))
+
+
+def _with_author_pictures(queryset, image_data):
+    """Keep the joined author pictures, or defer them and annotate author_has_picture."""
+    if image_data:
+        return queryset
+    return queryset.defer('author__profile__profile_picture_data').annotate(
+        author_has_picture=_blob_present('author__profile__profile_picture_data'),
+    )
+
+
+class ForumPostQuerySet(models.QuerySet):
+
+    def for_feed(self, user=None, include_comments=False, image_data=True):
+        """
+        Annotate is_liked in SQL and preload the author profiles and images, so
+        serializing a page of posts costs a constant number of queries instead
+        of several per post. Like and comment counts are stored columns.
+        Without ``image_data`` the image bytes are left out and only flagged.
+        """
+        images = ForumPostImage.objects.order_by('created_at', 'id')
+        queryset = _with_author_pictures(self.select_related('author__profile'), image_data).annotate(
+            is_liked=_is_liked_expression(ForumPostLike, 'post', user),
+        ).prefetch_related(
+            Prefetch('images', queryset=images.with_data() if image_data else images),
+        )
+        if include_comments:
+            comments = Comment.objects.filter(is_deleted=False).for_feed(user, image_data).order_by('created_at')
+            queryset = queryset.prefetch_related(Prefetch('comments', queryset=comments, to_attr='feed_comments'))
+        return queryset
+
+
+class CommentQuerySet(models.QuerySet):
+
+    def for_feed(self, user=None, image_data=True):
+        """Annotate is_liked and preload authors, posts and images."""
+        images = CommentImage.objects.order_by('created_at', 'id')
+        return _with_author_pictures(self.select_related('author__profile', 'forum_post'), image_data).annotate(
+            is_liked=_is_liked_expression(CommentLike, 'comment', user),
+        ).prefetch_related(
+            Prefetch('images', queryset=images.with_data() if image_data else images),
+        )
 
 
 class ForumPost(models.Model):
@@ -225,12 +417,33 @@ class ForumPost(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_deleted = models.BooleanField(default=False)
     best_answer = models.ForeignKey('Comment', on_delete=models.SET_NULL, null=True, blank=True, related_name='best_answer_for')
+    # Denormalized counters kept current by signals (see forum_counters.py)
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    # Maintained by a PostgreSQL trigger and GIN-indexed (migration 0032); unused on SQLite
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ForumPostQuerySet.as_manager()
+
+    COUNTER_FIELDS = ('like_count', 'comment_count')
+
+    class Meta:
+        indexes = [
+            # The forum feed: live posts, newest first, in cursor pagination order
+            models.Index(fields=['-created_at', '-id'], name='forumpost_live_feed_idx', condition=Q(is_deleted=False)),
+        ]
 
     #soft delete (content will be shown as moderated and not actually deleted from the db)
     def delete(self):
         self.is_deleted = True
         self.save()
-    
+
+    def save(self, *args, **kwargs):
+        # Counters only change through F() updates; a full save must not write back a stale copy
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = _fields_without(self, self.COUNTER_FIELDS)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.title} by {self.author.username}"
     
@@ -240,12 +453,35 @@ class Comment(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="comments")
     created_at = models.DateTimeField(auto_now_add=True)
     is_deleted = models.BooleanField(default=False)
+    # Denormalized counter kept current by signals (see forum_counters.py)
+    like_count = models.PositiveIntegerField(default=0)
+    # Maintained by a PostgreSQL trigger and GIN-indexed (migration 0032); unused on SQLite
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = CommentQuerySet.as_manager()
+
+    COUNTER_FIELDS = ('like_count',)
+
+    class Meta:
+        indexes = [
+            # A post's live comments, oldest first, in cursor pagination order
+            models.Index(
+                fields=['forum_post', 'created_at', 'id'], name='comment_live_thread_idx',
+                condition=Q(is_deleted=False),
+            ),
+        ]
 
     #soft delete (content will be shown as moderated and not actually deleted from the db)
     def delete(self):
         self.is_deleted = True
         self.save()
-    
+
+    def save(self, *args, **kwargs):
+        # Counters only change through F() updates; a full save must not write back a stale copy
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = _fields_without(self, self.COUNTER_FIELDS)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Comment by {self.author.username} on {self.forum_post.title}"
 
@@ -281,6 +517,9 @@ class ForumPostImage(models.Model):
     mime_type = models.CharField(max_length=100, default='image/jpeg')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    BLOB_FIELDS = ('data',)
+    objects = DeferredBlobManager()
+
     def __str__(self):
         return f"ForumPostImage({self.post_id})"
 
@@ -291,9 +530,36 @@ class CommentImage(models.Model):
     mime_type = models.CharField(max_length=100, default='image/jpeg')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    BLOB_FIELDS = ('data',)
+    objects = DeferredBlobManager()
+
     def __str__(self):
         return f"CommentImage({self.comment_id})"
-    
+
+
+class ImageVariant(models.Model):
+    """
+    Resized copy of a DB-stored image (garden, post, comment or profile picture),
+    generated on first request and reused until the source image changes.
+    """
+    kind = models.CharField(max_length=20)
+    object_id = models.PositiveIntegerField()
+    variant = models.CharField(max_length=20)
+    # Version marker of the source image the variant was rendered from
+    version = models.CharField(max_length=32)
+    data = models.BinaryField()
+    mime_type = models.CharField(max_length=100, default='image/jpeg')
+    width = models.PositiveIntegerField(default=0)
+    height = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('kind', 'object_id', 'variant')
+
+    def __str__(self):
+        return f"ImageVariant({self.kind}:{self.object_id}:{self.variant})"
+
+
 class Report(models.Model):
     REASONS = [
         ('abuse', 'Abusive or Harassing'),
@@ -317,6 +583,12 @@ class Report(models.Model):
     reviewed = models.BooleanField(default=False)
     is_valid = models.BooleanField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # The moderation queue: unreviewed reports, oldest first
+            models.Index(fields=['created_at'], name='report_unreviewed_idx', condition=Q(reviewed=False)),
+        ]
+
     def __str__(self):
         return f"Report on {self.content_object} by {self.reporter.username}"
 
@@ -339,11 +611,100 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ('-timestamp',)
+        indexes = [
+            # Notification list and unread_count for a recipient
+            models.Index(fields=['recipient', 'read', '-timestamp'], name='notif_recipient_read_ts_idx'),
+        ]
 
     def __str__(self):
         return f"Notification for {self.recipient.username} ({self.category})"
 
 
+class PushOutboxStatus(models.TextChoices):
+    PENDING = 'PENDING', 'Pending'
+    SENT = 'SENT', 'Sent'
+    DEAD = 'DEAD', 'Dead'
+
+
+class PushOutbox(models.Model):
+    """
+    Push notification waiting to be delivered by the deliver_push_notifications
+    worker. Rows are written in the same transaction as the Notification they
+    announce, so a push is never lost or sent for a rolled-back change.
+    """
+    recipient_ids = models.JSONField(default=list)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=PushOutboxStatus.choices, default=PushOutboxStatus.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='pushoutbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"PushOutbox({self.pk}, {self.status}, {len(self.recipient_ids)} recipients)"
+
+
+class SentReminder(models.Model):
+    """
+    Ledger of deadline reminders, one row per task, assignee and due date, so
+    send_deadline_reminders never reminds anyone twice of the same deadline.
+    Moving the due date opens a new window and re-arms the reminder.
+    """
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='sent_reminders')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_reminders')
+    due_date = models.DateTimeField()
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('task', 'user', 'due_date')
+        indexes = [
+            # Pruning of reminders whose deadline has passed
+            models.Index(fields=['due_date'], name='sentreminder_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Reminder of task {self.task_id} for user {self.user_id} ({self.due_date})"
+
+
+class JobRunStatus(models.TextChoices):
+    RUNNING = 'RUNNING', 'Running'
+    SUCCEEDED = 'SUCCEEDED', 'Succeeded'
+    FAILED = 'FAILED', 'Failed'
+
+
+class JobRun(models.Model):
+    """
+    One run of a run_scheduler job. Every scheduler process fires the same
+    cron jobs; the first to insert the (job_id, scheduled_for) row runs the
+    job and the others skip it, so each job runs once across the cluster.
+    """
+    job_id = models.CharField(max_length=100)
+    scheduled_for = models.DateTimeField()
+    worker = models.CharField(max_length=255, blank=True, default='')
+    status = models.CharField(max_length=10, choices=JobRunStatus.choices, default=JobRunStatus.RUNNING)
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_seconds = models.FloatField(null=True, blank=True)
+    rows = models.IntegerField(null=True, blank=True, help_text="Rows the job created or changed, when it reports them")
+    error = models.TextField(blank=True, default='')
+
+    class Meta:
+        unique_together = ('job_id', 'scheduled_for')
+        indexes = [
+            # Purging old run history
+            models.Index(fields=['started_at'], name='jobrun_started_idx'),
+        ]
+
+    def __str__(self):
+        return f"JobRun({self.job_id}, {self.scheduled_for}, {self.status})"
+
+
 # =====================
 # Events and Attendance
 # =====================
@@ -391,6 +752,10 @@ class GardenEvent(models.Model):
 
     class Meta:
         ordering = ('-start_at', '-created_at')
+        indexes = [
+            # Garden calendar: range scan over start times
+            models.Index(fields=['garden', 'start_at'], name='event_garden_start_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.garden.name})"
@@ -437,6 +802,36 @@ class UserBadge(models.Model):
         return f"{self.user.username} - {self.badge.name}"
 
 
+class UserStats(models.Model):
+    """
+    Per-user activity counters behind the impact summary. Kept current by the
+    signals in signals.py and checked nightly by reconcile_user_stats; a row is
+    computed from the source tables the first time it is read.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='stats')
+    followers_count = models.IntegerField(default=0)
+    following_count = models.IntegerField(default=0)
+    gardens_joined = models.IntegerField(default=0)
+    gardens_managed = models.IntegerField(default=0)
+    tasks_completed = models.IntegerField(default=0)
+    tasks_assigned_by = models.IntegerField(default=0)
+    tasks_assigned_to = models.IntegerField(default=0)
+    # Assigned tasks that are pending, accepted, in progress or completed
+    tasks_active_or_completed = models.IntegerField(default=0)
+    average_task_response_seconds = models.FloatField(null=True, blank=True)
+    posts_created = models.IntegerField(default=0)
+    comments_made = models.IntegerField(default=0)
+    post_likes_received = models.IntegerField(default=0)
+    comment_likes_received = models.IntegerField(default=0)
+    best_answers = models.IntegerField(default=0)
+    events_created = models.IntegerField(default=0)
+    events_attended = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"UserStats({self.user_id})"
+
+
 class DeviceFingerprint(models.Model):
     """Track trusted devices for device-based 2FA"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='devices')
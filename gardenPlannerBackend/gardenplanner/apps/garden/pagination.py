@@ -0,0 +1,117 @@
+"""Cursor (keyset) pagination for the high-volume list endpoints."""
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+
+class OrderedPagePagination(PageNumberPagination):
+    """
+    Numbered pages for the orderings a cursor cannot follow (see
+    OptInCursorPagination). The response has the same ``{next, previous,
+    results}`` shape as a cursor page, so clients of an endpoint do not need
+    to know which one served them.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        del response_schema['properties']['count']
+        response_schema['required'].remove('count')
+        return response_schema
+
+
+class OptInCursorPagination(CursorPagination):
+    """
+    Keyset pagination on a timestamp column with the primary key as tie-breaker,
+    so fetching page N costs the same as fetching page 1.
+
+    To stay compatible with existing clients the full list is still returned
+    unless the client opts in with ``?paginate=true``, ``?cursor=`` or
+    ``?page_size=``. Setting CURSOR_PAGINATION_DEFAULT makes pagination the
+    default, in which case ``?paginate=false`` opts back out.
+
+    An ``?ordering=`` from the view's OrderingFilter replaces the default
+    ordering and gets the primary key appended as tie-breaker. DRF's cursor
+    holds a value of the leading field plus an offset among rows sharing it,
+    so it is only keyset pagination when that value is (nearly) unique: the
+    primary key, a unique column or a non-null timestamp. Any other ordering
+    (a status with a handful of values, a nullable due date) is served as
+    numbered pages instead. Both return ``{next, previous, results}``.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.fallback = None
+        if not self.is_requested(request):
+            return None
+        ordering = self.get_ordering(request, queryset, view)
+        if not self.is_cursor_ordering(queryset.model, ordering):
+            self.fallback = OrderedPagePagination()
+            return self.fallback.paginate_queryset(queryset.order_by(*ordering), request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            return ordering
+        return (*ordering, '-id' if ordering[0].startswith('-') else 'id')
+
+    def is_cursor_ordering(self, model, ordering):
+        """Whether the leading ordering field positions a cursor without offset scans."""
+        name = ordering[0].lstrip('-')
+        if name == 'pk':
+            return True
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        if field.null:
+            return False
+        return field.primary_key or field.unique or isinstance(field, models.DateTimeField)
+
+    def is_requested(self, request):
+        params = request.query_params
+        paginate = params.get('paginate', '').lower()
+        if paginate in ('true', '1'):
+            return True
+        if paginate in ('false', '0'):
+            return False
+        if self.cursor_query_param in params or self.page_size_query_param in params:
+            return True
+        return getattr(settings, 'CURSOR_PAGINATION_DEFAULT', False)
+
+
+class CommentCursorPagination(OptInCursorPagination):
+    # Comments are read oldest first, like a conversation
+    ordering = ('created_at', 'id')
+
+
+class NotificationCursorPagination(OptInCursorPagination):
+    ordering = ('-timestamp', '-id')
+
+
+class SearchPagination(PageNumberPagination):
+    # Search results are ordered by rank, which has no stable cursor, so pages are numbered
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -1,5 +1,6 @@
 from rest_framework import permissions
-from .models import GardenMembership, Garden
+from .models import GardenMembership
+from .memberships import get_memberships, object_garden_id
 
 class IsSystemAdministrator(permissions.BasePermission):
     """
@@ -44,24 +45,10 @@ class IsGardenManager(permissions.BasePermission):
             return True
         
         # Check if the user is a garden manager
-        garden_id = None
-        
-        if hasattr(obj, 'garden_id'):
-            garden_id = obj.garden_id
-        elif hasattr(obj, 'id') and isinstance(obj, Garden):
-            garden_id = obj.id
-            
+        garden_id = object_garden_id(obj)
         if garden_id:
-            try:
-                membership = GardenMembership.objects.get(
-                    user=request.user,
-                    garden_id=garden_id,
-                    status='ACCEPTED'
-                )
-                return membership.role == 'MANAGER'
-            except GardenMembership.DoesNotExist:
-                return False
-                
+            return get_memberships(request).is_manager(garden_id)
+
         return False
 
 
@@ -78,24 +65,10 @@ class IsGardenMember(permissions.BasePermission):
             return True
             
         # Check if the user is a garden member
-        garden_id = None
-        
-        if hasattr(obj, 'garden_id'):
-            garden_id = obj.garden_id
-        elif hasattr(obj, 'id') and isinstance(obj, Garden):
-            garden_id = obj.id
-            
+        garden_id = object_garden_id(obj)
         if garden_id:
-            try:
-                membership = GardenMembership.objects.get(
-                    user=request.user,
-                    garden_id=garden_id,
-                    status='ACCEPTED'
-                )
-                return True
-            except GardenMembership.DoesNotExist:
-                return False
-                
+            return get_memberships(request).is_member(garden_id)
+
         return False
 
 
@@ -132,7 +105,7 @@ class IsTaskAssignee(permissions.BasePermission):
             return True
             
         # Check if user is in the assigned_to set (ManyToMany field)
-        if hasattr(obj, 'assigned_to') and obj.assigned_to.filter(pk=request.user.pk).exists():
+        if hasattr(obj, 'assigned_to') and get_memberships(request).is_task_assignee(obj):
             return True
             
         return False
@@ -152,20 +125,11 @@ class CanDeleteMembership(permissions.BasePermission):
             return True
         
         # Users can always delete their own membership (leave garden)
-        if isinstance(obj, GardenMembership) and obj.user == request.user:
+        if isinstance(obj, GardenMembership) and obj.user_id == request.user.pk:
             return True
         
         # Garden managers can delete any membership in their garden
         if isinstance(obj, GardenMembership):
-            garden_id = obj.garden_id
-            try:
-                membership = GardenMembership.objects.get(
-                    user=request.user,
-                    garden_id=garden_id,
-                    status='ACCEPTED'
-                )
-                return membership.role == 'MANAGER'
-            except GardenMembership.DoesNotExist:
-                return False
+            return get_memberships(request).is_manager(obj.garden_id)
         
         return False 
\ No newline at end of file
@@ -0,0 +1,164 @@
+"""
+Push notification outbox.
+
+Request handlers only enqueue a PushOutbox row; the deliver_push_notifications
+worker claims due rows in batches and hands them to the configured backend,
+retrying failures with exponential backoff and marking messages DEAD once
+PUSH_OUTBOX_MAX_ATTEMPTS is reached.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from push_notifications.models import GCMDevice
+
+from .models import PushOutbox, PushOutboxStatus
+
+logger = logging.getLogger(__name__)
+
+# A claimed message that is not settled within this window (e.g. the worker
+# died mid-send) becomes due again and is picked up by the next run
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+class FCMPushBackend:
+    """Sends data-only messages to the recipients' active FCM devices."""
+
+    def send(self, recipient_ids, payload):
+        devices = GCMDevice.objects.filter(user_id__in=recipient_ids, active=True)
+        devices.send_message(
+            message=None,  # Set this to None to force data-only
+            extra=payload
+        )
+
+
+class FakePushBackend:
+    """
+    Records messages instead of sending them, for tests and local development.
+    Set ``failures`` to make that many upcoming sends raise.
+    """
+    sent = []
+    failures = 0
+
+    def send(self, recipient_ids, payload):
+        if FakePushBackend.failures > 0:
+            FakePushBackend.failures -= 1
+            raise RuntimeError('Simulated push delivery failure')
+        FakePushBackend.sent.append({'recipient_ids': list(recipient_ids), 'payload': payload})
+
+    @classmethod
+    def reset(cls):
+        cls.sent = []
+        cls.failures = 0
+
+
+def get_backend():
+    return import_string(settings.PUSH_NOTIFICATION_BACKEND)()
+
+
+def enqueue_push(recipient_ids, payload):
+    """
+    Queue a push for delivery by the worker. Call inside the caller's transaction.
+    Recipients are split into multicast messages of PUSH_MULTICAST_BATCH_SIZE users,
+    all written with a single bulk insert.
+    """
+    return enqueue_pushes([(recipient_ids, payload)])
+
+
+def enqueue_pushes(pushes):
+    """Queue several (recipient_ids, payload) pushes with one bulk insert."""
+    batch_size = settings.PUSH_MULTICAST_BATCH_SIZE
+    messages = []
+    for recipient_ids, payload in pushes:
+        recipient_ids = list(recipient_ids)
+        messages.extend(
+            PushOutbox(recipient_ids=recipient_ids[start:start + batch_size], payload=payload)
+            for start in range(0, len(recipient_ids), batch_size)
+        )
+    return PushOutbox.objects.bulk_create(messages)
+
+
+def retry_delay(attempts):
+    """Exponential backoff after the given number of failed attempts, capped."""
+    seconds = settings.PUSH_OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.PUSH_OUTBOX_RETRY_MAX_SECONDS))
+
+
+def _claim_batch(batch_size, now):
+    """
+    Lock and lease up to batch_size due messages. Concurrent workers skip the
+    locked rows, and the lease keeps the claimed ones from being picked again.
+    """
+    with transaction.atomic():
+        batch = list(
+            PushOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status=PushOutboxStatus.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if batch:
+            PushOutbox.objects.filter(pk__in=[message.pk for message in batch]).update(
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + CLAIM_TIMEOUT,
+            )
+    for message in batch:
+        message.attempts += 1
+    return batch
+
+
+def deliver_pending(batch_size=100, backend=None):
+    """
+    Deliver one batch of due messages.
+    Returns counts of messages sent, scheduled for retry and dead-lettered.
+    """
+    backend = backend or get_backend()
+    stats = {'sent': 0, 'retried': 0, 'dead': 0}
+    sent_ids = []
+
+    for message in _claim_batch(batch_size, timezone.now()):
+        try:
+            backend.send(message.recipient_ids, message.payload)
+        except Exception as exc:
+            message.last_error = f'{type(exc).__name__}: {exc}'
+            if message.attempts >= settings.PUSH_OUTBOX_MAX_ATTEMPTS:
+                message.status = PushOutboxStatus.DEAD
+                stats['dead'] += 1
+                logger.error("Push %s dead after %s attempts: %s", message.pk, message.attempts, message.last_error)
+            else:
+                message.next_attempt_at = timezone.now() + retry_delay(message.attempts)
+                stats['retried'] += 1
+                logger.warning("Push %s failed (attempt %s), retrying: %s", message.pk, message.attempts, message.last_error)
+            message.save(update_fields=['status', 'last_error', 'next_attempt_at'])
+        else:
+            sent_ids.append(message.pk)
+
+    if sent_ids:
+        PushOutbox.objects.filter(pk__in=sent_ids).update(
+            status=PushOutboxStatus.SENT, sent_at=timezone.now(), last_error=''
+        )
+    stats['sent'] = len(sent_ids)
+    return stats
+
+
+def drain(batch_size=100, backend=None):
+    """Deliver batches until nothing is due. Returns the summed counts."""
+    totals = {'sent': 0, 'retried': 0, 'dead': 0}
+    while True:
+        stats = deliver_pending(batch_size, backend)
+        for key in totals:
+            totals[key] += stats[key]
+        if not any(stats.values()):
+            return totals
+
+
+def purge_sent(older_than=None):
+    """Delete delivered messages older than PUSH_OUTBOX_RETENTION_DAYS."""
+    older_than = older_than or timedelta(days=settings.PUSH_OUTBOX_RETENTION_DAYS)
+    deleted, _ = PushOutbox.objects.filter(
+        status=PushOutboxStatus.SENT, sent_at__lt=timezone.now() - older_than
+    ).delete()
+    return deleted
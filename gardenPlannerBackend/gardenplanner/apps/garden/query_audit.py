@@ -0,0 +1,102 @@
+"""
+The hottest filters behind the API and the scheduled jobs, as querysets.
+
+``explain_queries`` prints their plans and the ``hot_filters`` benchmark times
+them, so an index change can be checked against the same list. Each query is
+built the way its endpoint or job builds it, for a given user, garden and post.
+"""
+
+import datetime
+
+from django.utils import timezone
+
+from .models import Comment, ForumPost, GardenEvent, GardenMembership, Notification, Report, Task
+
+OPEN_TASK_STATUSES = ['PENDING', 'IN_PROGRESS', 'ACCEPTED']
+
+# Indexes added for these queries (migrations 0033 and 0037)
+HOT_FILTER_INDEXES = {
+    Notification: ['notif_recipient_read_ts_idx'],
+    GardenMembership: ['membership_user_status_idx', 'membership_garden_role_idx'],
+    Task: ['task_garden_status_due_idx', 'task_open_due_idx', 'task_garden_due_idx'],
+    GardenEvent: ['event_garden_start_idx'],
+    ForumPost: ['forumpost_live_feed_idx'],
+    Comment: ['comment_live_thread_idx'],
+    Report: ['report_unreviewed_idx'],
+}
+
+
+class HotQuery:
+    """A named queryset; ``count`` queries are executed as COUNT(*) like their endpoint."""
+
+    def __init__(self, label, queryset, count=False):
+        self.label = label
+        self.queryset = queryset
+        self.count = count
+
+    def execute(self):
+        """Run the query and return the count or the number of rows fetched."""
+        # A fresh clone each time, so repeated runs hit the database
+        queryset = self.queryset.all()
+        if self.count:
+            return queryset.count()
+        return len(queryset)
+
+    def explain(self, **options):
+        return self.queryset.explain(**options)
+
+
+def hot_queries(user_id, garden_id, post_id, page_size=50):
+    now = timezone.now()
+    return [
+        HotQuery(
+            'notifications: unread_count',
+            Notification.objects.filter(recipient_id=user_id, read=False).order_by(),
+            count=True,
+        ),
+        HotQuery(
+            'notifications: unread list',
+            Notification.objects.filter(recipient_id=user_id, read=False)[:page_size],
+        ),
+        HotQuery(
+            'memberships: accepted gardens of a user',
+            GardenMembership.objects.filter(user_id=user_id, status='ACCEPTED').values_list('garden_id', flat=True),
+        ),
+        HotQuery(
+            'memberships: managers of a garden',
+            GardenMembership.objects.filter(garden_id=garden_id, role='MANAGER', status='ACCEPTED')
+            .values_list('user_id', flat=True),
+        ),
+        HotQuery(
+            'tasks: open tasks of a garden by deadline',
+            Task.objects.filter(garden_id=garden_id, status='PENDING').order_by('due_date')[:page_size],
+        ),
+        HotQuery(
+            'tasks: deadline reminders (next 24h)',
+            Task.objects.filter(
+                due_date__gte=now, due_date__lt=now + datetime.timedelta(days=1), status__in=OPEN_TASK_STATUSES
+            ),
+        ),
+        HotQuery(
+            'calendar: tasks of a garden in a month',
+            Task.objects.filter(garden_id=garden_id, due_date__gte=now, due_date__lt=now + datetime.timedelta(days=31)),
+        ),
+        HotQuery(
+            'calendar: events of a garden in a month',
+            GardenEvent.objects.filter(
+                garden_id=garden_id, start_at__gte=now, start_at__lt=now + datetime.timedelta(days=31)
+            ).order_by('start_at', 'pk'),
+        ),
+        HotQuery(
+            'forum: feed first page',
+            ForumPost.objects.filter(is_deleted=False).order_by('-created_at', '-id')[:page_size],
+        ),
+        HotQuery(
+            'forum: comments of a post',
+            Comment.objects.filter(forum_post_id=post_id, is_deleted=False).order_by('created_at', 'id')[:page_size],
+        ),
+        HotQuery(
+            'reports: moderation queue',
+            Report.objects.filter(reviewed=False).order_by('created_at')[:page_size],
+        ),
+    ]
@@ -0,0 +1,187 @@
+"""
+Set-based generation of recurring task instances.
+
+Recurring templates (``is_recurring`` tasks without a parent) are processed in
+primary-key ranges of RECURRING_TASK_BATCH_SIZE. Each batch costs a fixed
+number of queries whatever its size: the templates, the latest instance date
+per template and the templates' assignees are read with one query each, every
+due occurrence is computed in Python, and the instances and their assignee
+rows are written with two bulk inserts.
+
+Occurrences follow the template's rule (see recurrence_rules). One is due
+once it is at most RECURRING_TASK_LEAD_TIME_HOURS ahead; all missed
+occurrences of the last RECURRING_TASK_CATCH_UP_DAYS are created in one run,
+older ones are skipped. Later occurrences are never stored: the garden
+calendar projects them from the rule. Instances are unique per (parent_task,
+occurrence_date) and inserted skipping conflicts (bulk.insert_new), so
+overlapping or repeated runs never create duplicates, and each run applies the
+side effects below only for the rows it inserted itself.
+
+bulk_create skips the save and m2m signals, so the assignment notifications
+and the UserStats increments are applied here once per batch, and the
+tasks_created badges once per run.
+"""
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from . import stats
+from .badges import check_stat_badges
+from .bulk import insert_new
+from .models import NotificationCategory, Task
+from .recurrence_rules import Recurrence
+from .signals import send_notification_batch
+
+# Template columns copied to every instance
+COPIED_FIELDS = ('garden_id', 'title', 'description', 'task_type', 'custom_type_id', 'assigned_by_id')
+
+
+@dataclass
+class GenerationResult:
+    templates: int = 0
+    created: int = 0
+    notified: int = 0
+
+
+def due_occurrences(recurrence, reference, now, end_date=None):
+    """
+    Occurrences of ``recurrence`` following ``reference`` that should exist at
+    ``now``: up to the lead time ahead and not after ``end_date``, skipping
+    those older than the catch-up window.
+    """
+    horizon = now + timedelta(hours=settings.RECURRING_TASK_LEAD_TIME_HOURS)
+    if end_date is not None:
+        horizon = min(horizon, end_date)
+    earliest = now - timedelta(days=settings.RECURRING_TASK_CATCH_UP_DAYS)
+    if reference < earliest:
+        return list(recurrence.between(earliest, horizon, inc=True))
+    return list(recurrence.between(reference, horizon))
+
+
+def generate(now=None, dry_run=False, batch_size=None):
+    """Create all due recurring task instances. Returns a GenerationResult."""
+    now = now or timezone.now()
+    batch_size = batch_size or settings.RECURRING_TASK_BATCH_SIZE
+    earliest = now - timedelta(days=settings.RECURRING_TASK_CATCH_UP_DAYS)
+    templates = Task.objects.filter(
+        Q(recurrence_end_date__isnull=True) | Q(recurrence_end_date__gte=earliest),
+        is_recurring=True, parent_task__isnull=True, due_date__isnull=False,
+    ).order_by('pk')
+
+    result = GenerationResult()
+    created_by = Counter()
+    last_pk = 0
+    while True:
+        batch = list(
+            templates.filter(pk__gt=last_pk)
+            .values(
+                'pk', 'due_date', 'recurrence_period', 'recurrence_rule', 'recurrence_end_date', *COPIED_FIELDS
+            )[:batch_size]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1]['pk']
+        result.templates += len(batch)
+        with transaction.atomic():
+            created, notified = _generate_batch(batch, now, dry_run, batch_size)
+        result.created += len(created)
+        result.notified += notified
+        if not dry_run:
+            created_by.update(assigned_by_id for _, _, assigned_by_id, _ in created)
+    _check_creator_badges(created_by)
+    return result
+
+
+def _generate_batch(batch, now, dry_run, batch_size):
+    """
+    Create the due instances of a batch of templates. Returns (pk, parent id,
+    assigned_by id, title) per instance and the number of notifications sent.
+    """
+    first_pk, last_pk = batch[0]['pk'], batch[-1]['pk']
+    latest = dict(
+        Task.objects.filter(parent_task_id__gte=first_pk, parent_task_id__lte=last_pk)
+        .order_by().values('parent_task_id').annotate(latest=Max('due_date'))
+        .values_list('parent_task_id', 'latest')
+    )
+
+    instances = []
+    for template in batch:
+        recurrence = Recurrence.for_task(
+            template['due_date'], template['recurrence_period'], template['recurrence_rule']
+        )
+        reference = latest.get(template['pk']) or template['due_date']
+        for due in due_occurrences(recurrence, reference, now, template['recurrence_end_date']):
+            instances.append(Task(
+                parent_task_id=template['pk'],
+                occurrence_date=timezone.localdate(due),
+                due_date=due,
+                status='PENDING',
+                is_recurring=False,
+                **{field: template[field] for field in COPIED_FIELDS},
+            ))
+    if dry_run or not instances:
+        return [(None, instance.parent_task_id, instance.assigned_by_id, instance.title) for instance in instances], 0
+
+    # Instances an overlapping run inserted first are skipped, and are its to announce
+    inserted = sorted(insert_new(instances))
+    if not inserted:
+        return [], 0
+    # Catching up can insert many occurrences per template; keep each IN list to a batch
+    created = []
+    for start in range(0, len(inserted), batch_size):
+        created.extend(
+            Task.objects.filter(pk__in=inserted[start:start + batch_size]).order_by('pk')
+            .values_list('pk', 'parent_task_id', 'assigned_by_id', 'title')
+        )
+
+    Through = Task.assigned_to.through
+    assignees = defaultdict(list)
+    for task_id, user_id in Through.objects.filter(task_id__gte=first_pk, task_id__lte=last_pk).filter(
+        task__is_recurring=True, task__parent_task__isnull=True,
+    ).values_list('task_id', 'user_id'):
+        assignees[task_id].append(user_id)
+    Through.objects.bulk_create(
+        [Through(task_id=pk, user_id=user_id) for pk, parent_id, _, _ in created for user_id in assignees[parent_id]],
+        ignore_conflicts=True,
+    )
+
+    # One notification per template and assignee, however many occurrences were caught up
+    assigned = {}
+    for _, parent_id, _, title in created:
+        assigned[parent_id] = (assignees[parent_id], f"You have been assigned a new task: '{title}'.")
+    notified = send_notification_batch(
+        assigned.values(),
+        notification_title="New Task Assigned",
+        notification_category=NotificationCategory.TASK,
+        link="/tasks",
+    )
+
+    # New PENDING tasks only add to these counters, so increment them instead of recounting
+    _bump_by_count(Counter(assigned_by_id for _, _, assigned_by_id, _ in created), 'tasks_assigned_by')
+    _bump_by_count(
+        Counter(user_id for _, parent_id, _, _ in created for user_id in assignees[parent_id]),
+        'tasks_assigned_to', 'tasks_active_or_completed',
+    )
+    return created, notified
+
+
+def _bump_by_count(counts, *fields):
+    """stats.bump with one UPDATE per distinct increment."""
+    by_delta = defaultdict(list)
+    for user_id, delta in counts.items():
+        by_delta[delta].append(user_id)
+    for delta, user_ids in by_delta.items():
+        stats.bump(user_ids, **{field: delta for field in fields})
+
+
+def _check_creator_badges(created_by):
+    # tasks_assigned_by was already bumped for every batch
+    for user in User.objects.filter(pk__in=created_by):
+        check_stat_badges(user, 'tasks_created')
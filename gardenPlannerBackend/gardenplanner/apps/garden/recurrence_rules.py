@@ -0,0 +1,211 @@
+"""
+Calendar-accurate recurrence rules for recurring tasks.
+
+A recurring task repeats by an iCalendar RRULE (RFC 5545) anchored at its
+first due date, e.g. ``FREQ=MONTHLY;BYDAY=2TU`` for every second Tuesday. The
+fixed periods map to rules as well: MONTHLY and YEARLY keep the day of the
+month and fall back to the last day of shorter months, instead of the old
+30 and 365 day steps that drifted.
+
+Occurrences are expanded lazily with dateutil in the task's local time, so
+wall-clock times survive DST changes. dateutil walks a rule from its start;
+to keep a window years after the first due date cheap, the rule is
+re-anchored a whole number of intervals ahead, which yields the same
+occurrences because the defaults it took from the first due date (weekday,
+day of month) are written into the rule first. Rules with COUNT are always
+expanded from the start.
+
+dateutil only stops at an occurrence, its UNTIL or the year 9999, so a rule
+that never matches (FREQ=DAILY;BYMONTH=2;BYMONTHDAY=30) walks every day up to
+9999. Such rules are rejected up front: a rule needs an occurrence within
+HORIZON_YEARS of its first due date, and Recurrence skips any such rule
+stored earlier. Expansion is cut off at the end of the requested window too.
+"""
+
+from datetime import MAXYEAR
+from functools import cached_property
+
+from dateutil.parser import parse as parse_datetime
+from dateutil.relativedelta import relativedelta
+from dateutil.rrule import rrulestr
+from django.utils import timezone
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+ALLOWED_PARTS = {
+    'FREQ', 'INTERVAL', 'COUNT', 'UNTIL', 'BYDAY', 'BYMONTHDAY', 'BYMONTH',
+    'BYYEARDAY', 'BYWEEKNO', 'BYSETPOS', 'WKST',
+}
+# Parts that replace the defaults dateutil derives from the start date
+_DATE_PARTS = ('BYDAY', 'BYMONTHDAY', 'BYYEARDAY', 'BYWEEKNO')
+
+_WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+# Leap days can be eight years apart (2096 to 2104)
+HORIZON_YEARS = 8
+# The Gregorian calendar repeats every 400 years, weekdays included
+_CYCLE_YEARS = 400
+
+
+def normalize_rule(text, dtstart=None):
+    """
+    Canonical form of an RRULE: upper case, without the ``RRULE:`` prefix.
+    Raises ValueError for malformed rules, unsupported parts, sub-daily
+    frequencies and rules without an occurrence in the HORIZON_YEARS after
+    ``dtstart`` (now by default).
+    """
+    text = (text or '').strip().upper()
+    if text.startswith('RRULE:'):
+        text = text[len('RRULE:'):]
+    parts = _split(text)
+    unknown = set(parts) - ALLOWED_PARTS
+    if unknown:
+        raise ValueError(f"Unsupported RRULE part(s): {', '.join(sorted(unknown))}")
+    if parts.get('FREQ') not in FREQUENCIES:
+        raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+    if 'COUNT' in parts and 'UNTIL' in parts:
+        raise ValueError('COUNT and UNTIL cannot be combined')
+    # Let dateutil reject bad values (UNTIL must be UTC, i.e. end in Z, for our aware dates)
+    dtstart = dtstart or timezone.now()
+    try:
+        rrulestr(text, dtstart=dtstart)
+    except (ValueError, TypeError) as exc:
+        raise ValueError(f'Invalid RRULE: {exc}') from None
+    if not _occurs_within(parts, dtstart, HORIZON_YEARS):
+        raise ValueError(f'The rule has no occurrence in the {HORIZON_YEARS} years after the due date')
+    return text
+
+
+def period_rule(period, dtstart):
+    """The RRULE equivalent to one of Task.RECURRENCE_PERIOD_CHOICES, starting at dtstart."""
+    dtstart = timezone.localtime(dtstart)
+    if period == 'MONTHLY' and dtstart.day > 28:
+        # The 31st falls back to the 30th, 29th or 28th in shorter months
+        days = ','.join(str(day) for day in range(28, dtstart.day + 1))
+        return f'FREQ=MONTHLY;BYMONTHDAY={days};BYSETPOS=-1'
+    if period == 'YEARLY' and (dtstart.month, dtstart.day) == (2, 29):
+        return 'FREQ=YEARLY;BYMONTH=2;BYMONTHDAY=28,29;BYSETPOS=-1'
+    return f'FREQ={period if period in FREQUENCIES else "DAILY"}'
+
+
+class Recurrence:
+    """The occurrences of a recurring task whose first due date is ``dtstart``."""
+
+    def __init__(self, dtstart, rule):
+        self.dtstart = timezone.localtime(dtstart)
+        self.parts = _split(rule)
+        self.rule = _pin_defaults(rule, self.parts, self.dtstart)
+        self.freq = self.parts['FREQ']
+        self.interval = int(self.parts.get('INTERVAL', 1))
+
+    @classmethod
+    def for_task(cls, due_date, period=None, rule=None):
+        """A task's recurrence: its RRULE if it has one, otherwise its period."""
+        return cls(due_date, rule or period_rule(period, due_date))
+
+    def between(self, after, before=None, inc=False):
+        """
+        Lazily yield the occurrences after ``after`` (or at it, with inc=True)
+        up to and including ``before``, HORIZON_YEARS after ``after`` at most.
+        """
+        if not self.occurs:
+            return
+        after = timezone.localtime(after)
+        if before is None:
+            before = after + relativedelta(years=HORIZON_YEARS)
+        for occurrence in self._rrule_near(after, before).xafter(after.replace(microsecond=0), inc=True):
+            # rrule works in whole seconds; keep the first due date's microseconds
+            occurrence = occurrence.replace(microsecond=self.dtstart.microsecond)
+            if occurrence < after or (occurrence == after and not inc):
+                continue
+            if before is not None and occurrence > before:
+                return
+            yield occurrence
+
+    @cached_property
+    def occurs(self):
+        """False for rules that never match (stored before such rules were rejected)."""
+        return _occurs_within(self.parts, self.dtstart, HORIZON_YEARS)
+
+    def next_after(self, moment):
+        return next(self.between(moment), None)
+
+    def _rrule_near(self, moment, before):
+        rule = rrulestr(self.rule, dtstart=self._anchor(moment))
+        if 'COUNT' in self.parts:
+            return rule
+        # Stop at the first candidate after the window instead of walking on
+        until = _until(self.parts)
+        return rule.replace(until=before if until is None else min(until, before))
+
+    def _anchor(self, moment):
+        """A start at least one interval before ``moment`` with the same occurrences after it."""
+        start = self.dtstart
+        if 'COUNT' in self.parts or moment <= start:
+            return start
+        if self.freq == 'DAILY':
+            units = (moment.date() - start.date()).days
+        elif self.freq == 'WEEKLY':
+            units = (moment.date() - start.date()).days // 7
+        elif self.freq == 'MONTHLY':
+            units = (moment.year - start.year) * 12 + moment.month - start.month
+        else:
+            units = moment.year - start.year
+        skip = (units // self.interval - 1) * self.interval
+        if skip <= 0:
+            return start
+        if self.freq == 'DAILY':
+            return start + relativedelta(days=skip)
+        if self.freq == 'WEEKLY':
+            return start + relativedelta(weeks=skip)
+        # The pinned BYMONTHDAY/BYMONTH decide the day, so start the period on its first day
+        if self.freq == 'MONTHLY':
+            return start + relativedelta(months=skip, day=1)
+        return start + relativedelta(years=skip, month=1, day=1)
+
+
+def _split(text):
+    parts = {}
+    for item in filter(None, (text or '').split(';')):
+        key, sep, value = item.partition('=')
+        if not sep or not value:
+            raise ValueError(f'Malformed RRULE part: {item!r}')
+        parts[key] = value
+    return parts
+
+
+def _until(parts):
+    return parse_datetime(parts['UNTIL']) if 'UNTIL' in parts else None
+
+
+def _occurs_within(parts, dtstart, years):
+    """
+    Whether the rule has an occurrence in the ``years`` after dtstart. The
+    check runs in the last 400-year cycle before 9999, where the calendar is
+    the same, so a rule that never matches is given up on within a few
+    hundred years of walking instead of thousands.
+    """
+    dtstart = timezone.localtime(dtstart).replace(tzinfo=None)
+    shift = (MAXYEAR - years - dtstart.year) // _CYCLE_YEARS * _CYCLE_YEARS
+    start = dtstart + relativedelta(years=shift)
+    # COUNT and UNTIL only cut the candidates short; UNTIL is applied after shifting back
+    rule = ';'.join(f'{key}={value}' for key, value in parts.items() if key not in ('COUNT', 'UNTIL'))
+    first = rrulestr(rule, dtstart=start).replace(until=start + relativedelta(years=years)).after(start, inc=True)
+    if first is None:
+        return False
+    until = _until(parts)
+    first = timezone.make_aware(first - relativedelta(years=shift))
+    return until is None or first <= until
+
+
+def _pin_defaults(rule, parts, dtstart):
+    """Write the values dateutil would take from dtstart into the rule itself."""
+    if any(part in parts for part in _DATE_PARTS):
+        return rule
+    if parts['FREQ'] == 'WEEKLY':
+        return f'{rule};BYDAY={_WEEKDAYS[dtstart.weekday()]}'
+    if parts['FREQ'] == 'MONTHLY':
+        return f'{rule};BYMONTHDAY={dtstart.day}'
+    if parts['FREQ'] == 'YEARLY':
+        pinned = f'{rule};BYMONTHDAY={dtstart.day}'
+        return pinned if 'BYMONTH' in parts else f'{pinned};BYMONTH={dtstart.month}'
+    return rule
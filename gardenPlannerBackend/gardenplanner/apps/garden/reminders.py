@@ -0,0 +1,114 @@
+"""
+Deadline reminders for the assignees of open tasks.
+
+Every assignee of a PENDING, ACCEPTED or IN_PROGRESS task due in the next
+DEADLINE_REMINDER_WINDOW_HOURS gets one reminder. The (task, assignee) pairs
+are read with their task and the assignee's notification preference in a
+single join over the assignment table, and are processed in batches of
+DEADLINE_REMINDER_BATCH_SIZE: one insert records the reminders in the ledger,
+skipping those already there (bulk.insert_new), one query reads back the rows
+it wrote and send_notification_batch writes their notifications, whatever the
+number of tasks. Only reminders this run inserted are sent, so runs that
+overlap never send the same one twice.
+
+The SentReminder ledger is keyed by task, assignee and due date, so re-runs
+(the job is scheduled daily but can be run by hand) never remind anyone twice
+of the same deadline, while a task moved to a new due date is reminded again.
+Rows whose deadline has passed are pruned on every run.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .bulk import insert_new
+from .models import NotificationCategory, SentReminder, Task
+from .signals import send_notification_batch
+
+OPEN_STATUSES = ('PENDING', 'IN_PROGRESS', 'ACCEPTED')
+
+
+@dataclass
+class ReminderResult:
+    tasks: int = 0
+    due: int = 0
+    already_sent: int = 0
+    muted: int = 0
+    sent: int = 0
+    pruned: int = 0
+
+    def __str__(self):
+        return (
+            f'Sent {self.sent} deadline reminder(s) for {self.tasks} task(s): {self.due} assignee(s) due, '
+            f'{self.already_sent} already reminded, {self.muted} with notifications off; '
+            f'pruned {self.pruned} expired ledger row(s)'
+        )
+
+
+def reminder_message(title, due_date):
+    return f"Reminder: The task '{title}' is due on {timezone.localtime(due_date).strftime('%Y-%m-%d %H:%M')}."
+
+
+def send_deadline_reminders(now=None, batch_size=None):
+    """Remind the assignees of open tasks nearing their deadline. Returns a ReminderResult."""
+    now = now or timezone.now()
+    batch_size = batch_size or settings.DEADLINE_REMINDER_BATCH_SIZE
+    until = now + timedelta(hours=settings.DEADLINE_REMINDER_WINDOW_HOURS)
+
+    result = ReminderResult()
+    result.pruned, _ = SentReminder.objects.filter(due_date__lt=now).delete()
+
+    pairs = Task.assigned_to.through.objects.filter(
+        task__due_date__gte=now, task__due_date__lt=until, task__status__in=OPEN_STATUSES,
+    ).order_by('task_id', 'user_id').values_list(
+        'task_id', 'user_id', 'task__title', 'task__due_date', 'user__profile__receives_notifications',
+    )
+
+    tasks = set()
+    batch = []
+    for task_id, user_id, title, due_date, receives in pairs.iterator(chunk_size=batch_size):
+        tasks.add(task_id)
+        result.due += 1
+        # Users without a profile are not notified either (see send_notification_batch)
+        if not receives:
+            result.muted += 1
+            continue
+        batch.append((task_id, user_id, title, due_date))
+        if len(batch) >= batch_size:
+            _remind_batch(batch, result)
+            batch = []
+    if batch:
+        _remind_batch(batch, result)
+    result.tasks = len(tasks)
+    return result
+
+
+def _remind_batch(batch, result):
+    """Record and send the reminders of a batch of (task, user, title, due date) not sent yet."""
+    with transaction.atomic():
+        # Ledger rows already present, from earlier or concurrent runs, are not inserted
+        inserted = insert_new(
+            [SentReminder(task_id=task_id, user_id=user_id, due_date=due_date) for task_id, user_id, _, due_date in batch]
+        )
+        result.already_sent += len(batch) - len(inserted)
+        if not inserted:
+            return
+
+        fresh = set(SentReminder.objects.filter(pk__in=inserted).values_list('task_id', 'user_id'))
+        # One message per task, shared by all its assignees in the batch
+        messages = {}
+        recipients = defaultdict(list)
+        for task_id, user_id, title, due_date in batch:
+            if (task_id, user_id) in fresh:
+                messages[task_id] = reminder_message(title, due_date)
+                recipients[task_id].append(user_id)
+        result.sent += send_notification_batch(
+            [(recipients[task_id], message) for task_id, message in messages.items()],
+            notification_title="Task Deadline Reminder",
+            notification_category=NotificationCategory.TASK,
+            link="/tasks",
+        )
@@ -0,0 +1,193 @@
+"""
+The calendar of a garden over a date window: its tasks and its events.
+
+Stored tasks and events are read with range scans over the (garden, due_date)
+and (garden, start_at) indexes. Recurring templates only get instances
+materialized a short time ahead (generate_recurring_tasks), so their later
+occurrences are projected from the recurrence rule and listed as virtual
+items, without an id. A virtual occurrence is one after the template's latest
+stored instance, so the two never overlap.
+
+The items are produced lazily, so the iCalendar feed (ical.py) can stream
+them. Calendar apps reach the feed without a session through a signed
+per-user key; the ETag lets them poll it without downloading it again.
+"""
+
+import hashlib
+import heapq
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from itertools import chain
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import GardenEvent, GardenMembership, Task
+from .recurrence_rules import Recurrence
+
+_FEED_SALT = 'garden.calendar-feed'
+
+
+@dataclass
+class CalendarItem:
+    type: str
+    id: int
+    title: str
+    start: datetime
+    status: str = None
+    description: str = ''
+    parent_task: int = None
+    virtual: bool = False
+
+
+def parse_window(start_text, end_text, default_start=None, default_days=None):
+    """
+    The [start, end) window of ``from`` and ``to`` (dates or ISO datetimes).
+    ``from`` defaults to the start of today (or ``default_start``) and ``to``
+    to ``default_days`` (GARDEN_CALENDAR_DEFAULT_DAYS) later; a bare ``to``
+    date includes that whole day. Raises ValueError.
+    """
+    if start_text:
+        start = _parse_bound(start_text, 'from')
+    else:
+        start = default_start or _day_start(timezone.localdate())
+    if end_text:
+        end = _parse_bound(end_text, 'to')
+        if parse_date(end_text) is not None:
+            end += timedelta(days=1)
+    else:
+        end = start + timedelta(days=default_days or settings.GARDEN_CALENDAR_DEFAULT_DAYS)
+    if end <= start:
+        raise ValueError('to must be after from')
+    if end - start > timedelta(days=settings.GARDEN_CALENDAR_MAX_DAYS):
+        raise ValueError(f'The window can span at most {settings.GARDEN_CALENDAR_MAX_DAYS} days')
+    return start, end
+
+
+def feed_start():
+    """Where the iCalendar feed starts by default: GARDEN_CALENDAR_FEED_PAST_DAYS ago."""
+    return _day_start(timezone.localdate() - timedelta(days=settings.GARDEN_CALENDAR_FEED_PAST_DAYS))
+
+
+def calendar_items(garden_id, start, end):
+    """Tasks and events of the garden in [start, end), in start order."""
+    tasks = sorted(iter_task_items(garden_id, start, end), key=_order)
+    # Events come back from the database in start order already
+    return list(heapq.merge(tasks, iter_event_items(garden_id, start, end), key=_order))
+
+
+def iter_calendar_items(garden_id, start, end):
+    """calendar_items without the ordering, for streaming."""
+    return chain(iter_task_items(garden_id, start, end), iter_event_items(garden_id, start, end))
+
+
+def iter_task_items(garden_id, start, end):
+    """Stored tasks due in [start, end), then the virtual occurrences of recurring templates."""
+    stored = Task.objects.filter(garden_id=garden_id, due_date__gte=start, due_date__lt=end).values_list(
+        'pk', 'title', 'due_date', 'status', 'description', 'parent_task_id'
+    )
+    for pk, title, due_date, status, description, parent_id in stored.iterator():
+        yield CalendarItem('task', pk, title, due_date, status, description or '', parent_task=parent_id)
+
+    templates = list(
+        Task.objects.filter(
+            Q(recurrence_end_date__isnull=True) | Q(recurrence_end_date__gte=start),
+            garden_id=garden_id, is_recurring=True, parent_task__isnull=True, due_date__lt=end,
+        ).values(
+            'pk', 'title', 'description', 'due_date', 'recurrence_period', 'recurrence_rule', 'recurrence_end_date'
+        )
+    )
+    if not templates:
+        return
+    latest = dict(
+        Task.objects.filter(parent_task_id__in=[template['pk'] for template in templates])
+        .order_by().values('parent_task_id').annotate(latest=Max('due_date'))
+        .values_list('parent_task_id', 'latest')
+    )
+
+    last = end - timedelta(microseconds=1)
+    for template in templates:
+        if template['recurrence_end_date'] is not None:
+            last_due = min(last, template['recurrence_end_date'])
+        else:
+            last_due = last
+        recurrence = Recurrence.for_task(
+            template['due_date'], template['recurrence_period'], template['recurrence_rule']
+        )
+        stored_until = max(template['due_date'], latest.get(template['pk']) or template['due_date'])
+        if stored_until < start:
+            occurrences = recurrence.between(start, last_due, inc=True)
+        else:
+            occurrences = recurrence.between(stored_until, last_due)
+        for due in occurrences:
+            yield CalendarItem(
+                'task', None, template['title'], due, 'PENDING', template['description'] or '',
+                parent_task=template['pk'], virtual=True,
+            )
+
+
+def iter_event_items(garden_id, start, end):
+    """Events of the garden starting in [start, end), in start order."""
+    events = GardenEvent.objects.filter(garden_id=garden_id, start_at__gte=start, start_at__lt=end).order_by(
+        'start_at', 'pk'
+    ).values_list('pk', 'title', 'start_at', 'description')
+    for pk, title, start_at, description in events.iterator():
+        yield CalendarItem('event', pk, title, start_at, description=description or '')
+
+
+def calendar_etag(garden, start, end):
+    """
+    Weak ETag of the garden's calendar in a window. It changes whenever the
+    garden is renamed (the name is the calendar's title) or a task or event of
+    the garden is added, edited or deleted: the count and the latest
+    updated_at of both tables, which the garden indexes answer.
+    """
+    tasks = Task.objects.filter(garden_id=garden.id).aggregate(count=Count('pk'), updated=Max('updated_at'))
+    events = GardenEvent.objects.filter(garden_id=garden.id).aggregate(count=Count('pk'), updated=Max('updated_at'))
+    state = f'{start.isoformat()}|{end.isoformat()}|{garden.name}|{tasks}|{events}'
+    return 'W/"%s"' % hashlib.md5(state.encode()).hexdigest()
+
+
+def feed_key(garden_id, user_id):
+    """The key that lets calendar apps read the garden's feed as ``user_id``."""
+    return signing.Signer(salt=f'{_FEED_SALT}:{garden_id}').sign(str(user_id))
+
+
+def feed_user_id(garden_id, key):
+    """The user a feed key was issued to, or None if it is not valid for this garden."""
+    try:
+        return int(signing.Signer(salt=f'{_FEED_SALT}:{garden_id}').unsign(key or ''))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def can_view_calendar(user, garden_id):
+    """Accepted members and system administrators see a garden's calendar."""
+    if user is None or not user.is_authenticated:
+        return False
+    if getattr(user, 'profile', None) and user.profile.role == 'ADMIN':
+        return True
+    return GardenMembership.objects.filter(user=user, garden_id=garden_id, status='ACCEPTED').exists()
+
+
+def _order(item):
+    return item.start, item.id is None, item.id or 0
+
+
+def _parse_bound(text, name):
+    moment = parse_datetime(text)
+    if moment is None:
+        day = parse_date(text)
+        if day is None:
+            raise ValueError(f'{name} must be a date (YYYY-MM-DD) or an ISO datetime')
+        return _day_start(day)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
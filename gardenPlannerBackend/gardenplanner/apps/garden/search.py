@@ -0,0 +1,88 @@
+"""
+Full-text search over forum posts, comments, gardens and tasks.
+
+On PostgreSQL each searchable model has a ``search_vector`` column that a
+trigger recomputes from the weighted columns in SEARCH_FIELDS when a row is
+inserted or one of those columns is updated (migrations 0032 and 0040). It
+is GIN-indexed, so a query is an index lookup ranked with ts_rank. Other
+databases, i.e. SQLite in tests, use a fallback backend that matches every
+word case-insensitively against the same columns, like DRF's SearchFilter
+did, newest first.
+"""
+
+from functools import reduce
+from operator import or_
+
+from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from rest_framework import filters
+
+from .models import Comment, ForumPost, Garden, Task
+
+# Text search configuration; must match the one the triggers were created with
+SEARCH_CONFIG = 'english'
+
+# Weighted columns per model (A ranks above B); the triggers use the same list
+SEARCH_FIELDS = {
+    ForumPost: [('title', 'A'), ('content', 'B')],
+    Comment: [('content', 'A')],
+    Garden: [('name', 'A'), ('description', 'B')],
+    Task: [('title', 'A'), ('description', 'B')],
+}
+
+
+class PostgresSearchBackend:
+    """Matches search_vector against a websearch query and orders by rank."""
+
+    def search(self, queryset, term):
+        query = SearchQuery(term, config=SEARCH_CONFIG, search_type='websearch')
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(rank=SearchRank(F('search_vector'), query))
+            .order_by('-rank', '-id')
+        )
+
+
+class FallbackSearchBackend:
+    """Every word must appear in one of the model's search fields."""
+
+    def search(self, queryset, term):
+        fields = [field for field, _ in SEARCH_FIELDS[queryset.model]]
+        for word in term.split():
+            queryset = queryset.filter(reduce(or_, (Q(**{f'{field}__icontains': word}) for field in fields)))
+        return queryset.annotate(rank=Value(0.0, output_field=FloatField())).order_by('-id')
+
+
+def get_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return FallbackSearchBackend()
+
+
+def search(queryset, term):
+    """Rows of queryset matching term, best first, annotated with rank."""
+    term = (term or '').strip()
+    if not term:
+        return queryset.none()
+    return get_backend().search(queryset, term)
+
+
+def exclude_blocked_authors(queryset, user, field='author'):
+    """Drop rows by users who blocked ``user`` or whom ``user`` blocked."""
+    if not user or not user.is_authenticated:
+        return queryset
+    profile = user.profile
+    blocked = User.objects.filter(Q(profile__in=profile.blocked_users.all()) | Q(profile__in=profile.blocked_by.all()))
+    return queryset.exclude(**{f'{field}__in': blocked})
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """SearchFilter (``?search=``) that runs through the full-text search backend."""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return search(queryset, ' '.join(terms))
@@ -3,10 +3,14 @@ from django.contrib.auth.models import User
 from .models import Profile, Garden, GardenMembership, CustomTaskType, Task, ForumPost, Comment, Report, Notification, GardenImage, ForumPostImage, CommentImage, Badge, UserBadge, GardenEvent, EventAttendance, AttendanceStatus
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.db.models.manager import BaseManager
 import requests
 from django.contrib.auth import authenticate
 import base64
 from push_notifications.models import GCMDevice
+from .images import garden_images_prefetch, image_value, prefetch_variants, profile_picture_value, with_image_data
+from .memberships import get_memberships
+from .recurrence_rules import normalize_rule
 
 def _decode_base64_image(data_str):
     """Return (bytes, mime_type) from data URL or raw base64 string."""
@@ -28,6 +32,42 @@ def _decode_base64_image(data_str):
     except Exception:
         raise serializers.ValidationError('Invalid base64 image')
 
+def _ordered_images(obj, context):
+    """Images of a post or comment by creation time, reusing a prefetched set when present."""
+    if 'images' in getattr(obj, '_prefetched_objects_cache', {}):
+        return obj.images.all()
+    return with_image_data(obj.images.all().order_by('created_at', 'id'), context)
+
+def _prefetched_images(obj):
+    """Images of a post, comment or garden that are already loaded, without querying."""
+    if 'images' in getattr(obj, '_prefetched_objects_cache', {}):
+        return obj.images.all()
+    return []
+
+def _author_profile(obj):
+    """The author's profile when it was loaded with select_related, else None."""
+    author = obj._state.fields_cache.get('author')
+    if author is not None and 'profile' in author._state.fields_cache:
+        return author.profile
+    return None
+
+class ImageVariantListSerializer(serializers.ListSerializer):
+    """
+    Loads the stored ?image_variant= variants of every image on the page in one
+    query before serializing it. The child serializer lists them in variant_images().
+    """
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, BaseManager) else data)
+        prefetch_variants(self.context, self.child.variant_images(items))
+        return super().to_representation(items)
+
+def _cover_image(garden, context):
+    """The garden's cover image, picked from prefetched images when present."""
+    if 'images' in getattr(garden, '_prefetched_objects_cache', {}):
+        return next((image for image in garden.images.all() if image.is_cover), None)
+    return with_image_data(garden.images.filter(is_cover=True), context).first()
+
 class ProfileSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     first_name = serializers.CharField(source='user.first_name', read_only=True)
@@ -47,13 +87,14 @@ class ProfileSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'first_name', 'last_name', 'email', 
                   'profile_picture', 'location', 'role', 'receives_notifications', 'is_private', 'created_at', 'updated_at']
         read_only_fields = ['id', 'role', 'created_at', 'updated_at']
+        list_serializer_class = ImageVariantListSerializer
+
+    @staticmethod
+    def variant_images(profiles):
+        return [('profile', profile) for profile in profiles]
 
     def get_profile_picture(self, obj):
-        if getattr(obj, 'profile_picture_data', None):
-            b64 = base64.b64encode(obj.profile_picture_data).decode('ascii')
-            mime = getattr(obj, 'profile_picture_mime_type', 'image/jpeg')
-            return f"data:{mime};base64,{b64}"
-        return None
+        return profile_picture_value(self.context, obj)
 
     def get_location(self, obj):
         if not obj.location:
@@ -192,9 +233,11 @@ class UserSerializer(serializers.ModelSerializer):
 
     def get_gardens(self, obj):
         from .models import GardenMembership
-        memberships = GardenMembership.objects.filter(user=obj, status='ACCEPTED')
+        memberships = GardenMembership.objects.filter(user=obj, status='ACCEPTED').select_related(
+            'garden'
+        ).prefetch_related(garden_images_prefetch(self.context, 'garden__images'))
         gardens = [membership.garden for membership in memberships]
-        return GardenSerializer(gardens, many=True).data
+        return GardenSerializer(gardens, many=True, context=self.context).data
 
 class GardenImageSerializer(serializers.ModelSerializer):
     image_base64 = serializers.SerializerMethodField()
@@ -203,12 +246,15 @@ class GardenImageSerializer(serializers.ModelSerializer):
         model = GardenImage
         fields = ['id', 'is_cover', 'mime_type', 'image_base64', 'created_at']
         read_only_fields = ['id', 'image_base64', 'created_at']
+        list_serializer_class = ImageVariantListSerializer
+
+    @staticmethod
+    def variant_images(images):
+        return [('garden', image) for image in images]
 
     def get_image_base64(self, obj):
-        if obj.data is None:
-            return None
-        b64 = base64.b64encode(obj.data).decode('ascii')
-        return f"data:{obj.mime_type};base64,{b64}"
+        # With ?image_format=url this holds a URL to the binary image endpoint instead
+        return image_value(self.context, 'garden', obj)
 
 
 class GardenSerializer(serializers.ModelSerializer):
@@ -216,17 +262,24 @@ class GardenSerializer(serializers.ModelSerializer):
     images = GardenImageSerializer(many=True, read_only=True)
     cover_image_base64 = serializers.CharField(write_only=True, required=False, allow_blank=True)
     gallery_base64 = serializers.ListField(child=serializers.CharField(), write_only=True, required=False)
+    # Only present in /gardens/nearby/ results
+    distance_km = serializers.FloatField(read_only=True)
 
     class Meta:
         model = Garden
-        fields = ['id', 'name', 'description', 'location', 'latitude', 'longitude', 'is_public', 'created_at', 'updated_at', 'cover_image', 'images', 'cover_image_base64', 'gallery_base64']
+        fields = ['id', 'name', 'description', 'location', 'latitude', 'longitude', 'is_public', 'created_at', 'updated_at', 'cover_image', 'images', 'cover_image_base64', 'gallery_base64', 'distance_km']
         read_only_fields = ['id', 'created_at', 'updated_at', 'cover_image', 'images']
+        list_serializer_class = ImageVariantListSerializer
+
+    @staticmethod
+    def variant_images(gardens):
+        return [('garden', image) for garden in gardens for image in _prefetched_images(garden)]
 
     def get_cover_image(self, obj):
-        cover = obj.images.filter(is_cover=True).first()
+        cover = _cover_image(obj, self.context)
         if not cover:
             return None
-        return GardenImageSerializer(cover).data
+        return GardenImageSerializer(cover, context=self.context).data
 
     def create(self, validated_data):
         cover_image_b64 = validated_data.pop('cover_image_base64', None)
@@ -253,14 +306,10 @@ class GardenSerializer(serializers.ModelSerializer):
                 instance.images.filter(is_cover=True).update(is_cover=False)
             else:
                 data_bytes, mime = _decode_base64_image(cover_image_b64)
-                cover = instance.images.filter(is_cover=True).first()
-                if cover:
-                    cover.data = data_bytes
-                    cover.mime_type = mime
-                    cover.is_cover = True
-                    cover.save()
-                else:
-                    GardenImage.objects.create(garden=instance, data=data_bytes, mime_type=mime, is_cover=True)
+                # Replace rather than overwrite, so an image id always maps to the same bytes
+                # and URLs handed out by the image endpoint stay cacheable
+                instance.images.filter(is_cover=True).delete()
+                GardenImage.objects.create(garden=instance, data=data_bytes, mime_type=mime, is_cover=True)
         
         if gallery_b64 is not None:
             instance.images.filter(is_cover=False).delete()
@@ -319,18 +368,27 @@ class TaskSerializer(serializers.ModelSerializer):
                  'assigned_by', 'assigned_by_username', 
                  'assigned_to', 'assigned_to_usernames', 
                  'status', 'due_date', 
-                 'is_recurring', 'recurrence_period', 'recurrence_end_date', 'parent_task',
+                 'is_recurring', 'recurrence_period', 'recurrence_rule', 'recurrence_end_date', 'parent_task',
                  'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_assigned_to_usernames(self, obj):
         return [user.username for user in obj.assigned_to.all()]
 
+    def validate_recurrence_rule(self, value):
+        if not value:
+            return None
+        try:
+            return normalize_rule(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+
     def validate(self, data):
         task_type = data.get('task_type')
         custom_type = data.get('custom_type')
         is_recurring = data.get('is_recurring', False)
         recurrence_period = data.get('recurrence_period')
+        recurrence_rule = data.get('recurrence_rule')
         recurrence_end_date = data.get('recurrence_end_date')
         
         # If task_type is CUSTOM, custom_type should be provided
@@ -343,13 +401,20 @@ class TaskSerializer(serializers.ModelSerializer):
         
         # Validate recurring task fields
         if is_recurring:
-            if not recurrence_period:
-                raise serializers.ValidationError({"recurrence_period": "Recurrence period is required for recurring tasks"})
+            if not recurrence_period and not recurrence_rule:
+                raise serializers.ValidationError({"recurrence_period": "Recurrence period or rule is required for recurring tasks"})
             if not data.get('due_date'):
                 raise serializers.ValidationError({"due_date": "Due date is required for recurring tasks"})
+            if recurrence_rule:
+                # The rule has to match within a few years of this task's own due date
+                try:
+                    normalize_rule(recurrence_rule, dtstart=data['due_date'])
+                except ValueError as exc:
+                    raise serializers.ValidationError({"recurrence_rule": str(exc)})
         else:
             # Clear recurring fields if not recurring
             data['recurrence_period'] = None
+            data['recurrence_rule'] = None
             data['recurrence_end_date'] = None
         
         return data
@@ -377,32 +442,43 @@ class ForumPostSerializer(serializers.ModelSerializer):
     images_base64 = serializers.ListField(child=serializers.CharField(), write_only=True, required=False)
     delete_image_ids = serializers.ListField(child=serializers.IntegerField(), write_only=True, required=False)
     comments = serializers.SerializerMethodField(read_only=True)
-    comments_count = serializers.SerializerMethodField(read_only=True)
-    likes_count = serializers.IntegerField(source='likes.count', read_only=True)
+    comments_count = serializers.IntegerField(source='comment_count', read_only=True)
+    likes_count = serializers.IntegerField(source='like_count', read_only=True)
     is_liked = serializers.SerializerMethodField()
-    best_answer_id = serializers.IntegerField(source='best_answer.id', read_only=True)
+    best_answer_id = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = ForumPost
         fields = ['id', 'title', 'content', 'author', 'author_username', 'author_profile_picture', 'created_at', 
                   'updated_at', 'images', 'images_base64', 'delete_image_ids', 'comments', 'comments_count', 'likes_count', 'is_liked', 'best_answer_id']
         read_only_fields = ['id', 'created_at', 'updated_at', 'author', 'images', 'comments', 'comments_count', 'likes_count', 'is_liked', 'best_answer_id']
+        list_serializer_class = ImageVariantListSerializer
+
+    @staticmethod
+    def variant_images(posts):
+        # Comments loaded with the feed (?include_comments=true) are covered by the same query
+        comments = [comment for post in posts for comment in getattr(post, 'feed_comments', [])]
+        return [
+            ('post', image) for post in posts for image in _prefetched_images(post)
+        ] + [('profile', _author_profile(post)) for post in posts] + CommentSerializer.variant_images(comments)
 
     def get_is_liked(self, obj):
+        # Annotated by ForumPost.objects.for_feed()
+        if hasattr(obj, 'is_liked'):
+            return obj.is_liked
         user = self.context.get('request').user
         if user.is_authenticated:
             return obj.likes.filter(user=user).exists()
         return False
     
     def get_images(self, obj):
-        imgs = obj.images.all().order_by('created_at')
+        imgs = _ordered_images(obj, self.context)
         result = []
         for im in imgs:
-            b64 = base64.b64encode(im.data).decode('ascii') if im.data is not None else None
             result.append({
                 'id': im.id,
                 'mime_type': im.mime_type,
-                'image_base64': f"data:{im.mime_type};base64,{b64}" if b64 else None,
+                'image_base64': image_value(self.context, 'post', im),
                 'created_at': im.created_at,
             })
         return result
@@ -411,19 +487,16 @@ class ForumPostSerializer(serializers.ModelSerializer):
         # Check if include_comments is requested
         request = self.context.get('request')
         if request and request.query_params.get('include_comments', '').lower() == 'true':
-            comments = obj.comments.filter(is_deleted=False).order_by('created_at')
+            comments = getattr(obj, 'feed_comments', None)
+            if comments is None:
+                comments = obj.comments.filter(is_deleted=False).order_by('created_at')
             return CommentSerializer(comments, many=True, context=self.context).data
         return []
 
-    def get_comments_count(self, obj):
-        return obj.comments.filter(is_deleted=False).count()
-
     def get_author_profile_picture(self, obj):
-        if hasattr(obj.author, 'profile') and obj.author.profile.profile_picture_data:
-            b64 = base64.b64encode(obj.author.profile.profile_picture_data).decode('ascii')
-            mime = getattr(obj.author.profile, 'profile_picture_mime_type', 'image/jpeg')
-            return f"data:{mime};base64,{b64}"
-        return None
+        return profile_picture_value(
+            self.context, getattr(obj.author, 'profile', None), getattr(obj, 'author_has_picture', None)
+        )
 
     def create(self, validated_data):
         images_b64 = validated_data.pop('images_base64', [])
@@ -460,7 +533,7 @@ class CommentSerializer(serializers.ModelSerializer):
     images = serializers.SerializerMethodField(read_only=True)
     images_base64 = serializers.ListField(child=serializers.CharField(), write_only=True, required=False)
     delete_image_ids = serializers.ListField(child=serializers.IntegerField(), write_only=True, required=False)
-    likes_count = serializers.IntegerField(source='likes.count', read_only=True)
+    likes_count = serializers.IntegerField(source='like_count', read_only=True)
     is_liked = serializers.SerializerMethodField()
     is_best_answer = serializers.SerializerMethodField()
 
@@ -469,32 +542,39 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ['id', 'forum_post', 'content', 'author', 'author_username', 'author_profile_picture', 
                   'created_at', 'images', 'images_base64', 'delete_image_ids', 'likes_count', 'is_liked', 'is_best_answer']
         read_only_fields = ['id', 'author', 'author_username', 'created_at', 'images', 'likes_count', 'is_liked']
+        list_serializer_class = ImageVariantListSerializer
+
+    @staticmethod
+    def variant_images(comments):
+        return [
+            ('comment', image) for comment in comments for image in _prefetched_images(comment)
+        ] + [('profile', _author_profile(comment)) for comment in comments]
     
     def get_is_liked(self, obj):
+        # Annotated by Comment.objects.for_feed()
+        if hasattr(obj, 'is_liked'):
+            return obj.is_liked
         user = self.context.get('request').user
         if user.is_authenticated:
             return obj.likes.filter(user=user).exists()
         return False
 
     def get_images(self, obj):
-        imgs = obj.images.all().order_by('created_at')
+        imgs = _ordered_images(obj, self.context)
         result = []
         for im in imgs:
-            b64 = base64.b64encode(im.data).decode('ascii') if im.data is not None else None
             result.append({
                 'id': im.id,
                 'mime_type': im.mime_type,
-                'image_base64': f"data:{im.mime_type};base64,{b64}" if b64 else None,
+                'image_base64': image_value(self.context, 'comment', im),
                 'created_at': im.created_at,
             })
         return result
 
     def get_author_profile_picture(self, obj):
-        if hasattr(obj.author, 'profile') and obj.author.profile.profile_picture_data:
-            b64 = base64.b64encode(obj.author.profile.profile_picture_data).decode('ascii')
-            mime = getattr(obj.author.profile, 'profile_picture_mime_type', 'image/jpeg')
-            return f"data:{mime};base64,{b64}"
-        return None
+        return profile_picture_value(
+            self.context, getattr(obj.author, 'profile', None), getattr(obj, 'author_has_picture', None)
+        )
 
     def create(self, validated_data):
         images_b64 = validated_data.pop('images_base64', [])
@@ -535,13 +615,14 @@ class LikerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Profile
         fields = ['id', 'username', 'profile_picture']
+        list_serializer_class = ImageVariantListSerializer
+
+    @staticmethod
+    def variant_images(profiles):
+        return [('profile', profile) for profile in profiles]
 
     def get_profile_picture(self, obj):
-        if getattr(obj, 'profile_picture_data', None):
-            b64 = base64.b64encode(obj.profile_picture_data).decode('ascii')
-            mime = getattr(obj, 'profile_picture_mime_type', 'image/jpeg')
-            return f"data:{mime};base64,{b64}"
-        return None
+        return profile_picture_value(self.context, obj)
 
 
 class UserGardenSerializer(serializers.ModelSerializer):
@@ -553,23 +634,24 @@ class UserGardenSerializer(serializers.ModelSerializer):
         model = Garden
         fields = ['id', 'name', 'description', 'location', 'latitude', 'longitude', 'is_public', 'user_role', 'created_at', 'updated_at', 'cover_image', 'images']
         read_only_fields = ['id', 'created_at', 'updated_at', 'cover_image', 'images', 'latitude', 'longitude']
-    
+        list_serializer_class = ImageVariantListSerializer
+
+    @staticmethod
+    def variant_images(gardens):
+        return [('garden', image) for garden in gardens for image in _prefetched_images(garden)]
+
     def get_user_role(self, obj):
         # This assumes that the request context contains the user
         request = self.context.get('request')
         if request and hasattr(request, 'user'):
-            try:
-                membership = GardenMembership.objects.get(user=request.user, garden=obj)
-                return membership.role
-            except GardenMembership.DoesNotExist:
-                return None
+            return get_memberships(request).role(obj.id, accepted_only=False)
         return None
 
     def get_cover_image(self, obj):
-        cover = obj.images.filter(is_cover=True).first()
+        cover = _cover_image(obj, self.context)
         if not cover:
             return None
-        return GardenImageSerializer(cover).data
+        return GardenImageSerializer(cover, context=self.context).data
     
 class ReportSerializer(serializers.ModelSerializer):
     content_type = serializers.SerializerMethodField()
@@ -682,6 +764,17 @@ class UserBadgeSerializer(serializers.ModelSerializer):
         fields = ['badge', 'earned_at']
 
 
+class CalendarItemSerializer(serializers.Serializer):
+    """An entry of a garden calendar; virtual task occurrences have no id yet."""
+    type = serializers.CharField()
+    id = serializers.IntegerField(allow_null=True)
+    parent_task = serializers.IntegerField(allow_null=True)
+    title = serializers.CharField()
+    start = serializers.DateTimeField()
+    status = serializers.CharField()
+    virtual = serializers.BooleanField()
+
+
 class ImpactSummarySerializer(serializers.Serializer):
     """Serializer for user impact summary statistics."""
     
@@ -1,7 +1,6 @@
-from django.db.models.signals import post_save, m2m_changed, pre_save, post_delete
+from django.db.models.signals import post_save, m2m_changed, pre_save, post_delete, pre_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from push_notifications.models import GCMDevice
 from .models import (
     Notification, 
     NotificationCategory, 
@@ -17,45 +16,100 @@ from .models import (
     ForumPostLike, 
     CommentLike,
     Garden,
+    GardenEvent,
+    ImageVariant,
 )
-import requests
+from .images import IMAGE_SOURCES
+from .push import enqueue_pushes
+from .badges import award_badge, check_badges, check_stat_badges
+from . import forum_counters, stats
+from .geocoding import apply_cached_geocode
+from . import authentication  # noqa: F401 - connects the token cache invalidation receivers
 
 def _send_notification(notification_receiver, notification_title, notification_message, notification_category, link=None, send_push_notification=True):
 
     if notification_receiver == None:
         return
 
-    # Skip if the assigned user has disabled notifications
-    if not notification_receiver.profile.receives_notifications:
-        return
+    send_notifications_bulk(
+        [notification_receiver],
+        notification_title,
+        notification_message,
+        notification_category,
+        link=link,
+        send_push_notification=send_push_notification,
+    )
+
+
+def send_notifications_bulk(recipients, notification_title, notification_message, notification_category, link=None, send_push_notification=True):
+    """
+    Send the same notification to many users (User instances or ids) in a constant
+    number of queries: one resolves who accepts notifications, one bulk insert
+    writes the Notification rows and one queues the pushes as multicast outbox
+    messages. Returns the number of users notified.
+    """
+    return send_notification_batch(
+        [(recipients, notification_message)],
+        notification_title,
+        notification_category,
+        link=link,
+        send_push_notification=send_push_notification,
+    )
+
 
-    Notification.objects.create(
-        recipient=notification_receiver,
-        message=notification_message,
-        category=notification_category,
-        link=link
+def send_notification_batch(messages, notification_title, notification_category, link=None, send_push_notification=True):
+    """
+    Like send_notifications_bulk for several (recipients, message) pairs at once,
+    still in three queries in total. Returns the number of notifications written.
+    """
+    messages = [
+        ({getattr(recipient, 'pk', recipient) for recipient in recipients if recipient is not None}, message)
+        for recipients, message in messages
+    ]
+    recipient_ids = set().union(*(ids for ids, _ in messages))
+    if not recipient_ids:
+        return 0
+
+    # Skip users who have disabled notifications
+    receivers = set(
+        User.objects.filter(pk__in=recipient_ids, profile__receives_notifications=True).values_list('pk', flat=True)
     )
+    messages = [(sorted(ids & receivers), message) for ids, message in messages]
+    messages = [(ids, message) for ids, message in messages if ids]
+    if not messages:
+        return 0
+
+    Notification.objects.bulk_create([
+        Notification(
+            recipient_id=receiver_id,
+            message=message,
+            category=notification_category,
+            link=link
+        )
+        for receiver_ids, message in messages
+        for receiver_id in receiver_ids
+    ])
+    notified = sum(len(receiver_ids) for receiver_ids, _ in messages)
 
     # We may choose to skip push notifications in certain cases
     # to avoid spamming users, and relieve server load.
     if not send_push_notification:
-        return
-
-    devices = GCMDevice.objects.filter(user=notification_receiver, active=True)
-    
-    data = {
-        "data_title": notification_title,
-        "data_body": notification_message,
-        "type": notification_category.value,
-    }
-    
-    if link:
-        data["link"] = link
+        return notified
+
+    pushes = []
+    for receiver_ids, message in messages:
+        data = {
+            "data_title": notification_title,
+            "data_body": message,
+            "type": notification_category.value,
+        }
+        if link:
+            data["link"] = link
+        pushes.append((receiver_ids, data))
 
-    devices.send_message(
-        message=None,  # Set this to None to force data-only
-        extra=data
-    )
+    # Delivered by the deliver_push_notifications worker, off the request path
+    enqueue_pushes(pushes)
+    return notified
 
 
 from django.utils import timezone
@@ -129,18 +183,13 @@ def task_assignee_changed(sender, instance, action, pk_set, **kwargs):
     message = f"You have been assigned a new task: '{instance.title}'."
     
     # Send notification to newly added assignees
-    for user_id in pk_set:
-        try:
-            assignee = User.objects.get(id=user_id)
-            _send_notification(
-                notification_receiver=assignee,
-                notification_title="New Task Assigned",
-                notification_message=message,
-                notification_category=NotificationCategory.TASK,
-                link="/tasks"
-            )
-        except User.DoesNotExist:
-            pass
+    send_notifications_bulk(
+        pk_set,
+        notification_title="New Task Assigned",
+        notification_message=message,
+        notification_category=NotificationCategory.TASK,
+        link="/tasks"
+    )
 
     
 @receiver(m2m_changed, sender=Profile.following.through)
@@ -276,25 +325,22 @@ def garden_join_request_notification(sender, instance, created, **kwargs):
         target_garden = instance.garden
         
         # Find all active MANAGERS of this garden
-        managers_memberships = GardenMembership.objects.filter(
+        manager_ids = GardenMembership.objects.filter(
             garden=target_garden,
             role='MANAGER',
             status='ACCEPTED'
-        ).select_related('user')
+        ).values_list('user_id', flat=True)
         
         message = f"{requesting_user.username} has requested to join '{target_garden.name}'."
 
-        # Loop through all managers and send a notification to each
-        for membership in managers_memberships:
-            manager = membership.user
-            
-            _send_notification(
-                notification_receiver=manager,
-                notification_title="New Join Request",
-                notification_message=message,
-                notification_category=NotificationCategory.SOCIAL,
-                link=f"/gardens/{target_garden.id}"
-            )
+        # Notify all managers at once
+        send_notifications_bulk(
+            manager_ids,
+            notification_title="New Join Request",
+            notification_message=message,
+            notification_category=NotificationCategory.SOCIAL,
+            link=f"/gardens/{target_garden.id}"
+        )
 
     elif not created and current_status in ['ACCEPTED', 'REJECTED']:
         # Determine the message based on the status
@@ -310,14 +356,6 @@ def garden_join_request_notification(sender, instance, created, **kwargs):
             notification_category=NotificationCategory.SOCIAL,
             link=f"/gardens/{target_garden.id}"
         )
-def award_badge(user, badge_key):
-    badge = Badge.objects.filter(key=badge_key).first()
-    if not badge:
-        return
-    if not UserBadge.objects.filter(user=user, badge=badge).exists():
-        UserBadge.objects.create(user=user, badge=badge)
-
-
 @receiver(post_save, sender=UserBadge)
 def badge_awarded_notification(sender, instance, created, **kwargs):
     if not created:
@@ -339,89 +377,271 @@ def badge_awarded_notification(sender, instance, created, **kwargs):
 
 
 
-@receiver(post_save, sender=Task)
-def check_task_badges(sender, instance, created, **kwargs):
-    created_by_user = instance.assigned_by
+@receiver(post_delete, sender=Garden)
+def delete_garden_chat(sender, instance, **kwargs):
+    """
+    Delete the garden chat from Firebase when the garden is deleted.
+    """
+    try:
+        from gardenplanner.apps.chat.firebase_config import get_firestore_client
+        db = get_firestore_client()
+        if db:
+            chat_ref = db.collection('chats').document(f'garden_{instance.id}')
+            chat_ref.delete()
+            print(f"Garden chat deleted for garden: {instance.name} (ID: {instance.id})")
+    except Exception as e:
+        print(f"Warning: Could not delete garden chat: {e}")
+@receiver(pre_save, sender=Garden)
+def geocode_garden_location(sender, instance, **kwargs):
+    """
+    Fill in coordinates when the garden location changes. Never calls Nominatim:
+    known locations come from the GeocodeCache table, new ones are left to the
+    geocode_gardens job (see geocoding.py).
+    """
+    if instance.pk is None and instance.latitude is not None: # if this is a new object with coords already set
+        return
+    if not instance.location:
+        instance.latitude = None
+        instance.longitude = None
+        instance.geocode_pending = False
+        return
+
+    # Check if location has changed
+    if instance.pk is not None and instance.latitude is not None:
+        old_location = Garden.objects.filter(pk=instance.pk).values_list('location', flat=True).first()
+        if old_location == instance.location:
+            return  # No change in location and we already have coords
+
+    apply_cached_geocode(instance)
+
+
+def _delete_image_variants(sender, instance, **kwargs):
+    """Drop the stored resized variants of an image once its source is deleted."""
+    for kind, source in IMAGE_SOURCES.items():
+        if source.model is sender:
+            ImageVariant.objects.filter(kind=kind, object_id=instance.pk).delete()
+
+
+for _image_source in IMAGE_SOURCES.values():
+    post_delete.connect(_delete_image_variants, sender=_image_source.model, dispatch_uid=f'image_variants_{_image_source.model.__name__}')
+
+
+# ============ User stats counters ============
+
+@receiver(pre_save, sender=ForumPost)
+@receiver(pre_save, sender=Comment)
+def remember_forum_state(sender, instance, **kwargs):
+    """Keep the previous soft-delete and best-answer state so post_save can apply deltas."""
+    if instance.pk is None:
+        return
+    if sender is ForumPost:
+        previous = sender.objects.filter(pk=instance.pk).values_list('is_deleted', 'best_answer__author_id').first()
+    else:
+        previous = sender.objects.filter(pk=instance.pk).values_list('is_deleted', flat=True).first()
+        previous = (previous, None) if previous is not None else None
+    instance._stats_previous = previous
+
+
+@receiver(post_save, sender=ForumPost)
+@receiver(post_save, sender=Comment)
+def forum_content_stats(sender, instance, created, **kwargs):
+    field = 'posts_created' if sender is ForumPost else 'comments_made'
+    previous = getattr(instance, '_stats_previous', None)
+    if created or previous is None:
+        if not instance.is_deleted:
+            stats.bump([instance.author_id], **{field: 1})
+        return
 
+    was_deleted, old_best_author = previous
+    if was_deleted != instance.is_deleted:
+        stats.bump([instance.author_id], **{field: -1 if instance.is_deleted else 1})
+
+    if sender is ForumPost:
+        new_best_author = None
+        if instance.best_answer_id is not None:
+            new_best_author = Comment.objects.filter(pk=instance.best_answer_id).values_list('author_id', flat=True).first()
+        if new_best_author != old_best_author:
+            stats.bump([old_best_author], best_answers=-1)
+            stats.bump([new_best_author], best_answers=1)
+
+
+@receiver(post_save, sender=ForumPostLike)
+@receiver(post_save, sender=CommentLike)
+def like_stats_added(sender, instance, created, **kwargs):
+    if not created:
+        return
+    if sender is ForumPostLike:
+        stats.bump([instance.post.author_id], post_likes_received=1)
+    else:
+        stats.bump([instance.comment.author_id], comment_likes_received=1)
+
+
+@receiver(pre_delete, sender=ForumPostLike)
+@receiver(pre_delete, sender=CommentLike)
+def like_stats_removed(sender, instance, **kwargs):
+    # pre_delete: the liked post or comment may be removed in the same cascade
+    if sender is ForumPostLike:
+        stats.bump([instance.post.author_id], post_likes_received=-1)
+    else:
+        stats.bump([instance.comment.author_id], comment_likes_received=-1)
+
+
+@receiver(post_save, sender=GardenEvent)
+def event_created_stats(sender, instance, created, **kwargs):
     if created:
-        total_tasks = Task.objects.filter(assigned_by=created_by_user).count()
-        for badge in Badge.objects.filter(category="Task Creation"):
-            req = badge.requirement
-            if total_tasks >= req.get("tasks_created", 0):
-                award_badge(created_by_user, badge.key)
+        stats.bump([instance.created_by_id], events_created=1)
+
+
+@receiver(post_delete, sender=GardenEvent)
+def event_deleted_stats(sender, instance, **kwargs):
+    stats.bump([instance.created_by_id], events_created=-1)
+
+
+@receiver(post_save, sender=EventAttendance)
+@receiver(post_delete, sender=EventAttendance)
+def attendance_stats(sender, instance, **kwargs):
+    stats.refresh_stats([instance.user_id], ['events_attended'])
+
+
+@receiver(post_save, sender=GardenMembership)
+@receiver(post_delete, sender=GardenMembership)
+def membership_stats(sender, instance, **kwargs):
+    stats.refresh_stats([instance.user_id], stats.MEMBERSHIP_FIELDS)
+
+
+@receiver(m2m_changed, sender=Profile.following.through)
+def follow_stats(sender, instance, action, pk_set, reverse, **kwargs):
+    if action == 'post_add' and pk_set:
+        # add() only reports the pairs it actually inserted, so the deltas are exact
+        other_users = list(Profile.objects.filter(pk__in=pk_set).values_list('user_id', flat=True))
+        if reverse:
+            stats.bump([instance.user_id], followers_count=len(pk_set))
+            stats.bump(other_users, following_count=1)
+        else:
+            stats.bump([instance.user_id], following_count=len(pk_set))
+            stats.bump(other_users, followers_count=1)
+    elif action in ('pre_clear', 'pre_remove'):
+        # remove()/clear() do not report what was really deleted, so recompute the affected users
+        related = 'followers' if reverse else 'following'
+        profiles = getattr(instance, related).all()
+        if action == 'pre_remove':
+            profiles = profiles.filter(pk__in=pk_set or ())
+        instance._stats_follow_users = [instance.user_id, *profiles.values_list('user_id', flat=True)]
+    elif action in ('post_clear', 'post_remove'):
+        stats.refresh_stats(getattr(instance, '_stats_follow_users', [instance.user_id]), stats.FOLLOW_FIELDS)
+
+
+@receiver(post_save, sender=Task)
+def task_stats(sender, instance, created, **kwargs):
+    if created:
+        stats.bump([instance.assigned_by_id], tasks_assigned_by=1)
+        return
+    # Status and acceptance changes affect the assignees' completion and response counters
+    stats.refresh_stats(instance.assigned_to.values_list('id', flat=True), stats.TASK_ASSIGNEE_FIELDS)
+
+
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+def task_assignee_stats(sender, instance, action, pk_set, reverse, **kwargs):
+    if action == 'pre_clear':
+        instance._stats_assignees = (
+            [instance.pk] if reverse else list(instance.assigned_to.values_list('id', flat=True))
+        )
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        user_ids = [instance.pk] if reverse else (pk_set or getattr(instance, '_stats_assignees', []))
+        stats.refresh_stats(user_ids, stats.TASK_ASSIGNEE_FIELDS)
+
+
+@receiver(pre_delete, sender=Task)
+def remember_task_assignees(sender, instance, **kwargs):
+    instance._stats_assignees = list(instance.assigned_to.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted_stats(sender, instance, **kwargs):
+    stats.bump([instance.assigned_by_id], tasks_assigned_by=-1)
+    stats.refresh_stats(getattr(instance, '_stats_assignees', []), stats.TASK_ASSIGNEE_FIELDS)
+
+
+# ============ Forum like and comment counters ============
+
+@receiver(post_save, sender=ForumPostLike)
+@receiver(post_save, sender=CommentLike)
+def like_counter_added(sender, instance, created, **kwargs):
+    if not created:
+        return
+    if sender is ForumPostLike:
+        forum_counters.bump(ForumPost, instance.post_id, like_count=1)
+    else:
+        forum_counters.bump(Comment, instance.comment_id, like_count=1)
+
+
+@receiver(post_delete, sender=ForumPostLike)
+@receiver(post_delete, sender=CommentLike)
+def like_counter_removed(sender, instance, **kwargs):
+    if sender is ForumPostLike:
+        forum_counters.bump(ForumPost, instance.post_id, like_count=-1)
+    else:
+        forum_counters.bump(Comment, instance.comment_id, like_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_counter_saved(sender, instance, created, **kwargs):
+    # _stats_previous is set by remember_forum_state for existing comments
+    previous = getattr(instance, '_stats_previous', None)
+    if created or previous is None:
+        if not instance.is_deleted:
+            forum_counters.bump(ForumPost, instance.forum_post_id, comment_count=1)
+    elif previous[0] != instance.is_deleted:
+        forum_counters.bump(ForumPost, instance.forum_post_id, comment_count=-1 if instance.is_deleted else 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_counter_deleted(sender, instance, **kwargs):
+    # Soft-deleted comments were already subtracted
+    if not instance.is_deleted:
+        forum_counters.bump(ForumPost, instance.forum_post_id, comment_count=-1)
+
+
+# ============ Badges ============
+# Connected after the stats receivers above, so the UserStats counters these
+# read already include the change being saved.
+
+@receiver(post_save, sender=Task)
+def check_task_badges(sender, instance, created, **kwargs):
+    if created and instance.assigned_by_id:
+        check_stat_badges(instance.assigned_by, 'tasks_created')
 
     # For task completion badges, check all assignees
     if instance.status == "COMPLETED":
         for assigned_user in instance.assigned_to.all():
-            completed_tasks = Task.objects.filter(
-                assigned_to=assigned_user, status="COMPLETED"
-            ).count()
-            for badge in Badge.objects.filter(category="Task Completion"):
-                req = badge.requirement
-                if completed_tasks >= req.get("tasks_completed", 0):
-                    award_badge(assigned_user, badge.key)
+            check_stat_badges(assigned_user, 'tasks_completed')
 
 @receiver(m2m_changed, sender=Profile.following.through)
 def check_follow_badges(sender, instance, action, pk_set, **kwargs):
-    if action != "post_add":
+    if action != "post_add" or not pk_set:
         return
 
     # instance is the profile that initiated the follow (follower)
-    follower_profile = instance
-    follower_user = follower_profile.user
-
-    # Check "People Followed" badges for the follower
-    following_count = follower_profile.following.count()
-    for badge in Badge.objects.filter(category="People Followed"):
-        req = badge.requirement
-        if following_count >= req.get("following_count", 0):
-            award_badge(follower_user, badge.key)
+    check_stat_badges(instance.user, 'following_count')
 
     # pk_set contains the IDs of profiles being followed
-    # Check "Followers Gained" badges for each profile being followed
-    for followed_profile_id in pk_set:
-        followed_profile = Profile.objects.get(id=followed_profile_id)
-        followed_user = followed_profile.user
-        followers_count = followed_profile.followers.count()
-        for badge in Badge.objects.filter(category="Followers Gained"):
-            req = badge.requirement
-            if followers_count >= req.get("followers_count", 0):
-                award_badge(followed_user, badge.key)
+    for followed_profile in Profile.objects.filter(id__in=pk_set).select_related('user'):
+        check_stat_badges(followed_profile.user, 'followers_count')
 
 @receiver(post_save, sender=ForumPost)
 def forum_post_badges(sender, instance, created, **kwargs):
-    if not created:
-        return
-
-    author = instance.author
-    posts_count = ForumPost.objects.filter(author=author, is_deleted=False).count() # filter out soft deleted posts
-
-    for badge in Badge.objects.filter(category="Forum Posts"):
-        req = badge.requirement
-        if posts_count >= req.get("posts_count", 0):
-            award_badge(author, badge.key)
+    if created:
+        check_stat_badges(instance.author, 'posts_count')
 
 @receiver(post_save, sender=Comment)
 def forum_comment_badges(sender, instance, created, **kwargs):
-    if not created:
-        return
-
-    author = instance.author
-    comments_count = Comment.objects.filter(author=author, is_deleted=False).count()
-
-    for badge in Badge.objects.filter(category="Forum Answers / Replies"):
-        req = badge.requirement
-        if comments_count >= req.get("comments_count", 0):
-            award_badge(author, badge.key)
+    if created:
+        check_stat_badges(instance.author, 'comments_count')
 
 @receiver(post_save, sender=Profile)
 def welcome_badge(sender, instance, created, **kwargs):
     if created:
-        try:
-            badge = Badge.objects.get(key="tiny_sprout")
-            award_badge(instance.user, badge.key)
-        except Badge.DoesNotExist:
-            pass  
+        check_badges(instance.user, signed_up=1)
 
 
 @receiver(post_save, sender=GardenMembership)
@@ -429,24 +649,13 @@ def garden_membership_badges(sender, instance, created, **kwargs):
     if not created:
         return
 
-    user = instance.user
-
-
-    total_joined = GardenMembership.objects.filter(user=user, status='ACCEPTED').count()
-    for badge in Badge.objects.filter(category="Garden Joining"):
-        req = badge.requirement
-        if total_joined >= req.get("gardens_joined", 0):
-            award_badge(user, badge.key)
-
-
+    counters = ['gardens_joined']
+    # The first manager of a garden is the one who created it
     if instance.role == 'MANAGER':
         managers = GardenMembership.objects.filter(garden=instance.garden, role='MANAGER')
-        if managers.count() == 1: 
-            total_created = GardenMembership.objects.filter(user=user, role='MANAGER').count()
-            for badge in Badge.objects.filter(category="Garden Creation"):
-                req = badge.requirement
-                if total_created >= req.get("gardens_created", 0):
-                    award_badge(user, badge.key)
+        if managers.count() == 1:
+            counters.append('gardens_created')
+    check_stat_badges(instance.user, *counters)
 
 
 def get_season(dt):
@@ -462,92 +671,9 @@ def get_season(dt):
 
 @receiver(post_save, sender=EventAttendance)
 def event_attendance_badges(sender, instance, created, **kwargs):
-    user = instance.user
-
     # Only count GOING statuses
     if instance.status != "GOING":
         return
 
-    total_attended = EventAttendance.objects.filter(
-        user=user,
-        status="GOING",
-    ).count()
-
-    #  Participation Count Badges
-    for badge in Badge.objects.filter(category="Event Participation"):
-        req = badge.requirement or {}
-        needed = req.get("events_attended", None)
-        if needed is not None and total_attended >= needed:
-            award_badge(user, badge.key)
-
-    # Seasonal Badges
-    event = instance.event
-    season = get_season(event.start_at)
-
-    for badge in Badge.objects.filter(category="Event Seasonal"):
-        req = badge.requirement or {}
-        if req.get("season") == season:
-            award_badge(user, badge.key)
-
-
-@receiver(post_delete, sender=Garden)
-def delete_garden_chat(sender, instance, **kwargs):
-    """
-    Delete the garden chat from Firebase when the garden is deleted.
-    """
-    try:
-        from gardenplanner.apps.chat.firebase_config import get_firestore_client
-        db = get_firestore_client()
-        if db:
-            chat_ref = db.collection('chats').document(f'garden_{instance.id}')
-            chat_ref.delete()
-            print(f"Garden chat deleted for garden: {instance.name} (ID: {instance.id})")
-    except Exception as e:
-        print(f"Warning: Could not delete garden chat: {e}")
-@receiver(pre_save, sender=Garden)
-def geocode_garden_location(sender, instance, **kwargs):
-    """
-    Geocode the garden location using Nominatim API when location changes.
-    """
-    if instance.pk is None and instance.latitude is not None: # if this is a new object with coords already set
-        return
-    if not instance.location:
-        instance.latitude = None
-        instance.longitude = None
-        return
-
-    # Check if location has changed
-    try:
-        old_instance = Garden.objects.get(pk=instance.pk)
-        if old_instance.location == instance.location and instance.latitude is not None:
-            return  # No change in location and we already have coords
-    except Garden.DoesNotExist:
-        pass  # New object
-
-    try:
-        # Use OpenStreetMap Nominatim API
-        headers = {
-            'User-Agent': 'CommunityGardenApp/1.0',
-        }
-        response = requests.get(
-            f"https://nominatim.openstreetmap.org/search?format=json&q={instance.location}&limit=1",
-            headers=headers,
-            timeout=5
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data and len(data) > 0:
-                instance.latitude = float(data[0]['lat'])
-                instance.longitude = float(data[0]['lon'])
-            else:
-                # Could not geocode
-                instance.latitude = None
-                instance.longitude = None
-    except Exception as e:
-        print(f"Error geocoding garden location: {e}")
-        # Don't fail the save if geocoding fails
-
-
-
-
+    # Participation count and seasonal badges in one check
+    check_stat_badges(instance.user, 'events_attended', season=get_season(instance.event.start_at))
@@ -0,0 +1,148 @@
+"""
+Per-user activity counters stored in UserStats.
+
+Each counter is defined by the source rows it counts and the field linking them
+to a user. The same definition is used to compute one user's value after a
+change and to recompute every user's value in reconcile_user_stats. Signal
+handlers apply cheap F() increments where an event maps to a +1/-1 change.
+Counters that depend on state transitions (task status, membership status,
+soft deletes) are recomputed for the affected users.
+"""
+
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F
+
+from .models import (
+    Comment,
+    CommentLike,
+    EventAttendance,
+    ForumPost,
+    ForumPostLike,
+    GardenEvent,
+    GardenMembership,
+    Profile,
+    Task,
+    UserStats,
+)
+
+_RESPONSE_TIME = ExpressionWrapper(F('accepted_at') - F('created_at'), output_field=DurationField())
+
+# counter -> (source queryset, field holding the user id, aggregate)
+STAT_SOURCES = {
+    'followers_count': (Profile.following.through.objects.all(), 'to_profile__user_id', Count('pk')),
+    'following_count': (Profile.following.through.objects.all(), 'from_profile__user_id', Count('pk')),
+    'gardens_joined': (GardenMembership.objects.filter(status='ACCEPTED'), 'user_id', Count('pk')),
+    'gardens_managed': (GardenMembership.objects.filter(status='ACCEPTED', role='MANAGER'), 'user_id', Count('pk')),
+    'tasks_completed': (Task.objects.filter(status='COMPLETED'), 'assigned_to', Count('pk')),
+    'tasks_assigned_by': (Task.objects.all(), 'assigned_by_id', Count('pk')),
+    'tasks_assigned_to': (Task.objects.all(), 'assigned_to', Count('pk')),
+    'tasks_active_or_completed': (
+        Task.objects.filter(status__in=['PENDING', 'ACCEPTED', 'IN_PROGRESS', 'COMPLETED']), 'assigned_to', Count('pk')
+    ),
+    'average_task_response_seconds': (
+        Task.objects.filter(accepted_at__isnull=False), 'assigned_to', Avg(_RESPONSE_TIME)
+    ),
+    'posts_created': (ForumPost.objects.filter(is_deleted=False), 'author_id', Count('pk')),
+    'comments_made': (Comment.objects.filter(is_deleted=False), 'author_id', Count('pk')),
+    'post_likes_received': (ForumPostLike.objects.all(), 'post__author_id', Count('pk')),
+    'comment_likes_received': (CommentLike.objects.all(), 'comment__author_id', Count('pk')),
+    'best_answers': (ForumPost.objects.filter(best_answer__isnull=False), 'best_answer__author_id', Count('pk')),
+    'events_created': (GardenEvent.objects.all(), 'created_by_id', Count('pk')),
+    'events_attended': (EventAttendance.objects.filter(status='GOING'), 'user_id', Count('pk')),
+}
+
+TASK_ASSIGNEE_FIELDS = (
+    'tasks_completed', 'tasks_assigned_to', 'tasks_active_or_completed', 'average_task_response_seconds',
+)
+FOLLOW_FIELDS = ('followers_count', 'following_count')
+MEMBERSHIP_FIELDS = ('gardens_joined', 'gardens_managed')
+
+
+def _default(field):
+    return None if field == 'average_task_response_seconds' else 0
+
+
+def _normalize(field, value):
+    if field == 'average_task_response_seconds' and value is not None:
+        return value.total_seconds()
+    return value
+
+
+def compute_stats(user_ids=None, fields=None):
+    """
+    Recompute counters from the source tables, one grouped query per field.
+    Returns {user_id: {field: value}}; with user_ids=None every user with
+    activity is included.
+    """
+    fields = fields or list(STAT_SOURCES)
+    results = {}
+    if user_ids is not None:
+        user_ids = [user_id for user_id in user_ids if user_id is not None]
+        if not user_ids:
+            return results
+        for user_id in user_ids:
+            results[user_id] = {field: _default(field) for field in fields}
+
+    for field in fields:
+        queryset, user_field, aggregate = STAT_SOURCES[field]
+        if user_ids is not None:
+            queryset = queryset.filter(**{f'{user_field}__in': user_ids})
+        rows = queryset.order_by().values(user_field).annotate(value=aggregate).values_list(user_field, 'value')
+        for user_id, value in rows:
+            if user_id is None:
+                continue
+            user_values = results.setdefault(user_id, {name: _default(name) for name in fields})
+            user_values[field] = _normalize(field, value)
+    return results
+
+
+def refresh_stats(user_ids, fields=None):
+    """Recompute the given counters for users that already have a UserStats row."""
+    for user_id, values in compute_stats(set(user_ids), fields).items():
+        UserStats.objects.filter(user_id=user_id).update(**values)
+
+
+def bump(user_ids, **deltas):
+    """Apply +/- deltas to existing UserStats rows; missing rows are computed on first read."""
+    user_ids = [user_id for user_id in user_ids if user_id is not None]
+    if not user_ids:
+        return
+    UserStats.objects.filter(user_id__in=user_ids).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def get_user_stats(user):
+    """The user's UserStats row, computing it from the source tables if it does not exist yet."""
+    stats = UserStats.objects.filter(user=user).first()
+    if stats is None:
+        values = compute_stats([user.pk])[user.pk]
+        stats, _ = UserStats.objects.get_or_create(user=user, defaults=values)
+    return stats
+
+
+def _differs(stored, actual):
+    if stored is None or actual is None:
+        return stored != actual
+    return abs(stored - actual) > 1e-6
+
+
+def reconcile(fix=False):
+    """
+    Compare every stored UserStats row with values recomputed from the source
+    tables. Returns a list of (user_id, field, stored, actual) drift entries;
+    with fix=True the drifted rows are overwritten with the actual values.
+    """
+    actual = compute_stats()
+    empty = {field: _default(field) for field in STAT_SOURCES}
+    drift = []
+    for row in UserStats.objects.order_by('user_id').iterator():
+        expected = actual.get(row.user_id, empty)
+        changed = {
+            field: value for field, value in expected.items()
+            if _differs(getattr(row, field), value)
+        }
+        for field, value in changed.items():
+            drift.append((row.user_id, field, getattr(row, field), value))
+        if fix and changed:
+            UserStats.objects.filter(pk=row.pk).update(**changed)
+    return drift
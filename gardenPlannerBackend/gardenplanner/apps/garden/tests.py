@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.core.management import call_command
@@ -24,10 +24,15 @@ from .models import (
     EventCategory, 
     ForumPostLike, 
     CommentLike,
+    NotificationCategory,
 )
+from unittest import skipUnless
 from unittest.mock import patch, MagicMock
+from django.db import connection
+from .push import drain as drain_push_outbox
 from django.utils import timezone
 from datetime import timedelta
+from io import StringIO
 from push_notifications.models import GCMDevice
 from .serializers import ProfileSerializer
 
@@ -1876,6 +1881,10 @@ class ExtendedSerializerTests(TestCase):
 class UtilsTests(TestCase):
     """Tests for utility functions"""
     
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
     @patch('gardenplanner.apps.garden.utils.requests.get')
     def test_get_location_coordinates_success(self, mock_get):
         """Test successful geocoding"""
@@ -2351,6 +2360,8 @@ class SignalTests(TestCase):
         self.assertEqual(notifications.first().link, '/tasks')
         
         # Check push notification was sent with link
+        # Pushes go through the outbox; deliver them as the worker would
+        drain_push_outbox()
         self.assertTrue(mock_send_message.called)
         call_args = mock_send_message.call_args
         self.assertIn('extra', call_args[1])
@@ -2403,6 +2414,8 @@ class SignalTests(TestCase):
         self.assertEqual(notifications.first().link, f'/profile/{self.user.id}')
         
         # Check push notification was sent with link - check all calls for the follower notification
+        # Pushes go through the outbox; deliver them as the worker would
+        drain_push_outbox()
         self.assertTrue(mock_send_message.called)
         # Find the call that matches our follower notification
         follower_call = None
@@ -2445,6 +2458,8 @@ class SignalTests(TestCase):
         self.assertEqual(notifications.first().link, f'/forum/{self.post.id}')
         
         # Check push notification was sent with link - find the comment notification call
+        # Pushes go through the outbox; deliver them as the worker would
+        drain_push_outbox()
         self.assertTrue(mock_send_message.called)
         comment_call = None
         for call in mock_send_message.call_args_list:
@@ -2510,6 +2525,8 @@ class SignalTests(TestCase):
         # Check push notification for request
         # Since multiple notifications might be sent (one for request, one for accept), we check the calls
         # The first call should be for the request
+        # Pushes go through the outbox; deliver them as the worker would
+        drain_push_outbox()
         self.assertTrue(mock_send_message.called)
         # We expect at least 1 call
         self.assertGreaterEqual(mock_send_message.call_count, 1)
@@ -2529,6 +2546,8 @@ class SignalTests(TestCase):
         self.assertEqual(applicant_notifications.first().link, f'/gardens/{self.garden.id}')
         
         # Check push notification for acceptance
+        # Pushes go through the outbox; deliver them as the worker would
+        drain_push_outbox()
         self.assertTrue(mock_send_message.called)
         call_args = mock_send_message.call_args
         self.assertIn('extra', call_args[1])
@@ -2557,6 +2576,8 @@ class SignalTests(TestCase):
         self.assertEqual(notifications.first().link, f'/gardens/{self.garden.id}')
         
         # Check push notification was sent with link
+        # Pushes go through the outbox; deliver them as the worker would
+        drain_push_outbox()
         self.assertTrue(mock_send_message.called)
         call_args = mock_send_message.call_args
         self.assertIn('extra', call_args[1])
@@ -2564,8 +2585,7 @@ class SignalTests(TestCase):
         self.assertEqual(call_args[1]['extra']['link'], f'/gardens/{self.garden.id}')
 
 
-    @patch('gardenplanner.apps.garden.management.commands.send_weather_reminders.requests.get') 
-    def test_weather_alert_command_sends_notification(self, mock_requests_get):
+    def test_weather_alert_command_sends_notification(self):
         """
         Test that the weather command finds gardens with coordinates,
         detects bad weather, and notifies the member/manager.
@@ -2588,18 +2608,15 @@ class SignalTests(TestCase):
         # Clear all notifications before the test
         Notification.objects.all().delete()
 
-        # Mock the weather API response with proper structure
-        mock_response = MagicMock()
-        mock_response.json.return_value = {
-            'daily': {
+        # Serve the weather API from a local stub with proper structure
+        stub = OpenMeteoStub({
+            (41.0, 29.0): {
                 'weather_code': [0, 95],  # Index 0: today (clear), Index 1: tomorrow (thunderstorm)
                 'temperature_2m_max': [20.0, 25.0],  # Max temperatures as floats
                 'temperature_2m_min': [10.0, 5.0]   # Min temperatures as floats
             }
-        }
-        mock_response.status_code = 200
-
-        mock_requests_get.return_value = mock_response
+        })
+        self.addCleanup(stub.stop)
 
         # Verify garden has coordinates before command runs
         self.assertEqual(self.garden.latitude, 41.0)
@@ -2609,10 +2626,11 @@ class SignalTests(TestCase):
         memberships = GardenMembership.objects.filter(garden=self.garden, status='ACCEPTED')
         self.assertGreaterEqual(memberships.count(), 1, "No accepted memberships found")
 
-        call_command('send_weather_reminders')
+        with override_settings(OPEN_METEO_URL=stub.url):
+            call_command('send_weather_reminders', stdout=StringIO())
 
-        # Verify mock was called
-        self.assertTrue(mock_requests_get.called, "Weather API was not called")
+        # Verify the stub was called
+        self.assertTrue(stub.requests, "Weather API was not called")
 
         # Check notifications were created
         notifications = Notification.objects.filter(recipient=self.user, category='WEATHER')
@@ -3512,11 +3530,8 @@ class SignalHandlerTests(TestCase):
             name="Test Type"
         )
     
-    @patch('gardenplanner.apps.garden.signals.GCMDevice')
-    def test_task_creation_sends_notification(self, mock_gcm):
+    def test_task_creation_sends_notification(self):
         """Test that creating a task with assignee sends notification"""
-        mock_gcm.objects.filter.return_value.send_message = MagicMock()
-        
         task = Task.objects.create(
             garden=self.garden,
             title="New Task",
@@ -3531,11 +3546,8 @@ class SignalHandlerTests(TestCase):
         self.assertEqual(notifications.count(), 1)
         self.assertIn("assigned a new task", notifications.first().message)
     
-    @patch('gardenplanner.apps.garden.signals.GCMDevice')
-    def test_task_accepted_sends_notification(self, mock_gcm):
+    def test_task_accepted_sends_notification(self):
         """Test that accepting a task sends notification to assigner"""
-        mock_gcm.objects.filter.return_value.send_message = MagicMock()
-        
         task = Task.objects.create(
             garden=self.garden,
             title="Task",
@@ -3556,22 +3568,16 @@ class SignalHandlerTests(TestCase):
         self.assertEqual(notifications.count(), 1)
         self.assertIn("Task Your task has been Accepted.", notifications.first().message)
     
-    @patch('gardenplanner.apps.garden.signals.GCMDevice')
-    def test_follow_sends_notification(self, mock_gcm):
+    def test_follow_sends_notification(self):
         """Test that following a user sends notification"""
-        mock_gcm.objects.filter.return_value.send_message = MagicMock()
-        
         self.user1.profile.follow(self.user2.profile)
         
         notifications = Notification.objects.filter(recipient=self.user2, category='SOCIAL')
         self.assertEqual(notifications.count(), 1)
         self.assertIn("started following you", notifications.first().message)
     
-    @patch('gardenplanner.apps.garden.signals.GCMDevice')
-    def test_comment_sends_notification(self, mock_gcm):
+    def test_comment_sends_notification(self):
         """Test that commenting on a post sends notification to author"""
-        mock_gcm.objects.filter.return_value.send_message = MagicMock()
-        
         post = ForumPost.objects.create(
             author=self.user1,
             title="Test Post",
@@ -3588,11 +3594,8 @@ class SignalHandlerTests(TestCase):
         self.assertEqual(notifications.count(), 1)
         self.assertIn("commented on your post", notifications.first().message)
     
-    @patch('gardenplanner.apps.garden.signals.GCMDevice')
-    def test_notifications_disabled(self, mock_gcm):
+    def test_notifications_disabled(self):
         """Test that notifications are not created when disabled"""
-        mock_gcm.objects.filter.return_value.send_message = MagicMock()
-        
         self.user2.profile.receives_notifications = False
         self.user2.profile.save()
         
@@ -4246,6 +4249,10 @@ class GardenEventTests(APITestCase):
 class BadgeSystemTests(TestCase):
 
     def setUp(self):
+        # Badge rules are cached per process; drop the ones edited inside this test's transaction
+        from .badges import clear_rule_cache
+        self.addCleanup(clear_rule_cache)
+
         # 1. Setup users
         self.user_a = User.objects.create_user(username='badge_hunter', password='pw')
         self.user_b = User.objects.create_user(username='target_user', password='pw')
@@ -5016,3 +5023,2217 @@ class ImpactSummaryTests(APITestCase):
         response = self.client.get(self.url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ForumFeedQueryCountTests(APITestCase):
+    """The forum feed must cost a constant number of queries regardless of page size."""
+
+    def setUp(self):
+        self.viewer = User.objects.create_user(username='viewer', password='password123')
+        self.client.force_authenticate(user=self.viewer)
+        self.url = reverse('garden:forum-list-create')
+
+    def _create_posts(self, count):
+        from .models import ForumPostImage, CommentImage
+        for i in range(count):
+            author = User.objects.create_user(username=f'feedauthor{ForumPost.objects.count()}', password='password123')
+            post = ForumPost.objects.create(title=f'Post {i}', content='Content', author=author)
+            ForumPostImage.objects.create(post=post, data=b'img', mime_type='image/png')
+            ForumPostLike.objects.create(user=self.viewer, post=post)
+            comment = Comment.objects.create(forum_post=post, content='Reply', author=self.viewer)
+            CommentImage.objects.create(comment=comment, data=b'img', mime_type='image/png')
+            CommentLike.objects.create(user=author, comment=comment)
+            Comment.objects.create(forum_post=post, content='Removed', author=author, is_deleted=True)
+
+    def _count_queries(self, params=None):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), response
+
+    def test_feed_query_count_is_constant(self):
+        self._create_posts(2)
+        small_count, _ = self._count_queries()
+        self._create_posts(6)
+        large_count, response = self._count_queries()
+
+        self.assertEqual(len(response.data), 8)
+        self.assertEqual(small_count, large_count)
+
+    def test_feed_with_comments_query_count_is_constant(self):
+        self._create_posts(2)
+        small_count, _ = self._count_queries({'include_comments': 'true'})
+        self._create_posts(6)
+        large_count, response = self._count_queries({'include_comments': 'true'})
+
+        self.assertEqual(len(response.data[0]['comments']), 1)
+        self.assertEqual(small_count, large_count)
+
+    def test_feed_annotations_match_relations(self):
+        self._create_posts(1)
+        _, response = self._count_queries({'include_comments': 'true'})
+        post = response.data[0]
+
+        self.assertEqual(post['likes_count'], 1)
+        self.assertEqual(post['comments_count'], 1)
+        self.assertTrue(post['is_liked'])
+        self.assertEqual(len(post['images']), 1)
+        self.assertEqual(post['comments'][0]['likes_count'], 1)
+        self.assertFalse(post['comments'][0]['is_liked'])
+
+    def test_comment_list_query_count_is_constant(self):
+        self._create_posts(2)
+        url = reverse('garden:comment-list-create')
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+        self._create_posts(6)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+
+        self.assertEqual(len(response.data), 8)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+
+class CursorPaginationTests(APITestCase):
+    """Opt-in keyset pagination for feed, comments, notifications and tasks."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='pager', password='password123')
+        self.client.force_authenticate(user=self.user)
+        Notification.objects.all().delete()
+        for i in range(5):
+            Notification.objects.create(recipient=self.user, message=f'Message {i}', category='TASK')
+        self.url = reverse('garden:notification-list')
+
+    def _walk(self, params):
+        seen = []
+        response = self.client.get(self.url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(item['id'] for item in response.data['results'])
+            if not response.data['next']:
+                return seen
+            response = self.client.get(response.data['next'])
+
+    def test_unpaginated_by_default(self):
+        response = self.client.get(self.url)
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 5)
+
+    def test_page_size_opts_in_and_walks_every_row_once(self):
+        seen = self._walk({'page_size': 2})
+        expected = list(Notification.objects.filter(recipient=self.user).order_by('-timestamp', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_page_size_is_capped(self):
+        response = self.client.get(self.url, {'page_size': 10000, 'paginate': 'true'})
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+
+    def test_default_switch_and_opt_out(self):
+        with self.settings(CURSOR_PAGINATION_DEFAULT=True):
+            paginated = self.client.get(self.url)
+            opted_out = self.client.get(self.url, {'paginate': 'false'})
+        self.assertIn('results', paginated.data)
+        self.assertIsInstance(opted_out.data, list)
+
+    def test_forum_feed_pages_newest_first(self):
+        for i in range(3):
+            ForumPost.objects.create(title=f'Post {i}', content='Content', author=self.user)
+        response = self.client.get(reverse('garden:forum-list-create'), {'page_size': 2})
+        self.assertEqual([p['title'] for p in response.data['results']], ['Post 2', 'Post 1'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([p['title'] for p in response.data['results']], ['Post 0'])
+
+    def test_comments_page_oldest_first(self):
+        post = ForumPost.objects.create(title='Post', content='Content', author=self.user)
+        for i in range(3):
+            Comment.objects.create(forum_post=post, content=f'Reply {i}', author=self.user)
+        response = self.client.get(reverse('garden:comment-list-create'), {'forum_post': post.id, 'page_size': 2})
+        self.assertEqual([c['content'] for c in response.data['results']], ['Reply 0', 'Reply 1'])
+
+    def test_task_list_paginates(self):
+        garden = Garden.objects.create(name='Paged Garden', is_public=True)
+        GardenMembership.objects.create(user=self.user, garden=garden, role='MANAGER', status='ACCEPTED')
+        for i in range(3):
+            Task.objects.create(garden=garden, title=f'Task {i}', assigned_by=self.user)
+        response = self.client.get(reverse('garden:task-list'), {'garden': garden.id, 'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+
+    def test_task_ordering_keeps_a_tie_breaker_and_pages_nullable_columns_by_number(self):
+        garden = Garden.objects.create(name='Ordered Garden', is_public=True)
+        GardenMembership.objects.create(user=self.user, garden=garden, role='MANAGER', status='ACCEPTED')
+        due = timezone.now()
+        tasks = [
+            Task.objects.create(garden=garden, title=f'Task {i}', assigned_by=self.user, due_date=due if i % 2 else None)
+            for i in range(5)
+        ]
+        self.url = reverse('garden:task-list')
+
+        seen = self._walk({'garden': garden.id, 'ordering': 'due_date', 'page_size': 2})
+        self.assertEqual(sorted(seen), sorted(task.id for task in tasks))
+        response = self.client.get(self.url, {'garden': garden.id, 'ordering': 'due_date', 'page_size': 2, 'page': 2})
+        self.assertEqual(self.client.get(response.data['previous']).status_code, status.HTTP_200_OK)
+
+        # Columns with few distinct values are numbered pages too, ordered by id among equal values
+        Task.objects.filter(garden=garden).update(status='PENDING')
+        seen = self._walk({'garden': garden.id, 'ordering': 'status', 'page_size': 2})
+        self.assertEqual(seen, [task.id for task in tasks])
+        response = self.client.get(self.url, {'garden': garden.id, 'ordering': 'status', 'page_size': 2})
+        self.assertIn('page=2', response.data['next'])
+
+        # Timestamps stay on the cursor; both kinds of page have the same keys
+        cursor = self.client.get(self.url, {'garden': garden.id, 'ordering': '-created_at', 'page_size': 2})
+        self.assertIn('cursor=', cursor.data['next'])
+        self.assertEqual(set(cursor.data), set(response.data))
+        self.assertEqual(set(response.data), {'next', 'previous', 'results'})
+
+
+class ImageEndpointTests(APITestCase):
+    """Signed binary image URLs with conditional GET support."""
+
+    def setUp(self):
+        from .models import GardenImage, ForumPostImage
+        self.user = User.objects.create_user(username='imager', password='password123')
+        self.client.force_authenticate(user=self.user)
+        self.garden = Garden.objects.create(name='Image Garden', is_public=True)
+        self.garden_image = GardenImage.objects.create(garden=self.garden, data=b'garden-bytes', mime_type='image/png', is_cover=True)
+        self.post = ForumPost.objects.create(title='Post', content='Content', author=self.user)
+        self.post_image = ForumPostImage.objects.create(post=self.post, data=b'post-bytes', mime_type='image/gif')
+        self.user.profile.profile_picture_data = b'avatar-bytes'
+        self.user.profile.profile_picture_mime_type = 'image/jpeg'
+        self.user.profile.save()
+
+    def _get(self, url, **headers):
+        self.client.force_authenticate(user=None)
+        return self.client.get(url, **headers)
+
+    def test_feed_emits_urls_when_requested(self):
+        response = self.client.get(reverse('garden:forum-list-create'), {'image_format': 'url'})
+        post = response.data[0]
+        self.assertTrue(post['images'][0]['image_base64'].startswith('http://testserver/api/images/post/'))
+        self.assertIn('/api/images/profile/', post['author_profile_picture'])
+
+    def test_feed_keeps_data_uris_by_default(self):
+        response = self.client.get(reverse('garden:forum-list-create'))
+        self.assertTrue(response.data[0]['images'][0]['image_base64'].startswith('data:image/gif;base64,'))
+
+    def test_image_url_streams_bytes_with_validators(self):
+        response = self.client.get(reverse('garden:garden-detail', args=[self.garden.id]), {'image_format': 'url'})
+        url = response.data['cover_image']['image_base64']
+
+        image = self._get(url)
+        self.assertEqual(image.status_code, status.HTTP_200_OK)
+        self.assertEqual(image['Content-Type'], 'image/png')
+        self.assertEqual(b''.join(image.streaming_content), b'garden-bytes')
+        self.assertIn('ETag', image)
+        self.assertIn('Last-Modified', image)
+
+    def test_conditional_get_returns_304(self):
+        from .images import image_url
+        url = image_url(None, 'post', self.post_image.id, self.post_image.created_at)
+        first = self._get(url)
+        etag = first['ETag']
+
+        by_etag = self._get(url, HTTP_IF_NONE_MATCH=etag)
+        by_date = self._get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(by_etag.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(by_date.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_profile_picture_url(self):
+        from .images import image_url
+        profile = self.user.profile
+        response = self._get(image_url(None, 'profile', profile.id, profile.profile_picture_updated_at))
+        self.assertEqual(b''.join(response.streaming_content), b'avatar-bytes')
+
+    def test_bad_signature_or_kind_is_404(self):
+        url = reverse('garden:image', kwargs={'kind': 'post', 'pk': self.post_image.id})
+        self.assertEqual(self._get(url + '?sig=forged').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self._get(reverse('garden:image', kwargs={'kind': 'user', 'pk': 1})).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_missing_profile_picture_is_404(self):
+        from .images import image_url
+        other = User.objects.create_user(username='nopicture', password='password123')
+        response = self._get(image_url(None, 'profile', other.profile.id, other.profile.profile_picture_updated_at))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_url_of_replaced_version_is_404(self):
+        from .images import image_url
+        profile = self.user.profile
+        old_url = image_url(None, 'profile', profile.id, profile.profile_picture_updated_at)
+        # Swapping the version in a signed URL does not help either
+        forged = old_url.replace(f'v={profile.profile_picture_updated_at:%Y%m%d%H%M%S%f}', 'v=0')
+        profile.profile_picture_data = b'new-avatar'
+        profile.save()
+
+        self.assertEqual(self._get(old_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self._get(forged).status_code, status.HTTP_404_NOT_FOUND)
+        new_url = image_url(None, 'profile', profile.id, profile.profile_picture_updated_at)
+        self.assertEqual(b''.join(self._get(new_url).streaming_content), b'new-avatar')
+
+    def test_profile_edits_keep_the_picture_url(self):
+        from .images import image_url
+        from .models import Profile
+        profile = self.user.profile
+        url = image_url(None, 'profile', profile.id, profile.profile_picture_updated_at)
+        profile.location = 'Istanbul'
+        profile.save()
+        # Instances loaded without the picture bytes do not move the version either
+        deferred = Profile.objects.get(pk=profile.pk)
+        deferred.is_private = True
+        deferred.save()
+        loaded = Profile.objects.with_data().get(pk=profile.pk)
+        loaded.receives_notifications = False
+        loaded.save()
+
+        self.assertEqual(self._get(url).status_code, status.HTTP_200_OK)
+        loaded.profile_picture_data = b'avatar-bytes'
+        loaded.save(update_fields=['profile_picture_data'])
+        self.assertEqual(self._get(url).status_code, status.HTTP_200_OK)
+        loaded.profile_picture_data = b'replaced'
+        loaded.save(update_fields=['profile_picture_data'])
+        self.assertEqual(self._get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_images_of_deleted_post_or_comment_are_404(self):
+        from .images import image_url
+        from .models import CommentImage
+        comment = Comment.objects.create(forum_post=self.post, author=self.user, content='Comment')
+        comment_image = CommentImage.objects.create(comment=comment, data=b'comment-bytes')
+        post_url = image_url(None, 'post', self.post_image.id, self.post_image.created_at)
+        comment_url = image_url(None, 'comment', comment_image.id, comment_image.created_at)
+        self.assertEqual(self._get(comment_url).status_code, status.HTTP_200_OK)
+
+        Comment.objects.filter(pk=comment.pk).update(is_deleted=True)
+        self.assertEqual(self._get(comment_url).status_code, status.HTTP_404_NOT_FOUND)
+        ForumPost.objects.filter(pk=self.post.pk).update(is_deleted=True)
+        self.assertEqual(self._get(post_url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_signature_follows_secret_key(self):
+        from django.test import override_settings
+        from .images import image_url
+        url = image_url(None, 'post', self.post_image.id, self.post_image.created_at)
+        with override_settings(SECRET_KEY='rotated-secret-key'):
+            self.assertEqual(self._get(url).status_code, status.HTTP_404_NOT_FOUND)
+            rotated = image_url(None, 'post', self.post_image.id, self.post_image.created_at)
+            self.assertEqual(self._get(rotated).status_code, status.HTTP_200_OK)
+
+
+class ImageVariantTests(APITestCase):
+    """Resized image variants selected with ?image_variant=."""
+
+    def setUp(self):
+        from .models import ForumPostImage
+        self.user = User.objects.create_user(username='variants', password='password123')
+        self.client.force_authenticate(user=self.user)
+        self.post = ForumPost.objects.create(title='Post', content='Content', author=self.user)
+        self.image = ForumPostImage.objects.create(post=self.post, data=self._png(1600, 800), mime_type='image/png')
+
+    @staticmethod
+    def _png(width, height):
+        import io
+        from PIL import Image
+        out = io.BytesIO()
+        Image.new('RGB', (width, height), (30, 120, 40)).save(out, format='PNG')
+        return out.getvalue()
+
+    @staticmethod
+    def _size(data):
+        import io
+        from PIL import Image
+        if isinstance(data, str):
+            import base64
+            data = base64.b64decode(data.split(',', 1)[1])
+        return Image.open(io.BytesIO(data)).size
+
+    def _feed_image(self, **params):
+        response = self.client.get(reverse('garden:forum-list-create'), params)
+        return response.data[0]['images'][0]['image_base64']
+
+    def test_inline_thumbnail_is_downscaled_and_stored(self):
+        from .models import ImageVariant
+        value = self._feed_image(image_variant='thumb')
+        self.assertTrue(value.startswith('data:image/png;base64,'))
+        self.assertEqual(self._size(value), (128, 64))
+        self.assertTrue(ImageVariant.objects.filter(kind='post', object_id=self.image.id, variant='thumb').exists())
+
+        # The stored variant is reused on the next request
+        self.assertEqual(self._feed_image(image_variant='thumb'), value)
+        self.assertEqual(ImageVariant.objects.count(), 1)
+
+    def test_original_is_default(self):
+        value = self._feed_image()
+        self.assertEqual(self._size(value), (1600, 800))
+
+    def test_variant_url_serves_resized_bytes(self):
+        url = self._feed_image(image_format='url', image_variant='medium')
+        self.assertIn('variant=medium', url)
+        self.client.force_authenticate(user=None)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._size(b''.join(response.streaming_content)), (640, 320))
+        self.assertIn('-medium-', response['ETag'])
+
+    def test_unknown_variant_is_404(self):
+        from .images import image_url
+        url = image_url(None, 'post', self.image.id, self.image.created_at) + '&variant=huge'
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_variants_removed_with_source_image(self):
+        from .models import ImageVariant
+        self._feed_image(image_variant='thumb')
+        self.image.delete()
+        self.assertFalse(ImageVariant.objects.exists())
+
+    def test_undecodable_image_falls_back_to_original(self):
+        from .images import variant_bytes
+        data, mime = variant_bytes('post', 999, 'thumb', None, lambda: (b'not-an-image', 'image/jpeg'))
+        self.assertEqual((data, mime), (b'not-an-image', 'image/jpeg'))
+
+        # The outcome is stored, so the image is not decoded again
+        loads = []
+        data, mime = variant_bytes('post', 999, 'thumb', None, lambda: loads.append(1))
+        self.assertEqual((data, mime, loads), (b'not-an-image', 'image/jpeg', []))
+
+    def test_small_image_is_stored_as_its_own_variant(self):
+        from .models import ForumPostImage, ImageVariant
+        ForumPostImage.objects.all().delete()
+        small = ForumPostImage.objects.create(post=self.post, data=self._png(8, 8), mime_type='image/png')
+        value = self._feed_image(image_variant='thumb')
+        self.assertEqual(self._size(value), (8, 8))
+        stored = ImageVariant.objects.get(kind='post', object_id=small.id, variant='thumb')
+        self.assertEqual(bytes(stored.data), bytes(small.data))
+
+    def test_decompression_bomb_is_served_as_is(self):
+        from PIL import Image
+        from .images import render_variant
+        with patch.object(Image, 'MAX_IMAGE_PIXELS', 1000):
+            self.assertIsNone(render_variant(self._png(200, 200), 128))
+
+    def test_inline_variants_are_loaded_in_one_query(self):
+        from django.test.utils import CaptureQueriesContext
+        from .models import ForumPostImage
+
+        def feed_queries():
+            self._feed_image(image_variant='thumb')
+            # The second request only reads the stored variants
+            with CaptureQueriesContext(connection) as queries:
+                self._feed_image(image_variant='thumb')
+            return len(queries.captured_queries)
+
+        small = feed_queries()
+        for index in range(4):
+            post = ForumPost.objects.create(title=f'Post {index}', content='Content', author=self.user)
+            ForumPostImage.objects.create(post=post, data=self._png(400, 200), mime_type='image/png')
+        self.assertEqual(feed_queries(), small)
+
+
+class DeferredImageBlobTests(APITestCase):
+    """Image bytes are only loaded by code paths that render them."""
+
+    def setUp(self):
+        from .models import ForumPostImage
+        self.user = User.objects.create_user(username='blobs', password='password123')
+        self.user.profile.profile_picture_data = b'avatar'
+        self.user.profile.save()
+        self.client.force_authenticate(user=self.user)
+        self.post = ForumPost.objects.create(title='Post', content='Content', author=self.user)
+        ForumPostImage.objects.create(post=self.post, data=b'post-image', mime_type='image/png')
+        ForumPostLike.objects.create(user=self.user, post=self.post)
+
+    def test_managers_defer_blob_columns(self):
+        from .models import ForumPostImage
+        self.assertIn('profile_picture_data', Profile.objects.get(user=self.user).get_deferred_fields())
+        self.assertIn('data', ForumPostImage.objects.get(post=self.post).get_deferred_fields())
+        self.assertNotIn('data', ForumPostImage.objects.with_data().get(post=self.post).get_deferred_fields())
+        # Instances reached through the base manager are loaded in full
+        self.assertEqual(User.objects.get(pk=self.user.pk).profile.get_deferred_fields(), set())
+
+    def test_url_mode_feed_does_not_load_blobs(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        posts = list(ForumPost.objects.filter(pk=self.post.pk).for_feed(self.user, image_data=False))
+        self.assertIn('profile_picture_data', posts[0].author.profile.get_deferred_fields())
+        self.assertIn('data', posts[0].images.all()[0].get_deferred_fields())
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('garden:forum-list-create'), {'image_format': 'url'})
+        self.assertEqual(len(queries), 2)
+        self.assertIn('/api/images/profile/', response.data[0]['author_profile_picture'])
+        self.assertIn('/api/images/post/', response.data[0]['images'][0]['image_base64'])
+
+    def test_inline_feed_loads_blobs_without_extra_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('garden:forum-list-create'))
+        self.assertEqual(len(queries), 2)
+        self.assertTrue(response.data[0]['author_profile_picture'].startswith('data:image/jpeg;base64,'))
+
+    def test_likers_list_in_both_modes(self):
+        url = reverse('garden:post-likes-list', args=[self.post.id])
+        inline = self.client.get(url)
+        linked = self.client.get(url, {'image_format': 'url'})
+        self.assertTrue(inline.data[0]['profile_picture'].startswith('data:'))
+        self.assertIn('/api/images/profile/', linked.data[0]['profile_picture'])
+
+    def test_benchmark_scenario_rolls_back(self):
+        from io import StringIO
+        out = StringIO()
+        call_command('benchmark', scenario='image_blobs', scale=2, stdout=out)
+        self.assertIn('token lookup, picture deferred', out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith='bench_blob_').exists())
+
+
+@override_settings(PUSH_NOTIFICATION_BACKEND='gardenplanner.apps.garden.push.FakePushBackend')
+class PushOutboxTests(TestCase):
+    """Push notifications are queued and delivered by the outbox worker."""
+
+    def setUp(self):
+        from .push import FakePushBackend
+        FakePushBackend.reset()
+        self.sent = FakePushBackend.sent
+        self.user = User.objects.create_user(username='pusher', password='password123')
+        self.user2 = User.objects.create_user(username='pushed', password='password123')
+
+        # Clear notifications and pushes created by signals during user creation
+        from .models import PushOutbox
+        Notification.objects.all().delete()
+        PushOutbox.objects.all().delete()
+
+    def _notify(self):
+        from .signals import _send_notification
+        _send_notification(self.user2, 'New follower', 'pusher started following you.',
+                           NotificationCategory.SOCIAL, link='/profile/pusher')
+
+    def _outbox(self):
+        from .models import PushOutbox
+        return PushOutbox.objects.get()
+
+    def test_signal_enqueues_instead_of_sending(self):
+        from .models import PushOutbox
+        self._notify()
+
+        self.assertEqual(Notification.objects.filter(recipient=self.user2).count(), 1)
+        self.assertEqual(self.sent, [])
+        message = self._outbox()
+        self.assertEqual(message.recipient_ids, [self.user2.id])
+        self.assertEqual(message.payload['type'], 'SOCIAL')
+        self.assertEqual(message.payload['link'], '/profile/pusher')
+
+        stats = drain_push_outbox()
+        self.assertEqual(stats, {'sent': 1, 'retried': 0, 'dead': 0})
+        self.assertEqual(self.sent[0]['recipient_ids'], [self.user2.id])
+        self.assertEqual(PushOutbox.objects.get().status, 'SENT')
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        from .push import FakePushBackend, deliver_pending
+        FakePushBackend.failures = 1
+        self._notify()
+
+        self.assertEqual(deliver_pending(), {'sent': 0, 'retried': 1, 'dead': 0})
+        message = self._outbox()
+        self.assertEqual((message.status, message.attempts), ('PENDING', 1))
+        self.assertIn('Simulated push delivery failure', message.last_error)
+        self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=20))
+
+        # Not due yet, so nothing is sent until the backoff has passed
+        self.assertEqual(deliver_pending(), {'sent': 0, 'retried': 0, 'dead': 0})
+        message.next_attempt_at = timezone.now()
+        message.save()
+        self.assertEqual(deliver_pending()['sent'], 1)
+        self.assertEqual(self._outbox().attempts, 2)
+
+    @override_settings(PUSH_OUTBOX_MAX_ATTEMPTS=2)
+    def test_message_is_dead_lettered_after_max_attempts(self):
+        from .models import PushOutbox
+        from .push import FakePushBackend, deliver_pending
+        FakePushBackend.failures = 5
+        self._notify()
+
+        deliver_pending()
+        PushOutbox.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_pending(), {'sent': 0, 'retried': 0, 'dead': 1})
+        self.assertEqual(self._outbox().status, 'DEAD')
+        self.assertEqual(self.sent, [])
+
+    def test_worker_command_once(self):
+        from io import StringIO
+        from .models import PushOutbox
+        self._notify()
+        PushOutbox.objects.create(recipient_ids=[self.user.id], payload={}, status='SENT',
+                                  sent_at=timezone.now() - timedelta(days=30))
+
+        out = StringIO()
+        call_command('deliver_push_notifications', once=True, stdout=out)
+        self.assertIn('Sent 1, retrying 0, dead 0, purged 1', out.getvalue())
+        self.assertEqual(len(self.sent), 1)
+
+
+class BulkNotificationTests(TestCase):
+    """send_notifications_bulk fans out in a constant number of queries."""
+
+    def setUp(self):
+        from .models import PushOutbox
+        self.garden = Garden.objects.create(name='Big Garden', is_public=True)
+        self.members = [User.objects.create_user(username=f'member{i}', password='password123') for i in range(6)]
+        Notification.objects.all().delete()
+        PushOutbox.objects.all().delete()
+
+    def _count_queries(self, func):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            result = func()
+        return len(ctx), result
+
+    def test_skips_disabled_recipients_and_batches_pushes(self):
+        from .models import PushOutbox
+        from .signals import send_notifications_bulk
+        Profile.objects.filter(user=self.members[0]).update(receives_notifications=False)
+
+        with self.settings(PUSH_MULTICAST_BATCH_SIZE=2):
+            count = send_notifications_bulk(self.members + [None], 'Title', 'Body', NotificationCategory.WEATHER)
+
+        self.assertEqual(count, 5)
+        self.assertEqual(Notification.objects.filter(category='WEATHER').count(), 5)
+        self.assertFalse(Notification.objects.filter(recipient=self.members[0]).exists())
+        batches = list(PushOutbox.objects.order_by('id').values_list('recipient_ids', flat=True))
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+        self.assertEqual(sorted(sum(batches, [])), sorted(m.id for m in self.members[1:]))
+
+    def test_query_count_does_not_grow_with_recipients(self):
+        from .signals import send_notifications_bulk
+        few, _ = self._count_queries(
+            lambda: send_notifications_bulk(self.members[:2], 'Title', 'Body', NotificationCategory.SOCIAL)
+        )
+        many, _ = self._count_queries(
+            lambda: send_notifications_bulk(self.members, 'Title', 'Body', NotificationCategory.SOCIAL)
+        )
+        self.assertEqual(few, many)
+
+    def test_weather_alert_notifies_accepted_members(self):
+        from .management.commands.send_weather_reminders import notify_garden_members
+        for member in self.members[:4]:
+            GardenMembership.objects.create(user=member, garden=self.garden, status='ACCEPTED')
+        GardenMembership.objects.create(user=self.members[4], garden=self.garden, status='PENDING')
+        Notification.objects.all().delete()
+
+        queries, count = self._count_queries(lambda: notify_garden_members(self.garden, 'Heavy Rain', 20, 10))
+        self.assertEqual(count, 4)
+        self.assertLessEqual(queries, 4)
+        self.assertEqual(Notification.objects.filter(category='WEATHER').count(), 4)
+
+    def test_join_request_notifies_all_managers(self):
+        for manager in self.members[:3]:
+            GardenMembership.objects.create(user=manager, garden=self.garden, role='MANAGER', status='ACCEPTED')
+        Notification.objects.all().delete()
+
+        GardenMembership.objects.create(user=self.members[5], garden=self.garden, status='PENDING')
+        notified = Notification.objects.filter(message__contains='has requested to join')
+        self.assertEqual(sorted(notified.values_list('recipient_id', flat=True)), sorted(m.id for m in self.members[:3]))
+
+
+class BadgeEngineTests(TestCase):
+    """Cached badge rules awarded with one bulk insert."""
+
+    def setUp(self):
+        from .badges import clear_rule_cache
+        self.addCleanup(clear_rule_cache)
+        self.user = User.objects.create_user(username='engine', password='password123')
+        self.other = User.objects.create_user(username='engine_other', password='password123')
+        self.post = ForumPost.objects.create(title='Post', content='Content', author=self.other)
+
+    def _badge_queries(self, func):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        return [q['sql'] for q in ctx.captured_queries if 'garden_badge' in q['sql'] or 'garden_userbadge' in q['sql']]
+
+    def test_held_badges_cost_one_lookup_and_no_insert(self):
+        Comment.objects.create(forum_post=self.post, content='First', author=self.user)
+        self.assertTrue(UserBadge.objects.filter(user=self.user, badge__key='helpful_seedling').exists())
+
+        queries = self._badge_queries(
+            lambda: Comment.objects.create(forum_post=self.post, content='Second', author=self.user)
+        )
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0].startswith('SELECT'))
+
+    def test_all_newly_met_badges_awarded_together(self):
+        from .badges import check_badges
+        Notification.objects.all().delete()
+
+        awarded = check_badges(self.user, posts_count=10)
+        self.assertCountEqual(awarded, ['talkative_tulip', 'friendly_fern'])
+        self.assertEqual(Notification.objects.filter(recipient=self.user, category='BADGE').count(), 2)
+
+        # Already held badges are not awarded or announced again
+        self.assertEqual(check_badges(self.user, posts_count=10), [])
+        self.assertEqual(Notification.objects.filter(recipient=self.user, category='BADGE').count(), 2)
+
+    def test_counters_come_from_user_stats(self):
+        from django.test.utils import CaptureQueriesContext
+        from .models import UserStats
+        from .stats import get_user_stats
+        get_user_stats(self.user)
+        # Nine posts already counted in the user's stats row
+        UserStats.objects.filter(user=self.user).update(posts_created=9)
+
+        with CaptureQueriesContext(connection) as ctx:
+            ForumPost.objects.create(title='Tenth', content='Content', author=self.user)
+        self.assertTrue(UserBadge.objects.filter(user=self.user, badge__key='friendly_fern').exists())
+        self.assertFalse(any('COUNT(' in q['sql'] for q in ctx.captured_queries))
+
+    def test_badge_added_later_reaches_users_who_already_qualify(self):
+        for n in range(3):
+            ForumPost.objects.create(title=f'Post {n}', content='Content', author=self.user)
+        Badge.objects.create(key='three_posts', name='Three Posts', category='Forum Posts', requirement={'posts_count': 3})
+
+        # The next post is past the threshold, yet the badge is still awarded
+        ForumPost.objects.create(title='Post 4', content='Content', author=self.user)
+        self.assertTrue(UserBadge.objects.filter(user=self.user, badge__key='three_posts').exists())
+
+    def test_rule_cache_follows_changes_made_by_other_processes(self):
+        from .badges import check_badges
+        from .cache import badge_catalogue
+        check_badges(self.user, posts_count=0)
+        # Another process edits the badges: this one only sees the shared version move
+        Badge.objects.bulk_create([
+            Badge(key='zero_posts', name='Zero Posts', category='Forum Posts', requirement={'posts_count': 0})
+        ])
+        self.assertEqual(check_badges(self.user, posts_count=0), [])
+        badge_catalogue.invalidate()
+        self.assertEqual(check_badges(self.user, posts_count=0), ['zero_posts'])
+
+    def test_rule_cache_follows_badge_changes(self):
+        from .badges import check_badges
+        check_badges(self.user, posts_count=0)
+        Badge.objects.create(key='zero_posts', name='Zero Posts', category='Forum Posts', requirement={'posts_count': 0})
+        self.assertEqual(check_badges(self.user, posts_count=0), ['zero_posts'])
+
+
+class UserStatsTests(APITestCase):
+    """Materialized activity counters behind the impact summary."""
+
+    def setUp(self):
+        from .stats import get_user_stats
+        self.user = User.objects.create_user(username='stats_user', password='password123')
+        self.other = User.objects.create_user(username='stats_other', password='password123')
+        self.garden = Garden.objects.create(name='Stats Garden', is_public=True)
+        self.client.force_authenticate(self.other)
+        # Create the rows up front so the tests exercise the incremental updates
+        get_user_stats(self.user)
+        get_user_stats(self.other)
+
+    def _stats(self, user=None):
+        from .models import UserStats
+        return UserStats.objects.get(user=user or self.user)
+
+    def test_forum_counters_follow_signals(self):
+        post = ForumPost.objects.create(title='Post', content='Content', author=self.user)
+        comment = Comment.objects.create(forum_post=post, content='Answer', author=self.user)
+        like = ForumPostLike.objects.create(post=post, user=self.other)
+        CommentLike.objects.create(comment=comment, user=self.other)
+        other_post = ForumPost.objects.create(title='Question', content='Help', author=self.other)
+        other_post.best_answer = comment
+        other_post.save()
+
+        stats = self._stats()
+        self.assertEqual(
+            (stats.posts_created, stats.comments_made, stats.post_likes_received,
+             stats.comment_likes_received, stats.best_answers),
+            (1, 1, 1, 1, 1),
+        )
+
+        like.delete()
+        post.delete()  # soft delete
+        other_post.best_answer = None
+        other_post.save()
+        stats = self._stats()
+        self.assertEqual((stats.posts_created, stats.post_likes_received, stats.best_answers), (0, 0, 0))
+
+    def test_follow_task_and_membership_counters(self):
+        self.other.profile.following.add(self.user.profile)
+        self.assertEqual(self._stats().followers_count, 1)
+        self.assertEqual(self._stats(self.other).following_count, 1)
+        self.other.profile.following.remove(self.user.profile)
+        self.assertEqual(self._stats().followers_count, 0)
+
+        GardenMembership.objects.create(user=self.user, garden=self.garden, role='MANAGER', status='ACCEPTED')
+        self.assertEqual((self._stats().gardens_joined, self._stats().gardens_managed), (1, 1))
+
+        task = Task.objects.create(garden=self.garden, title='Water', assigned_by=self.other)
+        task.assigned_to.add(self.user)
+        self.assertEqual(self._stats().tasks_assigned_to, 1)
+        self.assertEqual(self._stats(self.other).tasks_assigned_by, 1)
+        task.status = 'COMPLETED'
+        task.save()
+        self.assertEqual(self._stats().tasks_completed, 1)
+        task.delete()
+        self.assertEqual((self._stats().tasks_assigned_to, self._stats().tasks_completed), (0, 0))
+        self.assertEqual(self._stats(self.other).tasks_assigned_by, 0)
+
+    def test_impact_summary_reads_single_stats_row(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        ForumPost.objects.create(title='Post', content='Content', author=self.user)
+        url = reverse('garden:user-impact-summary', kwargs={'user_id': self.user.id})
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['posts_created'], 1)
+        stats_queries = [q['sql'] for q in ctx.captured_queries if 'garden_userstats' in q['sql']]
+        self.assertEqual(len(stats_queries), 1)
+        self.assertFalse(any('garden_forumpost' in q['sql'] for q in ctx.captured_queries))
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        from io import StringIO
+        from .models import UserStats
+        ForumPost.objects.create(title='Post', content='Content', author=self.user)
+        UserStats.objects.filter(user=self.user).update(posts_created=7, events_created=2)
+
+        out = StringIO()
+        call_command('reconcile_user_stats', stdout=out)
+        self.assertIn('posts_created stored=7 actual=1', out.getvalue())
+        self.assertEqual(self._stats().posts_created, 7)
+
+        call_command('reconcile_user_stats', '--fix', stdout=StringIO())
+        self.assertEqual((self._stats().posts_created, self._stats().events_created), (1, 0))
+
+        out = StringIO()
+        call_command('reconcile_user_stats', stdout=out)
+        self.assertIn('consistent', out.getvalue())
+
+
+class MembershipResolverTests(APITestCase):
+    """Memberships are loaded once per request and shared by permissions, views and serializers."""
+
+    def setUp(self):
+        self.manager = User.objects.create_user(username='resolver_manager', password='password123')
+        self.worker = User.objects.create_user(username='resolver_worker', password='password123')
+        self.garden = Garden.objects.create(name='Resolver Garden', is_public=False)
+        GardenMembership.objects.create(user=self.manager, garden=self.garden, role='MANAGER', status='ACCEPTED')
+        GardenMembership.objects.create(user=self.worker, garden=self.garden, role='WORKER', status='ACCEPTED')
+        self.task = Task.objects.create(garden=self.garden, title='Weed', assigned_by=self.manager)
+
+    def _post(self, user, name, data=None):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse(name, args=[self.task.id]), data or {}, format='json')
+        membership_queries = [
+            q['sql'] for q in ctx.captured_queries
+            if 'FROM "garden_gardenmembership"' in q['sql'] and '"garden_gardenmembership"."user_id" IN' not in q['sql']
+        ]
+        return response, membership_queries
+
+    def test_assignee_actions_load_memberships_once(self):
+        self.task.assigned_to.add(self.worker)
+        for name, expected_status in [
+            ('garden:task-accept-task', 'IN_PROGRESS'),
+            ('garden:task-complete-task', 'COMPLETED'),
+        ]:
+            response, membership_queries = self._post(self.worker, name)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['status'], expected_status)
+            self.assertEqual(len(membership_queries), 1)
+
+    def test_self_assign_loads_memberships_once(self):
+        response, membership_queries = self._post(self.worker, 'garden:task-self-assign-task')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(membership_queries), 1)
+
+    def test_assign_checks_assignees_in_one_query(self):
+        others = [User.objects.create_user(username=f'resolver_{i}', password='password123') for i in range(3)]
+        for other in others:
+            GardenMembership.objects.create(user=other, garden=self.garden, role='WORKER', status='ACCEPTED')
+
+        response, membership_queries = self._post(
+            self.manager, 'garden:task-assign-task', {'user_ids': [other.id for other in others]}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCountEqual(response.data['assigned_to'], [other.id for other in others])
+        # The requester's memberships once; the assignees are checked with one IN query
+        self.assertEqual(len(membership_queries), 1)
+
+    def test_non_member_is_denied(self):
+        outsider = User.objects.create_user(username='resolver_outsider', password='password123')
+        response, _ = self._post(outsider, 'garden:task-self-assign-task')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_user_role_reports_pending_membership(self):
+        from .memberships import get_memberships
+        from .serializers import UserGardenSerializer
+        from rest_framework.test import APIRequestFactory
+        other_garden = Garden.objects.create(name='Pending Garden', is_public=True)
+        GardenMembership.objects.create(user=self.worker, garden=other_garden, role='WORKER', status='PENDING')
+
+        request = APIRequestFactory().get('/')
+        request.user = self.worker
+        data = UserGardenSerializer([self.garden, other_garden], many=True, context={'request': request}).data
+        self.assertEqual([item['user_role'] for item in data], ['WORKER', 'WORKER'])
+        self.assertFalse(get_memberships(request).is_member(other_garden.id))
+
+
+class TokenAuthCacheTests(APITestCase):
+    """Token lookups shared by SuspensionMiddleware and DRF and cached between requests."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cached_auth', password='password123')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = reverse('garden:notification-list')
+
+    def _get(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        token_queries = [q['sql'] for q in ctx.captured_queries if 'authtoken_token' in q['sql']]
+        return response, token_queries
+
+    def test_token_resolved_once_then_served_from_cache(self):
+        response, token_queries = self._get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(token_queries), 1)
+
+        response, token_queries = self._get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(token_queries, [])
+
+    def test_logout_invalidates_cached_token(self):
+        self._get()
+        self.assertEqual(self.client.post(reverse('garden:logout')).status_code, status.HTTP_200_OK)
+        response, _ = self._get()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_suspension_and_unsuspension_apply_immediately(self):
+        self._get()
+        profile = self.user.profile
+        profile.is_suspended = True
+        profile.suspension_reason = 'Spam'
+        profile.suspended_until = timezone.now() + timedelta(days=1)
+        profile.save()
+
+        response, _ = self._get()
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.json()['suspension_reason'], 'Spam')
+
+        profile.is_suspended = False
+        profile.save()
+        response, _ = self._get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cache_holds_plain_values_without_the_password(self):
+        import pickle
+        from .authentication import _cache_key
+        from .cache import auth_tokens
+        self._get()
+        data = auth_tokens.get(_cache_key(self.token.key))
+        self.assertIsInstance(data, dict)
+        self.assertNotIn('password', data['user'])
+        self.assertNotIn(self.user.password.encode(), pickle.dumps(data))
+
+        # The user built from the cache can still be saved without losing its password
+        response = self.client.get(reverse('garden:notification-list'))
+        user = response.wsgi_request.user
+        self.assertEqual((user.pk, user.username), (self.user.pk, 'cached_auth'))
+        user.first_name = 'Cached'
+        user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Cached')
+        self.assertTrue(self.user.check_password('password123'))
+
+    def test_ban_deactivation_rejects_cached_token(self):
+        self._get()
+        self.user.is_active = False
+        self.user.save()
+        response, _ = self._get()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class CacheLayerTests(APITestCase):
+    """Namespaced, versioned cache keys with hit/miss metrics (local-memory backend in tests)."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from .cache import metrics
+        cache.clear()
+        metrics.reset()
+
+    def test_namespaced_get_or_set_records_metrics(self):
+        from .cache import Namespace, metrics
+        weather = Namespace('test-weather', timeout=60)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {'temp': 21}
+
+        self.assertEqual(weather.get_or_set(('istanbul', 'metric'), compute), {'temp': 21})
+        self.assertEqual(weather.get_or_set(('istanbul', 'metric'), compute), {'temp': 21})
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(weather.key(('istanbul', 'metric')).startswith('garden:test-weather:v'))
+        self.assertEqual(metrics.snapshot()['test-weather'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_keys_with_whitespace_are_hashed(self):
+        import re
+        import warnings
+        from django.core.cache.backends.base import CacheKeyWarning
+        from .cache import Namespace
+        places = Namespace('test-places')
+        self.assertTrue(places.key('istanbul').endswith(':istanbul'))
+        for key in ('new york', 'tab\tkey', ('los angeles', 'metric'), 'x' * 201):
+            full_key = places.key(key)
+            self.assertIsNone(re.search(r'[\x00-\x20\x7f]', full_key))
+            self.assertLessEqual(len(full_key), 250)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            places.set('new york', (40.7, -74.0))
+            self.assertEqual(places.get('new york'), (40.7, -74.0))
+        self.assertNotEqual(places.key('new york'), places.key('new  york'))
+
+    def test_invalidate_makes_namespace_stale(self):
+        from .cache import Namespace
+        first, second = Namespace('test-first'), Namespace('test-second')
+        first.set('key', 'a')
+        second.set('key', 'b')
+
+        first.invalidate()
+        self.assertIsNone(first.get('key'))
+        self.assertEqual(second.get('key'), 'b')
+
+        # Cached falsy values are hits, not misses
+        first.set('empty', [])
+        self.assertEqual(first.get('empty', default='missing'), [])
+
+    def test_badge_catalogue_cached_until_badges_change(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        url = reverse('garden:badge-list')
+        count = len(self.client.get(url).data)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(len(self.client.get(url).data), count)
+        self.assertFalse(any('garden_badge' in q['sql'] for q in ctx.captured_queries))
+
+        badge = Badge.objects.create(key='cache_test', name='Cache Test', category='Forum Posts', requirement={})
+        self.addCleanup(badge.delete)
+        self.assertEqual(len(self.client.get(url).data), count + 1)
+
+
+class WeatherCacheTests(TestCase):
+    """Geocode memoization, coordinate-keyed weather cache and single-flight upstream calls."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    @patch('gardenplanner.apps.garden.utils.fetch_weather')
+    @patch('gardenplanner.apps.garden.utils.get_location_coordinates')
+    def test_normalized_locations_share_geocode_and_weather(self, mock_coords, mock_fetch):
+        from .utils import get_weather_data
+        mock_coords.return_value = (41.0082, 28.9784)
+        mock_fetch.return_value = {'main': {'temp': 20}}
+
+        self.assertEqual(get_weather_data('Istanbul'), {'main': {'temp': 20}})
+        self.assertEqual(get_weather_data(' istanbul  '), {'main': {'temp': 20}})
+        self.assertEqual(mock_coords.call_count, 1)
+        mock_fetch.assert_called_once_with(41.01, 28.98)
+
+        # A different name for a place within the rounding grid reuses the cached weather
+        mock_coords.return_value = (41.0101, 28.9801)
+        get_weather_data('Fatih, Istanbul')
+        self.assertEqual(mock_fetch.call_count, 1)
+
+    @patch('gardenplanner.apps.garden.utils.fetch_weather')
+    @patch('gardenplanner.apps.garden.utils.get_location_coordinates')
+    def test_errors_and_unknown_locations_are_not_cached(self, mock_coords, mock_fetch):
+        from .utils import get_weather_data
+        mock_coords.return_value = None
+        self.assertEqual(get_weather_data('Atlantis'), {'error': 'Location not found'})
+        get_weather_data('Atlantis')
+        self.assertEqual(mock_coords.call_count, 2)
+
+        mock_coords.return_value = (39.93, 32.85)
+        mock_fetch.return_value = {'error': 'Weather service unavailable'}
+        get_weather_data('Ankara')
+        mock_fetch.return_value = {'main': {'temp': 15}}
+        self.assertEqual(get_weather_data('Ankara'), {'main': {'temp': 15}})
+        self.assertEqual(mock_fetch.call_count, 2)
+
+    @patch('gardenplanner.apps.garden.utils.get_location_coordinates')
+    def test_concurrent_misses_share_one_upstream_call(self, mock_coords):
+        import threading
+        import time
+        from .utils import get_weather_data
+        mock_coords.return_value = (38.42, 27.14)
+        calls = []
+        release = threading.Event()
+
+        def slow_fetch(lat, lon):
+            calls.append((lat, lon))
+            release.wait(5)
+            return {'main': {'temp': 30}}
+
+        results = []
+        with patch('gardenplanner.apps.garden.utils.fetch_weather', side_effect=slow_fetch):
+            threads = [threading.Thread(target=lambda: results.append(get_weather_data('Izmir'))) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            # Let the other threads reach the in-flight call before it returns
+            time.sleep(0.2)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'main': {'temp': 30}}] * 5)
+
+
+class OpenMeteoStub:
+    """
+    Local HTTP server standing in for the Open-Meteo forecast API. ``forecasts``
+    maps (latitude, longitude) to a ``daily`` block; other coordinates get clear
+    weather. Every request's query is recorded in ``requests``.
+    """
+
+    CLEAR = {'weather_code': [0, 0], 'temperature_2m_max': [20.0, 21.0], 'temperature_2m_min': [10.0, 11.0]}
+
+    def __init__(self, forecasts=None, delay=0, fail=False):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from urllib.parse import parse_qs, urlparse
+        stub = self
+        self.forecasts = forecasts or {}
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                import json
+                import time
+                query = parse_qs(urlparse(self.path).query)
+                with lock:
+                    stub.requests.append(query)
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                time.sleep(delay)
+                with lock:
+                    stub.active -= 1
+                if fail:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                latitudes = [float(v) for v in query['latitude'][0].split(',')]
+                longitudes = [float(v) for v in query['longitude'][0].split(',')]
+                locations = [
+                    {'latitude': lat, 'longitude': lon, 'daily': stub.forecasts.get((lat, lon), stub.CLEAR)}
+                    for lat, lon in zip(latitudes, longitudes)
+                ]
+                body = json.dumps(locations if len(locations) > 1 else locations[0]).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/v1/forecast'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class ForecastFetcherTests(TestCase):
+    """Batched, concurrent Open-Meteo fetching for the weather reminder job."""
+
+    def test_batches_coordinates_into_multi_location_requests(self):
+        from .forecast import fetch_forecasts
+        stub = OpenMeteoStub({(41.0, 29.0): {
+            'weather_code': [0, 95], 'temperature_2m_max': [20.0, 25.0], 'temperature_2m_min': [10.0, 5.0],
+        }})
+        self.addCleanup(stub.stop)
+        coordinates = [(40.0 + i / 10, 29.0) for i in range(10)] + [(41.0, 29.0)]
+
+        with override_settings(OPEN_METEO_URL=stub.url):
+            results, stats = fetch_forecasts(coordinates, batch_size=4)
+
+        self.assertEqual(len(stub.requests), 3)
+        self.assertEqual((stats['coordinates'], stats['requests'], stats['failed_requests']), (11, 3, 0))
+        self.assertEqual(results[(41.0, 29.0)], (True, 'Thunderstorm', 25.0, 5.0))
+        self.assertEqual(results[(40.0, 29.0)], (False, 'Good', 21.0, 11.0))
+
+    def test_concurrency_is_bounded(self):
+        from .forecast import fetch_forecasts
+        stub = OpenMeteoStub(delay=0.05)
+        self.addCleanup(stub.stop)
+        coordinates = [(float(i), 0.0) for i in range(12)]
+
+        with override_settings(OPEN_METEO_URL=stub.url):
+            results, stats = fetch_forecasts(coordinates, concurrency=3, batch_size=1)
+
+        self.assertEqual(len(results), 12)
+        self.assertEqual(stats['requests'], 12)
+        self.assertLessEqual(stub.max_active, 3)
+        self.assertGreater(stub.max_active, 1)
+
+    def test_failed_batch_reports_error_without_alerting(self):
+        from .management.commands.send_weather_reminders import check_weather_and_notify
+        stub = OpenMeteoStub(fail=True)
+        self.addCleanup(stub.stop)
+        Garden.objects.create(name='Stormy', latitude=41.0, longitude=29.0)
+
+        with override_settings(OPEN_METEO_URL=stub.url):
+            stats = check_weather_and_notify()
+
+        self.assertEqual((stats['failed_requests'], stats['alerts']), (1, 0))
+        self.assertIn('seconds', stats)
+
+
+class GardenGeocodingTests(APITestCase):
+    """Garden saves never call Nominatim; the geocode_gardens job fills coordinates in later."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='geocoder', password='password123')
+        self.client.force_authenticate(self.user)
+
+    @patch('gardenplanner.apps.garden.geocoding.requests.get')
+    def test_save_flags_garden_without_calling_nominatim(self, mock_get):
+        response = self.client.post(reverse('garden:garden-list'), {'name': 'Moda', 'location': 'Kadikoy, Istanbul'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        mock_get.assert_not_called()
+
+        garden = Garden.objects.get(pk=response.data['id'])
+        self.assertTrue(garden.geocode_pending)
+        self.assertIsNone(garden.latitude)
+
+    def test_job_looks_up_each_location_once_and_caches_it(self):
+        from .geocoding import geocode_pending_gardens
+        from .models import GeocodeCache
+        first = Garden.objects.create(name='A', location='Kadikoy, Istanbul')
+        second = Garden.objects.create(name='B', location='  kadikoy,  istanbul')
+        unknown = Garden.objects.create(name='C', location='Atlantis')
+        lookups = []
+
+        def lookup(location):
+            lookups.append(location)
+            return None if location == 'Atlantis' else (40.99, 29.03)
+
+        stats = geocode_pending_gardens(lookup=lookup, limiter=MagicMock())
+        self.assertEqual(len(lookups), 2)
+        self.assertEqual(stats, {'looked_up': 2, 'updated': 3, 'failed': 0})
+        for garden in (first, second):
+            garden.refresh_from_db()
+            self.assertEqual((garden.latitude, garden.longitude, garden.geocode_pending), (40.99, 29.03, False))
+        unknown.refresh_from_db()
+        self.assertEqual((unknown.latitude, unknown.geocode_pending), (None, False))
+        self.assertTrue(GeocodeCache.objects.filter(query='kadikoy, istanbul', latitude=40.99).exists())
+
+        # A later save of a known location is filled from the cache table immediately
+        third = Garden.objects.create(name='D', location='KADIKOY, Istanbul')
+        self.assertEqual((third.latitude, third.geocode_pending), (40.99, False))
+
+    def test_failed_lookup_stays_pending(self):
+        from .geocoding import GeocodingError, geocode_pending_gardens
+        garden = Garden.objects.create(name='A', location='Besiktas')
+
+        def lookup(location):
+            raise GeocodingError('timeout')
+
+        self.assertEqual(geocode_pending_gardens(lookup=lookup, limiter=MagicMock())['failed'], 1)
+        garden.refresh_from_db()
+        self.assertTrue(garden.geocode_pending)
+
+    def test_rate_limiter_spaces_requests(self):
+        from .geocoding import RateLimiter
+        now = [100.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        limiter = RateLimiter(1.0, clock=lambda: now[0], sleep=sleep)
+        limiter.wait()
+        now[0] += 0.25
+        limiter.wait()
+        now[0] += 3
+        limiter.wait()
+        self.assertEqual(sleeps, [0.75])
+
+
+class NearbyGardensTests(APITestCase):
+    """/api/gardens/nearby/ returns visible gardens within the radius, nearest first."""
+
+    def setUp(self):
+        self.url = reverse('garden:garden-nearby')
+        # bulk_create skips the geocoding signal, which would clear the coordinates
+        self.kadikoy, self.besiktas, self.ankara, self.private = Garden.objects.bulk_create([
+            Garden(name='Kadikoy', latitude=40.9903, longitude=29.0290),
+            Garden(name='Besiktas', latitude=41.0422, longitude=29.0067),
+            Garden(name='Ankara', latitude=39.9334, longitude=32.8597),
+            Garden(name='Private', latitude=41.0000, longitude=29.0000, is_public=False),
+        ])
+
+    def test_returns_gardens_in_radius_sorted_by_distance(self):
+        response = self.client.get(self.url, {'lat': 41.03, 'lon': 29.0, 'radius_km': 20})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([g['name'] for g in response.data], ['Besiktas', 'Kadikoy'])
+        from .geo import haversine_km
+        expected = haversine_km(41.03, 29.0, 41.0422, 29.0067)
+        self.assertAlmostEqual(response.data[0]['distance_km'], expected, places=3)
+        self.assertNotIn('distance_km', self.client.get(reverse('garden:garden-list')).data[0])
+
+    def test_member_sees_own_private_garden(self):
+        user = User.objects.create_user(username='nearby_member', password='password123')
+        GardenMembership.objects.create(user=user, garden=self.private, role='MANAGER', status='ACCEPTED')
+        self.client.force_authenticate(user)
+        response = self.client.get(self.url, {'lat': 41.0, 'lon': 29.0, 'radius_km': 1})
+        self.assertEqual([g['name'] for g in response.data], ['Private'])
+
+    def test_invalid_parameters(self):
+        for params in ({'lat': 41}, {'lat': 'x', 'lon': 29}, {'lat': 91, 'lon': 29},
+                       {'lat': 41, 'lon': 29, 'radius_km': 0}, {'lat': 41, 'lon': 29, 'radius_km': 10000}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_bounding_box_wraps_antimeridian_and_poles(self):
+        from .geo import nearby
+        fiji_east, fiji_west = Garden.objects.bulk_create([
+            Garden(name='East', latitude=-17.0, longitude=179.9),
+            Garden(name='West', latitude=-17.0, longitude=-179.9),
+        ])
+        found = nearby(Garden.objects.all(), -17.0, 179.95, 50)
+        self.assertEqual({g.pk for g in found}, {fiji_east.pk, fiji_west.pk})
+
+        polar = Garden.objects.create(name='Polar', location='')
+        Garden.objects.filter(pk=polar.pk).update(latitude=89.9, longitude=-100)
+        self.assertEqual([g.pk for g in nearby(Garden.objects.all(), 89.9, 80, 50)], [polar.pk])
+
+
+class SearchTests(APITestCase):
+    """/api/search/ uses the fallback backend on SQLite; visibility and block rules match the feeds."""
+
+    def setUp(self):
+        self.url = reverse('garden:search')
+        self.user = User.objects.create_user(username='searcher', password='password123')
+        self.author = User.objects.create_user(username='writer', password='password123')
+        self.blocked = User.objects.create_user(username='blocked_writer', password='password123')
+        self.blocker = User.objects.create_user(username='blocking_writer', password='password123')
+        self.user.profile.blocked_users.add(self.blocked.profile)
+        self.blocker.profile.blocked_users.add(self.user.profile)
+
+        self.post = ForumPost.objects.create(title='Tomato blight', content='Leaves turn brown', author=self.author)
+        ForumPost.objects.create(title='Tomato cages', content='Deleted', author=self.author, is_deleted=True)
+        ForumPost.objects.create(title='Tomato seeds', content='Swap', author=self.blocked)
+        ForumPost.objects.create(title='Tomato harvest', content='Big one', author=self.blocker)
+        self.comment = Comment.objects.create(forum_post=self.post, content='Copper spray helps with blight', author=self.author)
+
+        self.public = Garden.objects.create(name='Tomato Corner', is_public=True)
+        self.private = Garden.objects.create(name='Secret Tomatoes', is_public=False)
+        GardenMembership.objects.create(user=self.user, garden=self.private, role='MEMBER', status='ACCEPTED')
+        self.task = Task.objects.create(garden=self.private, title='Stake tomatoes', assigned_by=self.user)
+        Task.objects.create(garden=self.public, title='Water tomatoes', assigned_by=self.author)
+        self.client.force_authenticate(self.user)
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response.data
+
+    def test_posts_skip_deleted_and_blocked_in_both_directions(self):
+        data = self.search(q='tomato')
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['results'][0]['id'], self.post.id)
+        # Every word has to match; content counts as well as the title
+        self.assertEqual(self.search(q='tomato brown')['count'], 1)
+        self.assertEqual(self.search(q='tomato purple')['count'], 0)
+
+    def test_comments_gardens_and_tasks(self):
+        self.assertEqual([c['id'] for c in self.search(q='blight', type='comments')['results']], [self.comment.id])
+        self.assertEqual({g['id'] for g in self.search(q='tomato', type='gardens')['results']},
+                         {self.public.id, self.private.id})
+        # Tasks only from gardens the user is an accepted member of
+        self.assertEqual([t['id'] for t in self.search(q='tomatoes', type='tasks')['results']], [self.task.id])
+
+        self.client.force_authenticate(None)
+        self.assertEqual([g['id'] for g in self.search(q='tomato', type='gardens')['results']], [self.public.id])
+        self.assertEqual(self.search(q='tomatoes', type='tasks')['count'], 0)
+
+    def test_pagination_and_validation(self):
+        for i in range(3):
+            ForumPost.objects.create(title=f'Compost {i}', content='Heap', author=self.author)
+        data = self.search(q='compost', page_size=2)
+        self.assertEqual((data['count'], len(data['results'])), (3, 2))
+        self.assertIsNotNone(data['next'])
+
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'q': 'x', 'type': 'users'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_viewset_search_param_uses_search_backend(self):
+        response = self.client.get(reverse('garden:garden-list'), {'search': 'secret'})
+        self.assertEqual([g['id'] for g in response.data], [self.private.id])
+
+    def test_postgres_backend_queries_the_search_vector(self):
+        from .search import PostgresSearchBackend
+        sql = str(PostgresSearchBackend().search(ForumPost.objects.all(), 'tomato blight').query)
+        self.assertIn('@@', sql)
+        self.assertIn('websearch_to_tsquery', sql)
+        self.assertIn('ts_rank', sql)
+
+
+class HotFilterIndexTests(APITestCase):
+    """Indexes for the hot filters are used by the audited queries; the moderation queue filter."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='indexed', password='password123')
+        self.garden = Garden.objects.create(name='Indexed Garden')
+        GardenMembership.objects.create(user=self.user, garden=self.garden, role='MANAGER', status='ACCEPTED')
+        self.post = ForumPost.objects.create(title='Indexed', content='Post', author=self.user)
+
+    def test_explain_queries_prints_a_plan_per_hot_query(self):
+        from .query_audit import hot_queries
+        out = StringIO()
+        call_command('explain_queries', stdout=out)
+        output = out.getvalue()
+        self.assertIn(f'user={self.user.id} garden={self.garden.id} post={self.post.id}', output)
+        for query in hot_queries(self.user.id, self.garden.id, self.post.id):
+            self.assertIn(query.label, output)
+        for index in ('membership_garden_role_idx', 'forumpost_live_feed_idx', 'comment_live_thread_idx',
+                      'report_unreviewed_idx', 'task_garden_status_due_idx', 'task_garden_due_idx',
+                      'event_garden_start_idx'):
+            self.assertIn(index, output)
+
+    def test_admin_reports_can_be_filtered_to_the_moderation_queue(self):
+        admin = User.objects.create_superuser(username='index_admin', email='a@a.com', password='pw')
+        admin.profile.role = 'ADMIN'
+        admin.profile.save()
+        post_type = ContentType.objects.get_for_model(ForumPost)
+        newer, reviewed, older = Report.objects.bulk_create([
+            Report(reporter=self.user, content_type=post_type, object_id=self.post.id, reason='spam'),
+            Report(reporter=self.user, content_type=post_type, object_id=self.post.id, reason='spam', reviewed=True),
+            Report(reporter=self.user, content_type=post_type, object_id=self.post.id, reason='abuse'),
+        ])
+        Report.objects.filter(pk=older.pk).update(created_at=timezone.now() - timedelta(days=1))
+
+        self.client.force_authenticate(admin)
+        response = self.client.get(reverse('garden:admin-report-list'), {'reviewed': 'false'})
+        self.assertEqual([r['id'] for r in response.data], [older.id, newer.id])
+        response = self.client.get(reverse('garden:admin-report-list'))
+        self.assertEqual(len(response.data), 3)
+
+
+class ForumCounterTests(APITestCase):
+    """like_count and comment_count columns follow likes and comments without recounting."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='counted', password='password123')
+        self.liker = User.objects.create_user(username='counter', password='password123')
+        self.post = ForumPost.objects.create(title='Counted', content='Post', author=self.author)
+        self.client.force_authenticate(self.liker)
+
+    def _counts(self):
+        self.post.refresh_from_db(fields=['like_count', 'comment_count'])
+        return self.post.like_count, self.post.comment_count
+
+    def test_like_toggle_uses_the_counter(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        url = reverse('garden:forum-post-like', args=[self.post.id])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url)
+        self.assertEqual(response.data['likes_count'], 1)
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql'].upper() and 'forumpostlike' in q['sql']])
+        self.assertEqual(self.client.post(url).data['likes_count'], 0)
+
+        comment = Comment.objects.create(forum_post=self.post, content='Nice', author=self.author)
+        response = self.client.post(reverse('garden:comment-like', args=[comment.id]))
+        self.assertEqual(response.data['likes_count'], 1)
+        comment.refresh_from_db()
+        self.assertEqual(comment.like_count, 1)
+
+    def test_comment_count_follows_create_soft_delete_and_restore(self):
+        comment = Comment.objects.create(forum_post=self.post, content='One', author=self.author)
+        Comment.objects.create(forum_post=self.post, content='Two', author=self.author)
+        self.assertEqual(self._counts(), (0, 2))
+        comment.delete()
+        self.assertEqual(self._counts(), (0, 1))
+        comment.is_deleted = False
+        comment.save()
+        self.assertEqual(self._counts(), (0, 2))
+        Comment.objects.filter(pk=comment.pk).delete()
+        self.assertEqual(self._counts(), (0, 1))
+
+    def test_full_save_does_not_overwrite_counters(self):
+        stale = ForumPost.objects.get(pk=self.post.pk)
+        ForumPostLike.objects.create(post=self.post, user=self.liker)
+        stale.title = 'Edited'
+        stale.save()
+        self.assertEqual(self._counts(), (1, 0))
+        self.assertEqual(ForumPost.objects.get(pk=self.post.pk).title, 'Edited')
+
+    def test_feed_reads_counters(self):
+        ForumPostLike.objects.create(post=self.post, user=self.liker)
+        Comment.objects.create(forum_post=self.post, content='Hi', author=self.liker)
+        data = self.client.get(reverse('garden:forum-list-create')).data
+        self.assertEqual((data[0]['likes_count'], data[0]['comments_count']), (1, 1))
+
+    def test_reconcile_command_repairs_drift(self):
+        ForumPostLike.objects.create(post=self.post, user=self.liker)
+        ForumPost.objects.filter(pk=self.post.pk).update(like_count=5, comment_count=3)
+
+        out = StringIO()
+        call_command('reconcile_forum_counters', stdout=out)
+        self.assertIn(f'ForumPost {self.post.id}: like_count stored=5 actual=1', out.getvalue())
+        self.assertEqual(self._counts(), (5, 3))
+
+        call_command('reconcile_forum_counters', '--fix', stdout=StringIO())
+        self.assertEqual(self._counts(), (1, 0))
+        out = StringIO()
+        call_command('reconcile_forum_counters', stdout=out)
+        self.assertIn('consistent', out.getvalue())
+
+
+class LikeToggleTests(APITestCase):
+    """Toggle semantics of likes.toggle_like through the like endpoints."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='toggled', password='password123')
+        self.user = User.objects.create_user(username='toggler', password='password123')
+        self.post = ForumPost.objects.create(title='Toggle', content='Post', author=self.author)
+        self.url = reverse('garden:forum-post-like', args=[self.post.id])
+        self.client.force_authenticate(self.user)
+
+    def test_toggle_likes_then_unlikes_and_notifies_once(self):
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['is_liked'], response.data['likes_count']), (True, 1))
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['is_liked'], response.data['likes_count']), (False, 0))
+        self.assertFalse(ForumPostLike.objects.exists())
+        self.assertEqual(Notification.objects.filter(recipient=self.author, message__contains='liked your post').count(), 1)
+
+    def test_missing_or_deleted_target_is_404(self):
+        self.post.delete()
+        self.assertEqual(self.client.post(self.url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(
+            self.client.post(reverse('garden:comment-like', args=[999999])).status_code, status.HTTP_404_NOT_FOUND
+        )
+        self.assertFalse(ForumPostLike.objects.exists())
+
+    def test_lost_insert_race_reports_liked_instead_of_failing(self):
+        from django.db import IntegrityError
+        from .likes import toggle_like
+
+        def create_concurrently(*args, **kwargs):
+            raise IntegrityError('duplicate key value violates unique constraint')
+
+        with patch.object(ForumPostLike.objects, 'create', side_effect=create_concurrently):
+            self.assertEqual(toggle_like(ForumPostLike, self.user, self.post.id), (True, 0))
+
+
+def run_in_threads(target, args_list):
+    """
+    Call ``target(*args)`` for every item of ``args_list`` in its own thread, all
+    released at once. Returns the results and the raised exceptions.
+    """
+    import threading
+    from django.db import connections
+
+    results, errors = [], []
+    start = threading.Barrier(len(args_list))
+
+    def run(args):
+        try:
+            start.wait()
+            results.append(target(*args))
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=run, args=(args,)) for args in args_list]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+# SQLite's shared in-memory test database rejects concurrent writers instead of letting them wait
+@skipUnless(connection.vendor == 'postgresql', 'concurrent writers need PostgreSQL')
+class LikeToggleConcurrencyTests(TransactionTestCase):
+    """The single-statement PostgreSQL toggle under concurrent taps."""
+
+    def setUp(self):
+        from .stats import get_user_stats
+        self.author = User.objects.create_user(username='stress_author', password='pw')
+        self.user = User.objects.create_user(username='stress_tapper', password='pw')
+        self.post = ForumPost.objects.create(title='Stress', content='Post', author=self.author)
+        get_user_stats(self.author)
+
+    def _check_consistent(self):
+        from .models import UserStats
+        self.post.refresh_from_db()
+        likes = ForumPostLike.objects.filter(post=self.post).count()
+        self.assertEqual(self.post.like_count, likes)
+        self.assertEqual(UserStats.objects.get(user=self.author).post_likes_received, likes)
+        return likes
+
+    def test_toggle_updates_counters_and_notifies(self):
+        from .likes import toggle_like
+        self.assertEqual(toggle_like(ForumPostLike, self.user, self.post.id), (True, 1))
+        self.assertEqual(self._check_consistent(), 1)
+        self.assertEqual(Notification.objects.filter(recipient=self.author, message__contains='liked your post').count(), 1)
+        self.assertEqual(toggle_like(ForumPostLike, self.user, self.post.id), (False, 0))
+        self.assertEqual(self._check_consistent(), 0)
+
+    def test_concurrent_double_taps_of_one_user_stay_consistent(self):
+        from .likes import toggle_like
+
+        def tap():
+            return [toggle_like(ForumPostLike, self.user, self.post.id) for _ in range(5)]
+
+        results, errors = run_in_threads(tap, [()] * 8)
+        self.assertEqual(errors, [])
+        # Every toggle saw its own effect: liked with one like, or unliked with none
+        for is_liked, like_count in (result for taps in results for result in taps):
+            self.assertEqual(like_count, int(is_liked))
+        likes = self._check_consistent()
+        self.assertIn(likes, (0, 1))
+        self.assertEqual(toggle_like(ForumPostLike, self.user, self.post.id), (not likes, 1 - likes))
+        self._check_consistent()
+
+    def test_concurrent_likes_of_many_users_are_all_counted(self):
+        from .likes import toggle_like
+        users = [User.objects.create_user(username=f'stress_{i}', password='pw') for i in range(8)]
+        # An odd number of taps leaves every user's like in place
+        results, errors = run_in_threads(
+            lambda user: [toggle_like(ForumPostLike, user, self.post.id) for _ in range(5)],
+            [(user,) for user in users],
+        )
+        self.assertEqual(errors, [])
+        self.assertEqual(self._check_consistent(), len(users))
+
+
+class RecurringTaskGenerationTests(TestCase):
+    """generate_recurring_tasks creates due instances in bulk, catches up and never duplicates."""
+
+    def setUp(self):
+        self.manager = User.objects.create_user(username='recurring_manager', password='password123')
+        self.worker = User.objects.create_user(username='recurring_worker', password='password123')
+        self.garden = Garden.objects.create(name='Recurring Garden')
+        self.now = timezone.now()
+
+    def _template(self, due_date, period='DAILY', **extra):
+        template = Task.objects.create(
+            garden=self.garden, title='Water beds', assigned_by=self.manager,
+            due_date=due_date, is_recurring=True, recurrence_period=period, **extra,
+        )
+        template.assigned_to.add(self.worker)
+        return template
+
+    def _generate(self, now=None):
+        from .recurrence import generate
+        return generate(now=now or self.now)
+
+    def test_catches_up_missed_occurrences_within_the_window(self):
+        template = self._template(self.now - timedelta(days=3))
+        result = self._generate()
+        # Three days ago + 1..4 days: two missed, today's and tomorrow's
+        self.assertEqual(result.created, 4)
+        instances = list(template.recurring_instances.order_by('due_date'))
+        self.assertEqual([task.due_date for task in instances], [template.due_date + timedelta(days=n) for n in range(1, 5)])
+        self.assertEqual([task.occurrence_date for task in instances], [timezone.localdate(task.due_date) for task in instances])
+
+    def test_instances_are_read_back_in_batches(self):
+        from .recurrence import generate
+        template = self._template(self.now - timedelta(days=3))
+        # One template per batch still catches up four instances, read back one per query
+        result = generate(now=self.now, batch_size=1)
+        self.assertEqual(result.created, 4)
+        for task in template.recurring_instances.all():
+            self.assertEqual(list(task.assigned_to.all()), [self.worker])
+
+    @override_settings(RECURRING_TASK_CATCH_UP_DAYS=2)
+    def test_skips_occurrences_older_than_the_catch_up_window(self):
+        template = self._template(self.now - timedelta(days=30, hours=1))
+        self._generate()
+        oldest = template.recurring_instances.order_by('due_date').first()
+        self.assertGreaterEqual(oldest.due_date, self.now - timedelta(days=2))
+
+    def test_rerun_is_idempotent(self):
+        template = self._template(self.now - timedelta(days=2))
+        first = self._generate().created
+        self.assertGreater(first, 0)
+        self.assertEqual(self._generate().created, 0)
+        self.assertEqual(template.recurring_instances.count(), first)
+
+    def test_copies_fields_and_assignees_and_notifies_once(self):
+        template = self._template(self.now - timedelta(days=2), description='Both beds')
+        Notification.objects.all().delete()
+        created = self._generate().created
+        for task in template.recurring_instances.all():
+            self.assertEqual((task.title, task.description, task.status), ('Water beds', 'Both beds', 'PENDING'))
+            self.assertFalse(task.is_recurring)
+            self.assertEqual(list(task.assigned_to.all()), [self.worker])
+        self.assertEqual(Notification.objects.filter(recipient=self.worker, message__contains='Water beds').count(), 1)
+        self.assertEqual(self.worker.assigned_tasks.count(), created + 1)
+
+    def test_keeps_user_stats_in_step(self):
+        from .stats import compute_stats, get_user_stats
+        for user in (self.manager, self.worker):
+            get_user_stats(user)
+        self._template(self.now - timedelta(days=2))
+        self._generate()
+        for user in (self.manager, self.worker):
+            stored = get_user_stats(user)
+            for field, value in compute_stats([user.pk])[user.pk].items():
+                self.assertEqual(getattr(stored, field), value, field)
+
+    def test_respects_recurrence_end_date(self):
+        template = self._template(self.now - timedelta(days=3), recurrence_end_date=self.now - timedelta(days=2, hours=1))
+        self._generate()
+        self.assertEqual(template.recurring_instances.count(), 0)
+        ended = self._template(self.now - timedelta(days=3), recurrence_end_date=self.now)
+        self._generate()
+        self.assertTrue(all(task.due_date <= self.now for task in ended.recurring_instances.all()))
+        self.assertEqual(ended.recurring_instances.count(), 3)
+
+    def test_continues_from_the_latest_instance(self):
+        template = self._template(self.now - timedelta(days=10), period='WEEKLY')
+        self._generate()
+        self.assertEqual(template.recurring_instances.count(), 1)
+        later = self.now + timedelta(days=7)
+        self._generate(now=later)
+        self.assertEqual(template.recurring_instances.count(), 2)
+
+    def test_overlapping_run_only_counts_its_own_rows(self):
+        from . import recurrence
+        from .bulk import insert_new
+        template = self._template(self.now - timedelta(days=2))
+
+        def other_run_first(instances):
+            # Another run inserts the first occurrence between our read and our insert
+            other = instances[0]
+            Task.objects.create(
+                parent_task=template, occurrence_date=other.occurrence_date, due_date=other.due_date,
+                garden=self.garden, title=other.title, assigned_by=self.manager,
+            )
+            return insert_new(instances)
+
+        with patch.object(recurrence, 'insert_new', side_effect=other_run_first):
+            result = self._generate()
+        self.assertEqual(result.created, 2)
+        self.assertEqual(template.recurring_instances.count(), 3)
+        self.assertEqual(Task.objects.filter(parent_task=template, assigned_to=self.worker).count(), 2)
+
+    def test_query_count_does_not_grow_with_templates(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .recurrence import generate
+
+        for _ in range(3):
+            self._template(self.now - timedelta(days=1))
+        with CaptureQueriesContext(connection) as few:
+            generate(now=self.now)
+        Task.objects.filter(parent_task__isnull=False).delete()
+        for _ in range(30):
+            self._template(self.now - timedelta(days=1))
+        Task.objects.filter(parent_task__isnull=False).delete()
+        with CaptureQueriesContext(connection) as many:
+            generate(now=self.now)
+        self.assertEqual(Task.objects.filter(parent_task__isnull=False).count(), 33 * 2)
+        self.assertLessEqual(len(many), len(few) + 2)
+
+    def test_command_dry_run_creates_nothing(self):
+        self._template(self.now - timedelta(days=1))
+        out = StringIO()
+        call_command('generate_recurring_tasks', '--dry-run', stdout=out)
+        self.assertIn('[DRY RUN] Would create 2 task instance(s)', out.getvalue())
+        self.assertFalse(Task.objects.filter(parent_task__isnull=False).exists())
+
+
+class RecurrenceRuleTests(APITestCase):
+    """RRULE recurrences expand calendar-accurately and lazily, and feed the garden calendar."""
+
+    def setUp(self):
+        self.manager = User.objects.create_user(username='rrule_manager', password='password123')
+        self.garden = Garden.objects.create(name='Rule Garden', is_public=True)
+        GardenMembership.objects.create(user=self.manager, garden=self.garden, role='MANAGER', status='ACCEPTED')
+        self.client.force_authenticate(self.manager)
+
+    def _at(self, *args):
+        return timezone.make_aware(timezone.datetime(*args))
+
+    def test_monthly_period_keeps_the_day_of_month(self):
+        from .recurrence_rules import Recurrence
+        recurrence = Recurrence.for_task(self._at(2025, 1, 31, 9), 'MONTHLY')
+        days = [due.date().isoformat() for due in recurrence.between(self._at(2025, 1, 31, 9), self._at(2025, 5, 1))]
+        self.assertEqual(days, ['2025-02-28', '2025-03-31', '2025-04-30'])
+        task = Task(is_recurring=True, recurrence_period='YEARLY', due_date=self._at(2024, 3, 1, 9))
+        self.assertEqual(task.get_next_due_date(), self._at(2025, 3, 1, 9))
+
+    def test_rule_expands_lazily_in_any_window(self):
+        from dateutil.rrule import rrulestr
+        from .recurrence_rules import Recurrence, normalize_rule
+        rule = normalize_rule('RRULE:freq=monthly;interval=2;byday=2tu')
+        recurrence = Recurrence(self._at(2020, 1, 14, 8), rule)
+        window = list(recurrence.between(self._at(2031, 1, 1), self._at(2031, 12, 31)))
+        self.assertEqual([due.date().isoformat() for due in window][:3], ['2031-01-14', '2031-03-11', '2031-05-13'])
+        # The same occurrences as expanding the rule from its first due date
+        full = rrulestr(rule, dtstart=recurrence.dtstart).between(self._at(2031, 1, 1), self._at(2031, 12, 31))
+        self.assertEqual(window, full)
+
+    def test_invalid_rules_are_rejected(self):
+        from .recurrence_rules import normalize_rule
+        for rule in [
+            'FREQ=HOURLY', 'FREQ=DAILY;BYHOUR=3', 'FREQ=WEEKLY;BYDAY=XX', 'FREQ=DAILY;UNTIL=20300101T000000', 'DAILY',
+            'FREQ=DAILY;BYMONTH=2;BYMONTHDAY=30', 'FREQ=DAILY;UNTIL=20200101T000000Z',
+        ]:
+            with self.assertRaises(ValueError):
+                normalize_rule(rule)
+        response = self.client.post(reverse('garden:task-list'), {
+            'garden': self.garden.id, 'title': 'Bad rule', 'task_type': 'HARVEST', 'is_recurring': True,
+            'recurrence_rule': 'FREQ=MINUTELY', 'due_date': timezone.now().isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('recurrence_rule', response.data)
+
+    def test_rules_that_never_match_are_rejected_and_never_expanded(self):
+        import time
+        from .recurrence_rules import Recurrence, normalize_rule
+        rule = 'FREQ=YEARLY;INTERVAL=4;BYMONTH=2;BYMONTHDAY=29'
+        # Every fourth year from a leap year matches, from the year after it never does
+        self.assertEqual(normalize_rule(rule, dtstart=self._at(2024, 2, 29, 9)), rule)
+        with self.assertRaises(ValueError):
+            normalize_rule(rule, dtstart=self._at(2025, 2, 28, 9))
+        response = self.client.post(reverse('garden:task-list'), {
+            'garden': self.garden.id, 'title': 'Never', 'task_type': 'HARVEST', 'is_recurring': True,
+            'recurrence_rule': rule, 'due_date': self._at(2025, 2, 28, 9).isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('recurrence_rule', response.data)
+
+        # A rule stored before the check yields nothing, without walking to the year 9999
+        started = time.monotonic()
+        recurrence = Recurrence(self._at(2025, 1, 1, 9), 'FREQ=DAILY;BYMONTH=2;BYMONTHDAY=30')
+        self.assertEqual(list(recurrence.between(self._at(2025, 1, 1), self._at(2025, 3, 1))), [])
+        self.assertIsNone(recurrence.next_after(self._at(2025, 1, 1)))
+        self.assertLess(time.monotonic() - started, 3)
+
+    def test_sparse_rules_stop_at_the_end_of_the_window(self):
+        from .recurrence_rules import Recurrence
+        recurrence = Recurrence(self._at(2024, 2, 29, 9), 'FREQ=YEARLY;BYMONTH=2;BYMONTHDAY=29')
+        self.assertEqual(list(recurrence.between(self._at(2025, 1, 1), self._at(2025, 12, 31))), [])
+        self.assertEqual(recurrence.next_after(self._at(2025, 1, 1)), self._at(2028, 2, 29, 9))
+
+    def test_task_api_accepts_a_rule_without_a_period(self):
+        response = self.client.post(reverse('garden:task-list'), {
+            'garden': self.garden.id, 'title': 'Second Tuesday', 'task_type': 'HARVEST', 'is_recurring': True,
+            'recurrence_rule': 'rrule:freq=monthly;byday=2TU', 'due_date': self._at(2025, 1, 14, 8).isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['recurrence_rule'], 'FREQ=MONTHLY;BYDAY=2TU')
+
+    def test_generator_materializes_rule_occurrences(self):
+        from .recurrence import generate
+        now = self._at(2025, 6, 12, 12)
+        template = Task.objects.create(
+            garden=self.garden, title='Mon and Thu', assigned_by=self.manager, due_date=self._at(2025, 6, 2, 7),
+            is_recurring=True, recurrence_rule='FREQ=WEEKLY;BYDAY=MO,TH',
+        )
+        generate(now=now)
+        self.assertEqual(
+            [task.due_date for task in template.recurring_instances.order_by('due_date')],
+            [self._at(2025, 6, 5, 7), self._at(2025, 6, 9, 7), self._at(2025, 6, 12, 7)],
+        )
+
+    def test_calendar_lists_stored_and_virtual_occurrences(self):
+        template = Task.objects.create(
+            garden=self.garden, title='Weekly', assigned_by=self.manager, due_date=self._at(2025, 6, 2, 7),
+            is_recurring=True, recurrence_period='WEEKLY',
+        )
+        Task.objects.create(
+            garden=self.garden, title='Weekly', assigned_by=self.manager, due_date=self._at(2025, 6, 9, 7),
+            parent_task=template, occurrence_date=self._at(2025, 6, 9).date(),
+        )
+        Task.objects.create(garden=self.garden, title='One-off', assigned_by=self.manager, due_date=self._at(2025, 6, 10, 7))
+        url = reverse('garden:garden-calendar', args=[self.garden.id])
+        response = self.client.get(url, {'from': '2025-06-01', 'to': '2025-06-23'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        items = [(item['title'], item['start'][:10], item['virtual']) for item in response.data['items']]
+        self.assertEqual(items, [
+            ('Weekly', '2025-06-02', False),
+            ('Weekly', '2025-06-09', False),
+            ('One-off', '2025-06-10', False),
+            ('Weekly', '2025-06-16', True),
+            ('Weekly', '2025-06-23', True),
+        ])
+        self.assertIsNone(response.data['items'][-1]['id'])
+        self.assertEqual(response.data['items'][-1]['parent_task'], template.id)
+
+    def test_calendar_requires_membership_and_a_valid_window(self):
+        url = reverse('garden:garden-calendar', args=[self.garden.id])
+        self.assertEqual(self.client.get(url, {'from': '2025-06-10', 'to': '2025-06-01'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'from': 'soon'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'from': '2025-01-01', 'to': '2027-01-01'}).status_code, status.HTTP_400_BAD_REQUEST)
+        outsider = User.objects.create_user(username='rrule_outsider', password='password123')
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class GardenCalendarFeedTests(APITestCase):
+    """The garden calendar merges tasks and events; its iCalendar feed is keyed and cacheable."""
+
+    def setUp(self):
+        self.member = User.objects.create_user(username='calendar_member', password='password123')
+        self.garden = Garden.objects.create(name='Calendar; Garden', is_public=True)
+        GardenMembership.objects.create(user=self.member, garden=self.garden, role='MANAGER', status='ACCEPTED')
+        self.now = timezone.now()
+        self.task = Task.objects.create(
+            garden=self.garden, title='Prune roses', assigned_by=self.member, due_date=self.now + timedelta(days=2),
+        )
+        self.event = GardenEvent.objects.create(
+            garden=self.garden, title='Seed swap, with tea', description='Bring seeds\nand cups',
+            start_at=self.now + timedelta(days=1), created_by=self.member,
+        )
+        GardenEvent.objects.create(
+            garden=self.garden, title='Long ago', start_at=self.now - timedelta(days=400), created_by=self.member,
+        )
+
+    def _feed(self, key=None, **headers):
+        params = {'key': key} if key is not None else {}
+        return self.client.get(reverse('garden:garden-calendar-feed', args=[self.garden.id]), params, **headers)
+
+    def _feed_key(self):
+        self.client.force_authenticate(self.member)
+        response = self.client.get(reverse('garden:garden-calendar', args=[self.garden.id]))
+        self.client.force_authenticate(None)
+        return response.data['feed_url'].split('key=', 1)[1]
+
+    def test_calendar_merges_tasks_and_events_in_start_order(self):
+        self.client.force_authenticate(self.member)
+        response = self.client.get(reverse('garden:garden-calendar', args=[self.garden.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item['type'], item['id']) for item in response.data['items']],
+            [('event', self.event.id), ('task', self.task.id)],
+        )
+
+    def test_feed_accepts_calendar_media_type(self):
+        key = self._feed_key()
+        response = self._feed(key, HTTP_ACCEPT='text/calendar')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'BEGIN:VCALENDAR'))
+
+        denied = self._feed('forged', HTTP_ACCEPT='text/calendar')
+        self.assertEqual(denied.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(denied.content, b'This calendar feed is not available.')
+
+    def test_feed_streams_icalendar_for_a_valid_key(self):
+        response = self._feed(self._feed_key())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertTrue(response['Content-Type'].startswith('text/calendar'))
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertIn('X-WR-CALNAME:Calendar\\; Garden\r\n', body)
+        self.assertIn(f'UID:task-{self.task.id}@gardenplanner\r\n', body)
+        self.assertIn('SUMMARY:Seed swap\\, with tea\r\n', body)
+        self.assertIn('DESCRIPTION:Bring seeds\\nand cups\r\n', body)
+        self.assertNotIn('Long ago', body)
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split('\r\n')))
+
+    def test_feed_answers_not_modified_until_the_calendar_changes(self):
+        key = self._feed_key()
+        etag = self._feed(key)['ETag']
+        self.assertEqual(self._feed(key, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.task.title = 'Prune all roses'
+        self.task.save()
+        response = self._feed(key, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # The garden name is the calendar's title, so renaming changes the feed too
+        etag = response['ETag']
+        Garden.objects.filter(pk=self.garden.pk).update(name='Renamed Garden')
+        response = self._feed(key, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('X-WR-CALNAME:Renamed Garden\r\n', b''.join(response.streaming_content).decode())
+
+    def test_feed_rejects_bad_keys_and_former_members(self):
+        self.assertEqual(self._feed('1:forged').status_code, status.HTTP_403_FORBIDDEN)
+        key = self._feed_key()
+        other = Garden.objects.create(name='Other Garden')
+        response = self.client.get(reverse('garden:garden-calendar-feed', args=[other.id]), {'key': key})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        GardenMembership.objects.filter(user=self.member).delete()
+        self.assertEqual(self._feed(key).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_long_lines_are_folded(self):
+        from .ical import fold
+        line = 'SUMMARY:' + 'ü' * 60
+        folded = fold(line)
+        self.assertTrue(all(len(piece.encode()) <= 75 for piece in folded.split('\r\n')))
+        self.assertEqual(folded.replace('\r\n ', ''), line)
+
+
+class DeadlineReminderTests(TestCase):
+    """send_deadline_reminders reminds every assignee once per deadline, in bulk."""
+
+    def setUp(self):
+        self.manager = User.objects.create_user(username='reminder_manager', password='password123')
+        self.workers = [
+            User.objects.create_user(username=f'reminder_worker{n}', password='password123') for n in range(3)
+        ]
+        self.garden = Garden.objects.create(name='Reminder Garden')
+        self.now = timezone.now()
+
+    def _task(self, due_in, status='PENDING', assignees=None):
+        task = Task.objects.create(
+            garden=self.garden, title='Harvest beans', assigned_by=self.manager,
+            due_date=self.now + due_in, status=status,
+        )
+        task.assigned_to.set(self.workers if assignees is None else assignees)
+        return task
+
+    def _send(self, now=None, **options):
+        from .reminders import send_deadline_reminders
+        return send_deadline_reminders(now=now or self.now, **options)
+
+    def _reminders(self):
+        return Notification.objects.filter(category=NotificationCategory.TASK, message__startswith='Reminder:')
+
+    def test_reminds_every_assignee_of_tasks_due_soon(self):
+        task = self._task(timedelta(hours=5))
+        self._task(timedelta(hours=30))
+        self._task(timedelta(hours=2), status='COMPLETED')
+        self._task(-timedelta(hours=1))
+
+        result = self._send()
+        self.assertEqual((result.tasks, result.due, result.sent), (1, 3, 3))
+        self.assertEqual(
+            sorted(self._reminders().values_list('recipient_id', flat=True)),
+            sorted(worker.id for worker in self.workers),
+        )
+        self.assertIn(task.title, self._reminders().first().message)
+
+    def test_overlapping_run_sends_only_the_reminders_it_recorded(self):
+        from . import reminders
+        from .bulk import insert_new
+        from .models import SentReminder
+        task = self._task(timedelta(hours=5))
+
+        def other_run_first(rows):
+            # Another run records the first worker's reminder between our read and our insert
+            SentReminder.objects.create(task=task, user=self.workers[0], due_date=task.due_date)
+            return insert_new(rows)
+
+        with patch.object(reminders, 'insert_new', side_effect=other_run_first):
+            result = self._send()
+        self.assertEqual((result.sent, result.already_sent), (2, 1))
+        self.assertEqual(
+            sorted(self._reminders().values_list('recipient_id', flat=True)),
+            sorted(worker.id for worker in self.workers[1:]),
+        )
+
+    def test_rerun_does_not_remind_twice(self):
+        self._task(timedelta(hours=5))
+        self._send()
+        result = self._send(now=self.now + timedelta(minutes=10))
+        self.assertEqual((result.sent, result.already_sent), (0, 3))
+        self.assertEqual(self._reminders().count(), 3)
+
+    def test_new_due_date_and_new_assignee_are_reminded(self):
+        task = self._task(timedelta(hours=5), assignees=self.workers[:1])
+        self._send()
+        task.assigned_to.add(self.workers[1])
+        Task.objects.filter(pk=task.pk).update(due_date=self.now + timedelta(hours=8))
+        result = self._send()
+        self.assertEqual((result.sent, result.already_sent), (2, 0))
+        self.assertEqual(self._reminders().filter(recipient=self.workers[0]).count(), 2)
+
+    def test_skips_muted_assignees(self):
+        Profile.objects.filter(user=self.workers[0]).update(receives_notifications=False)
+        self._task(timedelta(hours=5))
+        result = self._send()
+        self.assertEqual((result.muted, result.sent), (1, 2))
+        self.assertFalse(self._reminders().filter(recipient=self.workers[0]).exists())
+
+    def test_prunes_ledger_rows_of_passed_deadlines(self):
+        from .models import SentReminder
+        self._task(timedelta(hours=5))
+        self._send()
+        result = self._send(now=self.now + timedelta(hours=6))
+        self.assertEqual(result.pruned, 3)
+        self.assertFalse(SentReminder.objects.exists())
+
+    def test_query_count_does_not_grow_with_tasks(self):
+        for _ in range(5):
+            self._task(timedelta(hours=5))
+        # Prune, pairs, savepoint, ledger lookup, ledger insert, receivers, notifications, push outbox, release
+        with self.assertNumQueries(9):
+            result = self._send(batch_size=100)
+        self.assertEqual(result.sent, 15)
+
+    def test_command_prints_run_statistics(self):
+        self._task(timedelta(hours=5))
+        out = StringIO()
+        call_command('send_deadline_reminders', stdout=out)
+        self.assertIn('Sent 3 deadline reminder(s) for 1 task(s)', out.getvalue())
+
+
+class SchedulerJobRunTests(TestCase):
+    """run_scheduler jobs claim their fire time, so they run once across workers, and record the run."""
+
+    def setUp(self):
+        from datetime import datetime, timezone as dt_timezone
+        self.slot = datetime(2025, 5, 5, 8, 15, tzinfo=dt_timezone.utc)
+        self.calls = []
+
+    def _job(self):
+        self.calls.append(1)
+        return 7
+
+    def test_first_claim_runs_and_records_the_run(self):
+        from .jobs import run_once
+        run = run_once('send_deadline_reminders', self._job, self.slot)
+        run.refresh_from_db()
+        self.assertEqual((run.status, run.rows, run.error), ('SUCCEEDED', 7, ''))
+        self.assertIsNotNone(run.finished_at)
+        self.assertGreaterEqual(run.duration_seconds, 0)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_claimed_slot_is_skipped(self):
+        from .jobs import run_once
+        run_once('send_deadline_reminders', self._job, self.slot)
+        self.assertIsNone(run_once('send_deadline_reminders', self._job, self.slot))
+        self.assertIsNotNone(run_once('send_deadline_reminders', self._job, self.slot + timedelta(days=1)))
+        self.assertEqual(len(self.calls), 2)
+
+    def test_slot_skipped_while_previous_run_holds_its_lease(self):
+        from .jobs import run_once
+        from .models import JobRun
+
+        def slow_job():
+            # The next minute fires while this run is still going
+            self.assertIsNone(run_once('geocode_gardens', self._job, self.slot + timedelta(minutes=1)))
+            return 0
+
+        run = run_once('geocode_gardens', slow_job, self.slot)
+        self.assertEqual(run.status, 'SUCCEEDED')
+        self.assertEqual(self.calls, [])
+        self.assertFalse(JobRun.objects.filter(scheduled_for=self.slot + timedelta(minutes=1)).exists())
+        self.assertIsNotNone(run_once('geocode_gardens', self._job, self.slot + timedelta(minutes=2)))
+
+    def test_expired_lease_is_failed_and_the_job_runs_again(self):
+        from .jobs import run_once
+        from .models import JobRun
+        dead = JobRun.objects.create(
+            job_id='geocode_gardens', scheduled_for=self.slot, started_at=timezone.now() - timedelta(hours=2),
+        )
+        self.assertIsNotNone(run_once('geocode_gardens', self._job, self.slot + timedelta(minutes=1)))
+        dead.refresh_from_db()
+        self.assertEqual(dead.status, 'FAILED')
+        self.assertIn('Lease expired', dead.error)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_failures_are_recorded(self):
+        from .jobs import run_once
+
+        def broken():
+            raise RuntimeError('forecast service down')
+
+        run = run_once('weather_reminders', broken, self.slot)
+        self.assertEqual(run.status, 'FAILED')
+        self.assertIn('forecast service down', run.error)
+
+    def test_slot_is_the_fire_time_within_the_grace_period(self):
+        from apscheduler.triggers.cron import CronTrigger
+        from .jobs import scheduled_slot
+        trigger = CronTrigger(hour='08', minute='15', timezone='UTC')
+        self.assertEqual(scheduled_slot(trigger, self.slot + timedelta(seconds=4)), self.slot)
+        # Outside a fire time (manual runs): the current minute
+        late = self.slot + timedelta(hours=1, seconds=42)
+        self.assertEqual(scheduled_slot(trigger, late), self.slot + timedelta(hours=1))
+
+    def test_purges_old_runs(self):
+        from .jobs import purge_job_runs, run_once
+        from .models import JobRun
+        run_once('geocode_gardens', self._job, self.slot)
+        run_once('geocode_gardens', self._job, self.slot + timedelta(minutes=1))
+        JobRun.objects.filter(scheduled_for=self.slot).update(started_at=timezone.now() - timedelta(days=60))
+        self.assertEqual(purge_job_runs(), 1)
+        self.assertEqual(JobRun.objects.count(), 1)
+
+    def test_run_job_option_runs_once_per_minute(self):
+        from .models import JobRun
+        out = StringIO()
+        call_command('run_scheduler', '--run-job', 'purge_job_runs', stdout=out)
+        call_command('run_scheduler', '--run-job', 'purge_job_runs', stdout=out)
+        self.assertIn("'purge_job_runs' finished", out.getvalue())
+        self.assertIn('skipped', out.getvalue())
+        self.assertEqual(JobRun.objects.get().rows, 0)
+
+    def test_repeated_stop_signals_shut_down_once(self):
+        import signal
+        import threading
+        from apscheduler.schedulers.base import BaseScheduler
+        from apscheduler.schedulers.blocking import BlockingScheduler
+        from .management.commands import run_scheduler
+        handlers = {}
+
+        def start_and_get_stopped(scheduler):
+            # BlockingScheduler.start without its blocking main loop
+            scheduler._event = threading.Event()
+            BaseScheduler.start(scheduler)
+            # e.g. Ctrl+C pressed twice, or SIGTERM followed by SIGINT
+            handlers[signal.SIGTERM](signal.SIGTERM, None)
+            handlers[signal.SIGINT](signal.SIGINT, None)
+
+        out = StringIO()
+        with patch.object(run_scheduler.signal, 'signal', handlers.__setitem__), \
+                patch.object(BlockingScheduler, 'start', start_and_get_stopped):
+            call_command('run_scheduler', stdout=out)
+        self.assertIn('Scheduler worker stopped.', out.getvalue())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'concurrent writers need PostgreSQL')
+class SchedulerJobClaimConcurrencyTests(TransactionTestCase):
+    """Workers firing the same job at the same time against the test database: one of them runs it."""
+
+    def test_concurrent_workers_run_a_job_once(self):
+        from datetime import datetime, timezone as dt_timezone
+        from .jobs import run_once
+        from .models import JobRun
+
+        slot = datetime(2025, 5, 5, 3, 30, tzinfo=dt_timezone.utc)
+        calls = []
+        results, errors = run_in_threads(
+            lambda: run_once('reconcile_user_stats', lambda: calls.append(1) or 0, slot), [()] * 6
+        )
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sum(run is not None for run in results), 1)
+        self.assertEqual(JobRun.objects.get().status, 'SUCCEEDED')
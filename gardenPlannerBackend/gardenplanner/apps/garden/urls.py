@@ -55,6 +55,9 @@ urlpatterns = [
     # Forum endpoints with namespace
     path('forum/', include(forum_patterns)),
     
+    # Full-text search
+    path('search/', views.SearchView.as_view(), name='search'),
+
     # External API integrations
     path('weather/', views.WeatherDataView.as_view(), name='weather'),
 
@@ -74,4 +77,7 @@ urlpatterns = [
 
     path('comments/<int:pk>/mark-best/', views.ToggleBestAnswerView.as_view(), name='mark-best-answer'),
 
+    # Binary image endpoint (signed URLs emitted by serializers with ?image_format=url)
+    path('images/<str:kind>/<int:pk>/', views.ImageView.as_view(), name='image'),
+
 ] 
@@ -5,6 +5,8 @@ from django.conf import settings
 from rest_framework.exceptions import APIException
 import logging
 
+from . import cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -52,7 +54,7 @@ def get_location_coordinates(location):
         tuple: (latitude, longitude) or None if not found
     """
     try:
-        url = "https://api.openweathermap.org/geo/1.0/direct"
+        url = f"{settings.OPENWEATHERMAP_BASE_URL}/geo/1.0/direct"
         params = {
             'q': location,
             'limit': 1,
@@ -75,27 +77,35 @@ def get_location_coordinates(location):
         logger.error(f"Geocoding API request error: {str(e)}")
         return None
 
-def get_weather_data(location):
+def normalize_location(location):
+    """Cache key form of a location: 'Istanbul' and ' istanbul ' are the same place."""
+    return ' '.join(location.split()).casefold()
+
+
+def get_cached_coordinates(location):
     """
-    Fetches weather data for a specific location using OpenWeatherMap API
-    
-    Args:
-        location (str): Location name (e.g., 'Istanbul')
-        
+    get_location_coordinates memoized on the normalized location. Coordinates do
+    not change, so found locations are kept for GEOCODE_CACHE_SECONDS; misses
+    and upstream errors are not cached.
+    """
+    return cache.geocodes.get_or_set(
+        normalize_location(location),
+        lambda: get_location_coordinates(location),
+        timeout=settings.GEOCODE_CACHE_SECONDS,
+        single_flight=True,
+        cache_if=lambda coordinates: coordinates is not None,
+    )
+
+
+def fetch_weather(lat, lon):
+    """
+    Current weather at the coordinates from OpenWeatherMap.
+
     Returns:
-        dict: Weather data for the location
+        dict: Weather data, or a dict with an 'error' key
     """
     try:
-        # First get coordinates for the location
-        coordinates = get_location_coordinates(location)
-        
-        if not coordinates:
-            return {'error': 'Location not found'}
-            
-        lat, lon = coordinates
-        
-        # Now use coordinates to get weather data
-        url = "https://api.openweathermap.org/data/2.5/weather"
+        url = f"{settings.OPENWEATHERMAP_BASE_URL}/data/2.5/weather"
         params = {
             'lat': lat,
             'lon': lon,
@@ -117,3 +127,32 @@ def get_weather_data(location):
     except requests.RequestException as e:
         logger.error(f"Weather API request error: {str(e)}")
         return {'error': 'Could not connect to weather service'}
+
+
+def get_weather_data(location):
+    """
+    Fetches weather data for a specific location using OpenWeatherMap API.
+    Coordinates come from the geocode cache; weather is cached for
+    WEATHER_CACHE_SECONDS per coordinate rounded to 2 decimals (about 1 km),
+    and concurrent misses for the same place share one upstream call.
+    
+    Args:
+        location (str): Location name (e.g., 'Istanbul')
+        
+    Returns:
+        dict: Weather data for the location
+    """
+    # First get coordinates for the location
+    coordinates = get_cached_coordinates(location)
+    
+    if not coordinates:
+        return {'error': 'Location not found'}
+        
+    lat, lon = round(coordinates[0], 2), round(coordinates[1], 2)
+    return cache.weather.get_or_set(
+        (lat, lon),
+        lambda: fetch_weather(lat, lon),
+        timeout=settings.WEATHER_CACHE_SECONDS,
+        single_flight=True,
+        cache_if=lambda data: 'error' not in data,
+    )
@@ -57,6 +57,8 @@ from .badge import (
 )
 
 from .impact_summary import UserImpactSummaryView
+from .image import ImageView
+from .search import SearchView
 
 
 __all__ = [
@@ -109,6 +111,10 @@ __all__ = [
     "UserBadgeListView",
     # Impact Summary Views
     "UserImpactSummaryView",
+    # Image Views
+    "ImageView",
+    # Search Views
+    "SearchView",
     # Other Views
     "WeatherDataView",
 ]
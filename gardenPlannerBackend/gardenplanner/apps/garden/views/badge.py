@@ -1,4 +1,6 @@
 from rest_framework import generics, permissions
+from rest_framework.response import Response
+from ..cache import badge_catalogue
 from ..models import Badge, UserBadge
 from ..serializers import BadgeSerializer, UserBadgeSerializer
 from django.contrib.auth.models import User
@@ -9,6 +11,13 @@ class BadgeListView(generics.ListAPIView):
     serializer_class = BadgeSerializer
     permission_classes = [permissions.AllowAny] 
 
+    def list(self, request, *args, **kwargs):
+        # The catalogue only changes when badges are edited, which invalidates the namespace
+        data = badge_catalogue.get_or_set(
+            'list', lambda: self.get_serializer(self.get_queryset(), many=True).data
+        )
+        return Response(data)
+
 
 class UserBadgeListView(generics.ListAPIView):
     serializer_class = UserBadgeSerializer
@@ -8,9 +8,10 @@ from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.models import User
 
-from ..models import GardenEvent, GardenMembership, EventAttendance, AttendanceStatus
+from ..models import GardenEvent, EventAttendance, AttendanceStatus
 from ..serializers import GardenEventSerializer, EventAttendanceSerializer
 from ..permissions import IsGardenManager, IsGardenMember, IsGardenPublic, IsSystemAdministrator
+from ..memberships import get_memberships
 
 
 class GardenEventViewSet(viewsets.ModelViewSet):
@@ -38,7 +39,7 @@ class GardenEventViewSet(viewsets.ModelViewSet):
         if getattr(user, 'profile', None) and user.profile.role == 'ADMIN':
             return qs
         # Authenticated: public events OR private events in gardens where user is accepted member
-        member_garden_ids = GardenMembership.objects.filter(user=user, status='ACCEPTED').values_list('garden_id', flat=True)
+        member_garden_ids = get_memberships(self.request).garden_ids()
         return qs.filter(
             Q(visibility='PUBLIC') | Q(garden_id__in=member_garden_ids)
         )
@@ -58,7 +59,7 @@ class GardenEventViewSet(viewsets.ModelViewSet):
         user = self.request.user
         garden = serializer.validated_data.get('garden')
         # Must be accepted member to create
-        if not GardenMembership.objects.filter(user=user, garden=garden, status='ACCEPTED').exists():
+        if not get_memberships(self.request).is_member(garden.id):
             raise PermissionDenied('You must be a member of this garden to create events.')
         serializer.save(created_by=user)
 
@@ -68,9 +69,9 @@ class GardenEventViewSet(viewsets.ModelViewSet):
             if hasattr(request.user, 'profile') and request.user.profile.role == 'ADMIN':
                 return
             # Allow creator or garden manager
-            if obj.created_by == request.user:
+            if obj.created_by_id == request.user.pk:
                 return
-            if GardenMembership.objects.filter(user=request.user, garden=obj.garden, role='MANAGER', status='ACCEPTED').exists():
+            if get_memberships(request).is_manager(obj.garden_id):
                 return
             raise PermissionDenied('You do not have permission to modify this event.')
 
@@ -90,7 +91,7 @@ class GardenEventViewSet(viewsets.ModelViewSet):
         
         # Check visibility: private event requires membership
         if event.visibility == 'PRIVATE':
-            if not GardenMembership.objects.filter(user=user, garden=event.garden, status='ACCEPTED').exists():
+            if not get_memberships(request).is_member(event.garden_id):
                 return Response({'error': 'You are not a member of this garden.'}, status=status.HTTP_403_FORBIDDEN)
         
         attendance, _ = EventAttendance.objects.update_or_create(
@@ -108,7 +109,7 @@ class GardenEventViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Event not found'}, status=status.HTTP_404_NOT_FOUND)
         
         if event.visibility == 'PRIVATE':
-            if not GardenMembership.objects.filter(user=request.user, garden=event.garden, status='ACCEPTED').exists():
+            if not get_memberships(request).is_member(event.garden_id):
                 return Response({'error': 'You are not a member of this garden.'}, status=status.HTTP_403_FORBIDDEN)
         
         votes = event.attendances.select_related('user').all()
@@ -1,7 +1,7 @@
 """Views for managing forum posts and comments.""" 
 
 from django.contrib.auth.models import User
-from django.db.models import Q
+from django.db.models import BooleanField, ExpressionWrapper, Q
 from django.shortcuts import get_object_or_404
 from rest_framework.response import Response
 from rest_framework import status
@@ -15,12 +15,43 @@ from ..serializers import (
     ForumPostSerializer, CommentSerializer, LikerSerializer
 )
 from ..models import ForumPost, Comment, ForumPostLike, CommentLike
+from ..pagination import OptInCursorPagination, CommentCursorPagination
+from ..images import needs_image_data
+from ..likes import toggle_like
+
+
+def _wants_comments(request):
+    # Mirrors ForumPostSerializer.get_comments so comments are only prefetched when rendered
+    return request.query_params.get('include_comments', '').lower() == 'true'
+
+
+def _wants_image_data(request):
+    return needs_image_data({'request': request})
+
+
+def _liker_profiles(likes, request):
+    """Profiles of the users behind ``likes``, loading picture bytes only when they are inlined."""
+    likes = likes.select_related('user__profile')
+    if _wants_image_data(request):
+        return [like.user.profile for like in likes]
+
+    likes = likes.defer('user__profile__profile_picture_data').annotate(
+        liker_has_picture=ExpressionWrapper(
+            Q(user__profile__profile_picture_data__isnull=False), output_field=BooleanField()
+        ),
+    )
+    profiles = []
+    for like in likes:
+        like.user.profile.has_profile_picture = like.liker_has_picture
+        profiles.append(like.user.profile)
+    return profiles
 
 
 class ForumPostListCreateView(generics.ListCreateAPIView):
     queryset = ForumPost.objects.filter(is_deleted=False).order_by('-created_at')
     serializer_class = ForumPostSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = OptInCursorPagination
 
     def _str_to_bool(self, val):
         if val is None:
@@ -29,7 +60,15 @@ class ForumPostListCreateView(generics.ListCreateAPIView):
 
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = self._filter_visible(super().get_queryset())
+        # Annotate counters and preload relations so the page costs a fixed number of queries
+        return queryset.for_feed(
+            self.request.user,
+            include_comments=_wants_comments(self.request),
+            image_data=_wants_image_data(self.request),
+        )
+
+    def _filter_visible(self, queryset):
         # Filter out posts from blocked users
         user = getattr(self.request, 'user', None)
         if not user or not user.is_authenticated:
@@ -62,6 +101,13 @@ class ForumPostRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ForumPostSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
+    def get_queryset(self):
+        return super().get_queryset().for_feed(
+            self.request.user,
+            include_comments=_wants_comments(self.request),
+            image_data=_wants_image_data(self.request),
+        )
+
     def get_object(self):
         obj = super().get_object()
 
@@ -92,27 +138,19 @@ class ForumPostRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 class LikeToggleView(APIView):
     permission_classes = [IsAuthenticated]
 
-    def toggle_like(self, model_class, like_model_class, pk, request):
-        obj = get_object_or_404(model_class, pk=pk, is_deleted=False)
-
-        # Toggle Logic
-        like_instance = like_model_class.objects.filter(user=request.user, **{self.lookup_field: obj}).first()
-
-        if like_instance:
-            # If like exists, remove it (Unlike)
-            like_instance.delete()
-            return Response({"detail": "Unliked", "is_liked": False, "likes_count": obj.likes.count()}, status=status.HTTP_200_OK)
-        else:
-            # If like does not exist, create it (Like)
-            like_model_class.objects.create(user=request.user, **{self.lookup_field: obj})
-            return Response({"detail": "Liked", "is_liked": True, "likes_count": obj.likes.count()}, status=status.HTTP_201_CREATED)
+    def toggle_like(self, like_model_class, pk, request):
+        # One atomic statement on PostgreSQL; see likes.toggle_like
+        is_liked, likes_count = toggle_like(like_model_class, request.user, pk)
+        if is_liked:
+            return Response({"detail": "Liked", "is_liked": True, "likes_count": likes_count}, status=status.HTTP_201_CREATED)
+        return Response({"detail": "Unliked", "is_liked": False, "likes_count": likes_count}, status=status.HTTP_200_OK)
 
 
 class ForumPostLikeToggleView(LikeToggleView):
     lookup_field = 'post'
 
     def post(self, request, pk):
-        return self.toggle_like(ForumPost, ForumPostLike, pk, request)
+        return self.toggle_like(ForumPostLike, pk, request)
 
 
 class PostLikeListView(generics.ListAPIView):
@@ -121,19 +159,20 @@ class PostLikeListView(generics.ListAPIView):
 
     def get_queryset(self):
         post_id = self.kwargs['pk']
-        likes = ForumPostLike.objects.filter(post_id=post_id).select_related('user__profile')
+        likes = ForumPostLike.objects.filter(post_id=post_id)
         
         # 3. Return the PROFILES of the users who liked it
-        return [like.user.profile for like in likes]
+        return _liker_profiles(likes, self.request)
 
 
 class CommentListCreateView(generics.ListCreateAPIView):
     queryset = Comment.objects.filter(is_deleted=False)
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = CommentCursorPagination
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().for_feed(self.request.user, image_data=_wants_image_data(self.request))
         forum_post = self.request.query_params.get('forum_post')
         if forum_post is not None:
             queryset = queryset.filter(forum_post_id=forum_post)
@@ -191,7 +230,7 @@ class CommentLikeToggleView(LikeToggleView):
     lookup_field = 'comment'
 
     def post(self, request, pk):
-        return self.toggle_like(Comment, CommentLike, pk, request)
+        return self.toggle_like(CommentLike, pk, request)
 
 
 class CommentLikeListView(generics.ListAPIView):
@@ -200,9 +239,9 @@ class CommentLikeListView(generics.ListAPIView):
 
     def get_queryset(self):
         comment_id = self.kwargs['pk']
-        likes = CommentLike.objects.filter(comment_id=comment_id).select_related('user__profile')
+        likes = CommentLike.objects.filter(comment_id=comment_id)
         
-        return [like.user.profile for like in likes]
+        return _liker_profiles(likes, self.request)
 
 
 class ToggleBestAnswerView(APIView):
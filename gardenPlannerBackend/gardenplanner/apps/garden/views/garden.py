@@ -1,15 +1,32 @@
 """Views for Garden and GardenMembership models."""
 
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
 from rest_framework.response import Response
-from rest_framework import viewsets, permissions, filters
+from rest_framework import viewsets, permissions, filters, status
 from rest_framework import serializers
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.settings import api_settings
 from django.db.models import Q
 from ..serializers import (
-    GardenSerializer, GardenMembershipSerializer, UserGardenSerializer
+    CalendarItemSerializer, GardenSerializer, GardenMembershipSerializer, UserGardenSerializer
 )
 from ..models import Garden, GardenMembership
+from ..geo import nearby
+from ..images import garden_images_prefetch
+from ..memberships import get_memberships
+from ..ical import ICalendarRenderer, stream_calendar
+from ..schedule import (
+    calendar_etag, calendar_items, can_view_calendar, feed_key, feed_start, feed_user_id, iter_calendar_items,
+    parse_window,
+)
+from ..search import FullTextSearchFilter
 from ..permissions import (
     IsSystemAdministrator, IsMember, IsGardenManager, CanDeleteMembership
 )
@@ -20,27 +37,24 @@ from google.cloud.firestore import SERVER_TIMESTAMP
 class GardenViewSet(viewsets.ModelViewSet):
     queryset = Garden.objects.prefetch_related('images')
     serializer_class = GardenSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'description']
+    # ?search= runs through the full-text backend over search.SEARCH_FIELDS
+    filter_backends = [FullTextSearchFilter, filters.OrderingFilter]
     ordering_fields = ['name', 'created_at']
 
     def get_queryset(self):
         user = self.request.user
-        queryset = Garden.objects.prefetch_related('images')
+        queryset = Garden.objects.prefetch_related(garden_images_prefetch({'request': self.request}))
 
         # Unauthenticated users can only see public, non-hidden gardens
         if not user.is_authenticated:
             return queryset.filter(is_public=True, is_hidden=False)
 
         # Authenticated users can see public, non-hidden gardens and gardens they are members of (even if hidden)
-        member_garden_ids = GardenMembership.objects.filter(
-            user=user,
-            status='ACCEPTED'  # make sure only accepted memberships
-        ).values_list('garden_id', flat=True)
+        member_garden_ids = get_memberships(self.request).garden_ids()
 
         # Return public non-hidden gardens OR gardens user is a member of (members can see hidden gardens they belong to)
         return queryset.filter(
-            Q(is_public=True, is_hidden=False) | Q(id__in=list(member_garden_ids))
+            Q(is_public=True, is_hidden=False) | Q(id__in=member_garden_ids)
         )
     
     
@@ -48,7 +62,7 @@ class GardenViewSet(viewsets.ModelViewSet):
         """
         Instantiates and returns the list of permissions that this view requires.
         """
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'nearby', 'calendar_feed']:
             permission_classes = [permissions.AllowAny]
         elif self.action in ['create']:
             permission_classes = [IsMember]
@@ -67,6 +81,7 @@ class GardenViewSet(viewsets.ModelViewSet):
             role='MANAGER',
             status='ACCEPTED'
         )
+        get_memberships(self.request).invalidate()
         
         # Create a chat for this garden in Firebase
         try:         
@@ -100,6 +115,96 @@ class GardenViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
+    @action(detail=False, methods=['get'], url_path='nearby')
+    def nearby(self, request):
+        """
+        Gardens within radius_km of (lat, lon), nearest first, each with its
+        distance_km (URL: /gardens/nearby/?lat=&lon=&radius_km=)
+        """
+        try:
+            lat = float(request.query_params['lat'])
+            lon = float(request.query_params['lon'])
+            radius_km = float(request.query_params.get('radius_km', settings.GARDEN_NEARBY_DEFAULT_RADIUS_KM))
+        except KeyError:
+            return Response({'error': 'lat and lon parameters are required'}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({'error': 'lat, lon and radius_km must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return Response({'error': 'lat or lon out of range'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 < radius_km <= settings.GARDEN_NEARBY_MAX_RADIUS_KM:
+            return Response(
+                {'error': f'radius_km must be greater than 0 and at most {settings.GARDEN_NEARBY_MAX_RADIUS_KM}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        gardens = nearby(self.get_queryset(), lat, lon, radius_km)[:settings.GARDEN_NEARBY_MAX_RESULTS]
+        serializer = self.get_serializer(gardens, many=True)
+        return Response(serializer.data)
+
+
+    @action(detail=True, methods=['get'], url_path='calendar')
+    def calendar(self, request, pk=None):
+        """
+        Tasks and events of this garden in a window, including the projected
+        occurrences of recurring tasks (URL: /gardens/<id>/calendar/?from=&to=)
+        """
+        garden = self.get_object()
+        if not can_view_calendar(request.user, garden.id):
+            raise PermissionDenied('You must be a member of this garden to view its calendar.')
+        try:
+            start, end = parse_window(request.query_params.get('from'), request.query_params.get('to'))
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        items = calendar_items(garden.id, start, end)
+        feed_url = reverse('garden:garden-calendar-feed', args=[garden.id])
+        return Response({
+            'from': start,
+            'to': end,
+            'items': CalendarItemSerializer(items, many=True).data,
+            'feed_url': request.build_absolute_uri(f'{feed_url}?key={feed_key(garden.id, request.user.id)}'),
+        })
+
+    @action(
+        detail=True, methods=['get'], url_path='calendar/feed',
+        renderer_classes=[*api_settings.DEFAULT_RENDERER_CLASSES, ICalendarRenderer],
+    )
+    def calendar_feed(self, request, pk=None):
+        """
+        iCalendar export of the calendar for calendar apps, streamed; they pass
+        the key from feed_url instead of logging in (URL: /gardens/<id>/calendar/feed/?key=)
+        """
+        garden = get_object_or_404(Garden, pk=pk)
+        user = request.user
+        key = request.query_params.get('key')
+        if key:
+            user_id = feed_user_id(garden.id, key)
+            user = User.objects.select_related('profile').filter(pk=user_id).first() if user_id else None
+        if not can_view_calendar(user, garden.id):
+            raise PermissionDenied('This calendar feed is not available.')
+        try:
+            start, end = parse_window(
+                request.query_params.get('from'), request.query_params.get('to'),
+                default_start=feed_start(),
+                default_days=settings.GARDEN_CALENDAR_FEED_PAST_DAYS + settings.GARDEN_CALENDAR_FEED_FUTURE_DAYS,
+            )
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        etag = calendar_etag(garden, start, end)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        response = StreamingHttpResponse(
+            stream_calendar(garden.name, iter_calendar_items(garden.id, start, end)),
+            content_type='text/calendar; charset=utf-8',
+        )
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        response['Content-Disposition'] = f'inline; filename="garden-{garden.id}.ics"'
+        return response
+
+
 class GardenMembershipViewSet(viewsets.ModelViewSet):
     queryset = GardenMembership.objects.all()
     serializer_class = GardenMembershipSerializer
@@ -120,10 +225,11 @@ class GardenMembershipViewSet(viewsets.ModelViewSet):
         user = self.request.user
         garden = serializer.validated_data['garden']
 
-        if GardenMembership.objects.filter(user=user, garden=garden).exists():
+        if get_memberships(self.request).has_membership(garden.id):
             raise serializers.ValidationError("You already have a membership or request pending for this garden.")
 
         serializer.save(user=user)
+        get_memberships(self.request).invalidate()
     
     def perform_update(self, serializer):
         """Update membership and sync chat members if status changes to ACCEPTED"""
@@ -146,6 +252,7 @@ class GardenMembershipViewSet(viewsets.ModelViewSet):
         
         # Delete the membership first
         instance.delete()
+        get_memberships(self.request).invalidate()
         
         # Only proceed with checks if the deleted membership was accepted
         if not was_accepted:
@@ -223,7 +330,9 @@ class GardenMembershipViewSet(viewsets.ModelViewSet):
         memberships = GardenMembership.objects.filter(
             user=request.user,
             status='ACCEPTED'
-        ).select_related('garden')
+        ).select_related('garden').prefetch_related(
+            garden_images_prefetch({'request': request}, 'garden__images')
+        )
         
         # Extract the gardens from the memberships
         gardens = [membership.garden for membership in memberships]
@@ -0,0 +1,81 @@
+"""Binary image endpoint serving DB-stored images with HTTP caching support."""
+
+import io
+
+from django.http import FileResponse, Http404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.permissions import AllowAny
+from rest_framework.views import APIView
+
+from ..images import (
+    IMAGE_SOURCES,
+    ORIGINAL_VARIANT,
+    is_known_variant,
+    is_valid_signature,
+    variant_bytes,
+    version_token,
+)
+
+# Image URLs change whenever the image does, so clients may keep them for a day
+IMAGE_CACHE_MAX_AGE = 60 * 60 * 24
+
+
+class ImageView(APIView):
+    """
+    GET /api/images/<kind>/<pk>/?v=<version>&sig=<signature>[&variant=thumb|medium]
+
+    Streams the raw bytes of a garden, post, comment or profile image, or of a
+    resized variant that is generated on first request and stored. The URL
+    is signed by the serializer that emitted it, so no token is needed and the
+    URL can be used directly in <img> tags. The signature covers the version,
+    so URLs of a replaced image, or of a deleted post or comment, are 404.
+    Supports conditional GET through
+    ETag / Last-Modified and answers 304 without loading the image bytes.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request, kind, pk):
+        source = IMAGE_SOURCES.get(kind)
+        token = request.query_params.get('v')
+        if source is None or not is_valid_signature(kind, pk, token, request.query_params.get('sig')):
+            raise Http404
+        variant = request.query_params.get('variant', ORIGINAL_VARIANT)
+        if not is_known_variant(variant):
+            raise Http404
+
+        meta = source.visible().filter(
+            pk=pk, **{f'{source.data_field}__isnull': False}
+        ).values(source.mime_field, source.version_field).first()
+        if meta is None:
+            raise Http404
+
+        modified = meta[source.version_field]
+        if version_token(modified) != token:
+            raise Http404
+        etag = f'"{kind}-{pk}-{variant}-{version_token(modified)}"'
+        last_modified = int(modified.timestamp()) if modified else None
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        def load_source():
+            data = source.model.objects.filter(pk=pk).values_list(source.data_field, flat=True).first()
+            if data is None:
+                raise Http404
+            return bytes(data), meta[source.mime_field] or 'image/jpeg'
+
+        if variant == ORIGINAL_VARIANT:
+            data, mime_type = load_source()
+        else:
+            data, mime_type = variant_bytes(kind, pk, variant, modified, load_source)
+
+        response = FileResponse(io.BytesIO(data), content_type=mime_type)
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, max_age=IMAGE_CACHE_MAX_AGE)
+        return response
@@ -6,6 +6,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from ..models import Notification
 from ..serializers import NotificationSerializer, GCMDeviceSerializer
+from ..pagination import NotificationCursorPagination
 from push_notifications.models import GCMDevice
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
@@ -15,6 +16,7 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = NotificationCursorPagination
 
     def get_queryset(self):
         # Only return notifications for the current user
@@ -8,6 +8,8 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 
 from ..models import GardenMembership, Task
+from ..images import garden_images_prefetch, profiles_for_pictures
+from ..memberships import get_memberships
 from ..serializers import (
     ProfileSerializer, UserSerializer, ProfileUpdateSerializer, FollowSerializer, UserGardenSerializer, TaskSerializer
 )
@@ -26,7 +28,7 @@ class ProfileView(APIView):
         serializer = ProfileUpdateSerializer(request.user.profile, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
-            return Response(UserSerializer(request.user).data)
+            return Response(UserSerializer(request.user, context={'request': request}).data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -72,7 +74,9 @@ class UserGardensView(APIView):
         memberships = GardenMembership.objects.filter(
             user=user,
             status='ACCEPTED'
-        ).select_related('garden').prefetch_related('garden__images')
+        ).select_related('garden').prefetch_related(
+            garden_images_prefetch({'request': request}, 'garden__images')
+        )
         
         # Extract the gardens from the memberships
         gardens = [membership.garden for membership in memberships]
@@ -128,8 +132,9 @@ class FollowersListView(APIView):
 
     def get(self, request):
         """Get list of users that follow the current user"""
-        followers = request.user.profile.followers.all()
-        serializer = ProfileSerializer(followers, many=True)
+        context = {'request': request}
+        followers = profiles_for_pictures(request.user.profile.followers.select_related('user'), context)
+        serializer = ProfileSerializer(followers, many=True, context=context)
         return Response(serializer.data)
 
 
@@ -138,8 +143,9 @@ class FollowingListView(APIView):
 
     def get(self, request):
         """Get list of users that the current user is following"""
-        following = request.user.profile.following.all()
-        serializer = ProfileSerializer(following, many=True)
+        context = {'request': request}
+        following = profiles_for_pictures(request.user.profile.following.select_related('user'), context)
+        serializer = ProfileSerializer(following, many=True, context=context)
         return Response(serializer.data)
     
 class UserFollowersView(APIView):
@@ -154,8 +160,9 @@ class UserFollowersView(APIView):
         if request.user.profile.is_blocked(target_user.profile) or target_user.profile.is_blocked(request.user.profile):
             return Response({"error": "You cannot view this user's followers due to blocking restrictions."}, status=status.HTTP_403_FORBIDDEN)
 
-        followers = target_user.profile.followers.all()
-        serializer = ProfileSerializer(followers, many=True)
+        context = {'request': request}
+        followers = profiles_for_pictures(target_user.profile.followers.select_related('user'), context)
+        serializer = ProfileSerializer(followers, many=True, context=context)
         return Response(serializer.data)
 
 
@@ -198,7 +205,7 @@ class UserTasksView(APIView):
                 continue
 
             # Otherwise user must be an accepted member of the garden
-            if GardenMembership.objects.filter(user=request.user, garden=task.garden, status='ACCEPTED').exists():
+            if get_memberships(request).is_member(task.garden_id):
                 visible_tasks.append(task)
 
         serializer = TaskSerializer(visible_tasks, many=True)
@@ -217,8 +224,9 @@ class UserFollowingView(APIView):
         if request.user.profile.is_blocked(target_user.profile) or target_user.profile.is_blocked(request.user.profile):
             return Response({"error": "You cannot view this user's following list due to blocking restrictions."}, status=status.HTTP_403_FORBIDDEN)
 
-        following = target_user.profile.following.all()
-        serializer = ProfileSerializer(following, many=True)
+        context = {'request': request}
+        following = profiles_for_pictures(target_user.profile.following.select_related('user'), context)
+        serializer = ProfileSerializer(following, many=True, context=context)
         return Response(serializer.data)
     
 class UserIsFollowingView(APIView):
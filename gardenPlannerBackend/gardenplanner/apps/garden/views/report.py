@@ -124,6 +124,14 @@ class AdminReportViewSet(viewsets.ModelViewSet):
     serializer_class = ReportSerializer
     permission_classes = [IsModerator]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # ?reviewed=false is the moderation queue, oldest report first
+        reviewed = self.request.query_params.get('reviewed')
+        if reviewed is not None:
+            queryset = queryset.filter(reviewed=reviewed.lower() in ('true', '1')).order_by('created_at')
+        return queryset
+
     @action(detail=True, methods=['post'])
     def review(self, request, pk=None):
         report = self.get_object()
@@ -0,0 +1,69 @@
+"""Full-text search over forum posts, comments, gardens and tasks."""
+
+from django.db.models import Q
+from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny
+
+from ..serializers import CommentSerializer, ForumPostSerializer, GardenSerializer, TaskSerializer
+from ..models import Comment, ForumPost, Garden, Task
+from ..images import garden_images_prefetch, needs_image_data
+from ..memberships import get_memberships
+from ..pagination import SearchPagination
+from ..search import exclude_blocked_authors, search
+
+
+class SearchView(generics.ListAPIView):
+    """
+    Ranked search (URL: /search/?q=<terms>&type=posts|comments|gardens|tasks).
+    Only returns what the user could see through the regular endpoints, without
+    content by users on either side of a block. Results are paginated.
+    """
+    permission_classes = [AllowAny]
+    pagination_class = SearchPagination
+    serializer_classes = {
+        'posts': ForumPostSerializer,
+        'comments': CommentSerializer,
+        'gardens': GardenSerializer,
+        'tasks': TaskSerializer,
+    }
+
+    def get_type(self):
+        search_type = self.request.query_params.get('type', 'posts')
+        if search_type not in self.serializer_classes:
+            raise ValidationError({'type': f"Must be one of: {', '.join(self.serializer_classes)}."})
+        return search_type
+
+    def get_serializer_class(self):
+        return self.serializer_classes[self.get_type()]
+
+    def get_queryset(self):
+        term = self.request.query_params.get('q', '').strip()
+        if not term:
+            raise ValidationError({'q': 'This parameter is required.'})
+
+        user = self.request.user
+        image_data = needs_image_data({'request': self.request})
+        search_type = self.get_type()
+
+        if search_type == 'posts':
+            posts = exclude_blocked_authors(ForumPost.objects.filter(is_deleted=False), user)
+            return search(posts, term).for_feed(user, image_data=image_data)
+
+        if search_type == 'comments':
+            comments = exclude_blocked_authors(
+                Comment.objects.filter(is_deleted=False, forum_post__is_deleted=False), user
+            )
+            return search(comments, term).for_feed(user, image_data=image_data)
+
+        if search_type == 'gardens':
+            visible = Q(is_public=True, is_hidden=False)
+            if user.is_authenticated:
+                visible |= Q(id__in=get_memberships(self.request).garden_ids())
+            gardens = Garden.objects.filter(visible)
+            return search(gardens, term).prefetch_related(garden_images_prefetch({'request': self.request}))
+
+        if not user.is_authenticated:
+            return Task.objects.none()
+        tasks = Task.objects.filter(garden_id__in=get_memberships(self.request).garden_ids())
+        return search(tasks, term).select_related('garden', 'assigned_by', 'custom_type').prefetch_related('assigned_to')
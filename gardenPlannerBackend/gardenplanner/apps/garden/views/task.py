@@ -16,6 +16,17 @@ from ..models import GardenMembership, CustomTaskType, Task
 from ..permissions import (
     IsGardenManager, IsGardenMember, IsGardenPublic, IsTaskAssignee
 )
+from ..pagination import OptInCursorPagination
+from ..memberships import get_memberships
+from ..search import FullTextSearchFilter
+
+
+def _accepted_member_ids(garden, users):
+    """Ids of the given users that are accepted members of the garden, in one query."""
+    return set(
+        GardenMembership.objects.filter(user__in=list(users), garden=garden, status='ACCEPTED')
+        .values_list('user_id', flat=True)
+    )
 
 
 class CustomTaskTypeViewSet(viewsets.ModelViewSet):
@@ -38,18 +49,18 @@ class CustomTaskTypeViewSet(viewsets.ModelViewSet):
 class TaskViewSet(viewsets.ModelViewSet):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['title', 'description']
+    # ?search= runs through the full-text backend over search.SEARCH_FIELDS
+    filter_backends = [FullTextSearchFilter, filters.OrderingFilter]
     ordering_fields = ['due_date', 'created_at', 'status']
+    pagination_class = OptInCursorPagination
+
     def get_queryset(self):
         user = self.request.user
         action = getattr(self, 'action', None)
 
         # Ensure update/partial_update also use the membership-based queryset
         if action in ['retrieve', 'update', 'partial_update', 'destroy', 'assign_task', 'accept_task', 'decline_task', 'complete_task','self_assign_task']:
-            memberships = GardenMembership.objects.filter(user=user, status='ACCEPTED')
-            garden_ids = memberships.values_list('garden_id', flat=True)
-            return Task.objects.filter(garden_id__in=garden_ids)
+            return Task.objects.filter(garden_id__in=get_memberships(self.request).garden_ids())
 
         garden_id = self.request.query_params.get('garden')
         if not garden_id:
@@ -60,8 +71,7 @@ class TaskViewSet(viewsets.ModelViewSet):
         if user.profile.role == 'ADMIN':
             return Task.objects.filter(garden_id=garden_id)
 
-        membership = GardenMembership.objects.filter(user=user, garden_id=garden_id, status='ACCEPTED').first()
-        if not membership:
+        if not get_memberships(self.request).is_member(garden_id):
             return Task.objects.none()
 
         return Task.objects.filter(garden_id=garden_id)
@@ -86,19 +96,14 @@ class TaskViewSet(viewsets.ModelViewSet):
         
         
         # Check if user has an ACCEPTED membership for this garden
-        membership = GardenMembership.objects.filter(
-            user=user,
-            garden=garden,
-            status='ACCEPTED'
-        ).first()
-        
-        if not membership:
+        if not get_memberships(self.request).is_member(garden.id):
             raise PermissionDenied("You must be an accepted member of this garden to create tasks.")
         
         # If assigning to users, verify they are all accepted members
         if assigned_to_users:
+            member_ids = _accepted_member_ids(garden, assigned_to_users)
             for assigned_user in assigned_to_users:
-                if not GardenMembership.objects.filter(user=assigned_user, garden=garden, status='ACCEPTED').exists():
+                if assigned_user.pk not in member_ids:
                     raise ValidationError({"assigned_to": f"User {assigned_user.username} must be an accepted member of this garden."})
         
         serializer.save(assigned_by=user)
@@ -108,7 +113,7 @@ class TaskViewSet(viewsets.ModelViewSet):
         """Accept a task (workers only)"""
         task = self.get_object()
         
-        if not task.assigned_to.filter(pk=request.user.pk).exists():
+        if not get_memberships(request).is_task_assignee(task):
             return Response(
                 {"error": "You cannot accept a task that is not assigned to you"},
                 status=status.HTTP_403_FORBIDDEN
@@ -129,7 +134,7 @@ class TaskViewSet(viewsets.ModelViewSet):
         """Decline a task (workers only)"""
         task = self.get_object()
         
-        if not task.assigned_to.filter(pk=request.user.pk).exists():
+        if not get_memberships(request).is_task_assignee(task):
             return Response(
                 {"error": "You cannot decline a task that is not assigned to you"},
                 status=status.HTTP_403_FORBIDDEN
@@ -150,7 +155,7 @@ class TaskViewSet(viewsets.ModelViewSet):
         """Mark a task as completed (workers only)"""
         task = self.get_object()
         
-        if not task.assigned_to.filter(pk=request.user.pk).exists():
+        if not get_memberships(request).is_task_assignee(task):
             return Response(
                 {"error": "You cannot complete a task that is not assigned to you"},
                 status=status.HTTP_403_FORBIDDEN
@@ -172,14 +177,7 @@ class TaskViewSet(viewsets.ModelViewSet):
         task = self.get_object()
 
         # Only garden managers or system admins can assign
-        membership = GardenMembership.objects.filter(
-            user=request.user,
-            garden=task.garden,
-            role='MANAGER',
-            status='ACCEPTED'
-        ).first()
-
-        if not (membership or request.user.profile.role == 'ADMIN'):
+        if not (get_memberships(request).is_manager(task.garden_id) or request.user.profile.role == 'ADMIN'):
             return Response({"error": "You do not have permission to assign this task."},
                             status=status.HTTP_403_FORBIDDEN)
 
@@ -192,14 +190,17 @@ class TaskViewSet(viewsets.ModelViewSet):
             user_ids = [user_ids]
         
         assigned_users = []
+        users_by_id = User.objects.in_bulk(user_ids)
+        member_ids = _accepted_member_ids(task.garden_id, users_by_id.values())
         for user_id in user_ids:
-            assigned_user = get_object_or_404(User, id=user_id)
+            assigned_user = users_by_id.get(user_id) or get_object_or_404(User, id=user_id)
             # Check if the assigned user is part of the garden
-            if not GardenMembership.objects.filter(user=assigned_user, garden=task.garden, status='ACCEPTED').exists():
+            if assigned_user.pk not in member_ids:
                 return Response({"error": f"User {assigned_user.username} is not a member of this garden."}, status=400)
             assigned_users.append(assigned_user)
 
         task.assigned_to.set(assigned_users)
+        get_memberships(request).invalidate()
         task.status = 'PENDING'  # optionally reset status
         task.save()
         return Response(TaskSerializer(task).data)
@@ -211,7 +212,7 @@ class TaskViewSet(viewsets.ModelViewSet):
         user = request.user
 
         # Check if user is already assigned
-        if task.assigned_to.filter(pk=user.pk).exists():
+        if get_memberships(request).is_task_assignee(task):
             return Response(
                 {"error": "You are already assigned to this task."},
                 status=status.HTTP_400_BAD_REQUEST
@@ -224,17 +225,12 @@ class TaskViewSet(viewsets.ModelViewSet):
             )
 
         # Check if the user is a valid member of the garden
-        is_member = GardenMembership.objects.filter(
-            user=user,
-            garden=task.garden,
-            status='ACCEPTED'
-        ).exists()
-
-        if not is_member:
+        if not get_memberships(request).is_member(task.garden_id):
             return Response({"error": "You are not a member of this garden."},
                             status=status.HTTP_403_FORBIDDEN)
 
         task.assigned_to.add(user)
+        get_memberships(request).invalidate()
         task.status = 'IN_PROGRESS'  # 🚀 Directly move to active work
         task.save()
 
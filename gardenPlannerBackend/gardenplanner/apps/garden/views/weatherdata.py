@@ -1,8 +1,5 @@
 """Weather Related Views"""
 
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
-
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -11,9 +8,11 @@ from ..utils import get_weather_data
 from rest_framework.permissions import AllowAny
 
 
-@method_decorator(cache_page(60 * 5), name='get')
 class WeatherDataView(APIView):
-    """View to get weather data for a location"""
+    """
+    View to get weather data for a location. Responses are cached by
+    get_weather_data on the normalized location and rounded coordinates.
+    """
     permission_classes = [AllowAny]
     
     def get(self, request):